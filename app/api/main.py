@@ -14,17 +14,37 @@ from fastapi.middleware.cors import CORSMiddleware
 import config
 from app.api import sessions
 from app.api.routes import chat, files, status
+from app.llm.tool_executor import get_tool_executor, shutdown_tool_executor
 
 logger = logging.getLogger(__name__)
 
 SESSION_CLEANUP_INTERVAL = 300  # 5 minutes
 
 
+def _import_startup_snapshot():
+    """Seed an empty knowledge base from config.KNOWLEDGE_SNAPSHOT, if set."""
+    from app.knowledge.snapshot import SnapshotError, import_snapshot
+    from app.knowledge.vectorstore import get_shared_store
+
+    store = get_shared_store()
+    if store.collection.count():
+        return
+    try:
+        info = import_snapshot(config.KNOWLEDGE_SNAPSHOT, store)
+    except SnapshotError as exc:
+        logger.error("Knowledge snapshot not loaded: %s", exc)
+        return
+    logger.info("Knowledge base loaded from snapshot %s (%s)", info.path, info.summary())
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle — model preload + periodic session cleanup."""
-    # Warm up the LLM so first user request doesn't pay cold-start cost
     loop = asyncio.get_event_loop()
+    if config.KNOWLEDGE_SNAPSHOT:
+        await loop.run_in_executor(None, _import_startup_snapshot)
+
+    # Warm up the LLM so first user request doesn't pay cold-start cost
     try:
         import ollama
         await loop.run_in_executor(
@@ -45,12 +65,29 @@ async def lifespan(app: FastAPI):
             sessions.cleanup_stale()
 
     task = asyncio.create_task(_cleanup_loop())
+
+    # Start tool worker processes now rather than on the first heavy tool call
+    get_tool_executor().warm()
+
+    # Ingest files dropped into the local sources directory in the background
+    watcher = None
+    if config.WATCH_SOURCES:
+        from app.knowledge.watcher import SourceWatcher, set_source_watcher
+
+        watcher = SourceWatcher()
+        watcher.start()
+        set_source_watcher(watcher)
+
     yield
+    if watcher is not None:
+        await watcher.stop()
+        set_source_watcher(None)
     task.cancel()
     try:
         await task
     except asyncio.CancelledError:
         pass
+    shutdown_tool_executor()
 
 
 def create_app() -> FastAPI:
@@ -6,6 +6,7 @@
 
 import asyncio
 import json
+import logging
 
 from fastapi import APIRouter, Depends
 from sse_starlette.sse import EventSourceResponse
@@ -14,7 +15,11 @@ from app.api.deps import get_session, get_session_id
 from app.api.schemas import ChatRequest, ChatHistoryResponse
 from app.api.sessions import SessionData
 from app.api import sessions
-from app.llm.pipeline import StreamToken, StreamStatus, StreamToolCall, StreamThinking, StreamPart
+from app.llm.pipeline import (
+    RETRIEVAL_STATUS, StreamEvent, StreamToken, StreamStatus, StreamToolCall, StreamThinking, StreamPart,
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -25,6 +30,32 @@ CREATIVITY_MAP = {
 }
 
 
+def _to_sse(event: StreamEvent) -> dict:
+    """Convert a pipeline stream event to an SSE message."""
+    if isinstance(event, StreamToken):
+        return {"event": "token", "data": json.dumps({"text": event.text})}
+    if isinstance(event, StreamStatus):
+        payload = {"step": event.step}
+        if event.detail:
+            payload["detail"] = event.detail
+        return {"event": "status", "data": json.dumps(payload)}
+    if isinstance(event, StreamThinking):
+        return {"event": "thinking", "data": json.dumps({"text": event.text})}
+    if isinstance(event, StreamToolCall):
+        return {
+            "event": "tool_call",
+            "data": json.dumps({
+                "name": event.name,
+                "arguments": event.arguments,
+                "result": event.result,
+            }, default=str),
+        }
+    return {
+        "event": f"part:{event.part_type}",
+        "data": json.dumps(event.data, default=str),
+    }
+
+
 @router.post("/chat")
 async def chat(
     request: ChatRequest,
@@ -40,6 +71,18 @@ async def chat(
         queue: asyncio.Queue = asyncio.Queue()
         sentinel = object()
 
+        # Show progress before retrieval, which can take a moment
+        yield _to_sse(StreamStatus(step=RETRIEVAL_STATUS))
+
+        # Retrieve on the event loop (async embeddings + the vector store's
+        # own executor) rather than inside the streaming thread
+        try:
+            context_chunks = await conv.aretrieve(request.message)
+        except Exception as exc:
+            # send_stream retries retrieval itself and reports any error in-stream
+            logger.warning("Async retrieval failed, retrying in the stream: %s", exc)
+            context_chunks = None
+
         def _produce():
             """Run the blocking sync generator in a thread, push events to queue."""
             try:
@@ -47,6 +90,7 @@ async def chat(
                     request.message,
                     temperature=temperature,
                     midi_summary=midi_summary,
+                    context_chunks=context_chunks,
                 ):
                     loop.call_soon_threadsafe(queue.put_nowait, event)
                 loop.call_soon_threadsafe(queue.put_nowait, sentinel)
@@ -64,29 +108,7 @@ async def chat(
                     yield {"event": "error", "data": json.dumps({"message": str(event)})}
                     return
 
-                if isinstance(event, StreamToken):
-                    yield {"event": "token", "data": json.dumps({"text": event.text})}
-                elif isinstance(event, StreamStatus):
-                    payload = {"step": event.step}
-                    if event.detail:
-                        payload["detail"] = event.detail
-                    yield {"event": "status", "data": json.dumps(payload)}
-                elif isinstance(event, StreamThinking):
-                    yield {"event": "thinking", "data": json.dumps({"text": event.text})}
-                elif isinstance(event, StreamToolCall):
-                    yield {
-                        "event": "tool_call",
-                        "data": json.dumps({
-                            "name": event.name,
-                            "arguments": event.arguments,
-                            "result": event.result,
-                        }, default=str),
-                    }
-                elif isinstance(event, StreamPart):
-                    yield {
-                        "event": f"part:{event.part_type}",
-                        "data": json.dumps(event.data, default=str),
-                    }
+                yield _to_sse(event)
         finally:
             await future
 
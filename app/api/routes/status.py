@@ -8,17 +8,32 @@ from fastapi import APIRouter
 
 import config
 from app.llm.ollama_client import is_available, list_models
+from app.llm.prompt_cache import prefix_stats
+from app.llm.router import router_stats
+from app.llm.tool_executor import get_tool_executor
 from app.audio.transcribe import is_transcription_available
-from app.knowledge.vectorstore import VectorStore
+from app.knowledge.io_executor import get_io_executor
+from app.knowledge.vectorstore import get_shared_store
+from app.knowledge.watcher import get_source_watcher
 
 router = APIRouter()
 
 
 def _get_knowledge_stats() -> dict:
-    """Get knowledge base stats, handling errors gracefully."""
+    """Get knowledge base stats, handling errors gracefully.
+
+    Uses the shared store, whose stats are maintained incrementally, so
+    polling this is cheap regardless of collection size.
+    """
     try:
-        vs = VectorStore()
-        return {"available": True, **vs.get_stats()}
+        vs = get_shared_store()
+        watcher = get_source_watcher()
+        return {
+            "available": True,
+            **vs.get_stats(),
+            "io": get_io_executor().stats(),
+            "watcher": watcher.stats() if watcher else None,
+        }
     except Exception:
         return {"available": False, "total_chunks": 0}
 
@@ -35,6 +50,11 @@ def get_status() -> dict:
             "models": models,
             "primary_model": config.LLM_MODEL,
             "fast_model": config.FAST_MODEL,
+            "prompt_layout": config.PROMPT_LAYOUT,
+            "keep_alive": config.LLM_KEEP_ALIVE,
+            "prefix_cache": prefix_stats(),
+            "router": router_stats(),
+            "tools": get_tool_executor().as_dict(),
         },
         "knowledge_base": _get_knowledge_stats(),
         "transcription": {
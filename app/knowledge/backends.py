@@ -0,0 +1,465 @@
+# Woodshed AI — Vector Search Backends
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Nearest-neighbour backends behind VectorStore.
+
+The Chroma collection is always the store of record; a backend only
+answers "which chunks are closest to this embedding".
+
+- ``chroma``: Chroma's own HNSW query path.
+- ``numpy``: exact cosine search over one contiguous float32 matrix in
+  RAM. At knowledge-base sizes (a few thousand chunks) a matmul plus
+  argpartition beats HNSW on latency and has perfect recall.
+- ``partitioned``: one exact NumPy index per category. A filtered query
+  only scans its categories' partitions, so it costs less than an
+  unfiltered one and always fills k when enough chunks match.
+
+category_filter may be a single category or a list of categories.
+"""
+
+import heapq
+import threading
+
+import numpy as np
+
+from app.knowledge.quantize import FullPrecisionRows, dtype_for, encode, normalize, scan, truncate
+
+BACKENDS = ("chroma", "numpy", "partitioned")
+LOAD_PAGE_SIZE = 5000
+RESCORE_FACTOR = 4  # compact storage re-scores this many × k candidates exactly
+
+
+def filter_categories(category_filter: str | list[str] | tuple | None) -> set[str] | None:
+    """Normalize a category filter to a set of categories (None = all)."""
+    if not category_filter:
+        return None
+    if isinstance(category_filter, str):
+        return {category_filter}
+    return set(category_filter)
+
+
+def chroma_where(category_filter) -> dict | None:
+    """Build a Chroma where clause for a category filter."""
+    categories = filter_categories(category_filter)
+    if not categories:
+        return None
+    if len(categories) == 1:
+        return {"category": next(iter(categories))}
+    return {"category": {"$in": sorted(categories)}}
+
+
+def _iter_collection(collection):
+    """Page through a collection's ids, documents, metadatas, and embeddings."""
+    offset = 0
+    while True:
+        page = collection.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=LOAD_PAGE_SIZE,
+            offset=offset,
+        )
+        if not page["ids"]:
+            return
+        yield page
+        offset += len(page["ids"])
+
+
+class ChromaBackend:
+    """Delegates queries to the Chroma collection's HNSW index."""
+
+    name = "chroma"
+    needs_embeddings = False
+
+    def __init__(self):
+        self._collection = None
+
+    def load(self, collection):
+        self._collection = collection
+
+    def add(self, ids, documents, metadatas, embeddings):
+        pass  # Chroma indexes on write
+
+    def remove(self, ids):
+        pass
+
+    def vectors(self, ids: list[str]) -> np.ndarray:
+        """Normalized float32 embeddings for ids, in order (zeros if missing)."""
+        got = self._collection.get(ids=ids, include=["embeddings"])
+        by_id = dict(zip(got["ids"], got["embeddings"]))
+        if not by_id:
+            return np.zeros((len(ids), 0), dtype=np.float32)
+        dim = len(next(iter(by_id.values())))
+        rows = np.zeros((len(ids), dim), dtype=np.float32)
+        for i, doc_id in enumerate(ids):
+            if doc_id in by_id:
+                rows[i] = by_id[doc_id]
+        return normalize(rows)
+
+    def query(
+        self,
+        embeddings: list[list[float]],
+        n_results: int,
+        category_filter: str | list[str] | None = None,
+    ) -> list[list[dict]]:
+        kwargs = dict(query_embeddings=embeddings, n_results=n_results)
+        where = chroma_where(category_filter)
+        if where:
+            kwargs["where"] = where
+        results = self._collection.query(**kwargs)
+
+        batches = []
+        for q in range(len(results["ids"])):
+            items = []
+            for i in range(len(results["ids"][q])):
+                items.append({
+                    "id": results["ids"][q][i],
+                    "document": results["documents"][q][i],
+                    "metadata": (results["metadatas"][q][i] if results["metadatas"] else None) or {},
+                    "distance": results["distances"][q][i] if results["distances"] else None,
+                })
+            batches.append(items)
+        return batches
+
+
+class NumpyBackend:
+    """Exact cosine top-k over an in-memory matrix.
+
+    Rows are L2-normalized on insert so a query is a single matmul.
+    Rows live in a buffer with spare capacity (appends are amortized
+    O(1)); deletes move the last row into the hole. Category filters
+    use boolean masks built once per category and dropped on write.
+
+    With compact storage (float16/int8 and/or truncated dims) the
+    resident matrix holds codes that pick rescore × k candidates, which
+    are then re-ranked exactly against the float32 originals kept in a
+    disk-backed FullPrecisionRows.
+    """
+
+    name = "numpy"
+    needs_embeddings = True
+
+    def __init__(self, storage: str = "float32", dims: int = 0, rescore: int = RESCORE_FACTOR):
+        self.storage = storage
+        self.dims = dims or 0
+        self.rescore = rescore
+        self._dtype = dtype_for(storage)
+        self._lock = threading.RLock()
+        self._full: FullPrecisionRows | None = None
+        self._reset(dim=0)
+
+    @property
+    def compact(self) -> bool:
+        """True when the resident codes are not the exact vectors."""
+        return self.storage != "float32" or self.dims > 0
+
+    def _reset(self, dim: int):
+        self._matrix = np.zeros((0, dim), dtype=self._dtype)
+        self._scales = np.zeros(0, dtype=np.float32)
+        if self._full is not None:
+            self._full.close()
+        self._full = None
+        self._size = 0
+        self._ids: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._documents: list[str] = []
+        self._metadatas: list[dict] = []
+        self._masks: dict[tuple, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the resident vector codes (excluding spare capacity)."""
+        per_row = self._matrix.shape[1] * self._matrix.itemsize
+        if self.storage == "int8":
+            per_row += self._scales.itemsize
+        return self._size * per_row
+
+    def load(self, collection):
+        """Copy every embedding in the collection into the matrix (paged)."""
+        with self._lock:
+            self._reset(dim=0)
+            for page in _iter_collection(collection):
+                self.add(page["ids"], page["documents"], page["metadatas"], page["embeddings"])
+
+    def _grow(self, needed: int, full_dim: int):
+        dim = min(self.dims, full_dim) if self.dims else full_dim
+        if self._matrix.shape[1] != dim:
+            if self._size:
+                raise ValueError(f"Embedding dimension {full_dim} doesn't match the index")
+            self._matrix = np.zeros((0, dim), dtype=self._dtype)
+            if self.compact:
+                self._full = FullPrecisionRows(full_dim)
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 256)
+        grown = np.zeros((capacity, dim), dtype=self._dtype)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+        scales = np.zeros(capacity, dtype=np.float32)
+        scales[:self._size] = self._scales[:self._size]
+        self._scales = scales
+        if self._full is not None:
+            self._full.reserve(capacity)
+
+    def add(self, ids, documents, metadatas, embeddings):
+        """Insert or overwrite rows."""
+        if not ids:
+            return
+        vectors = normalize(np.asarray(embeddings, dtype=np.float32))
+        codes, scales = encode(truncate(vectors, self.dims), self.storage)
+        with self._lock:
+            self._grow(self._size + len(ids), vectors.shape[1])
+            for i, doc_id in enumerate(ids):
+                row = self._rows.get(doc_id)
+                metadata = (metadatas[i] if metadatas else None) or {}
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._rows[doc_id] = row
+                    self._ids.append(doc_id)
+                    self._documents.append(documents[i])
+                    self._metadatas.append(metadata)
+                else:
+                    self._documents[row] = documents[i]
+                    self._metadatas[row] = metadata
+                self._matrix[row] = codes[i]
+                if scales is not None:
+                    self._scales[row] = scales[i]
+                if self._full is not None:
+                    self._full[row] = vectors[i]
+            self._masks = {}
+
+    def remove(self, ids):
+        with self._lock:
+            for doc_id in ids:
+                row = self._rows.pop(doc_id, None)
+                if row is None:
+                    continue
+                last = self._size - 1
+                if row != last:
+                    moved = self._ids[last]
+                    self._matrix[row] = self._matrix[last]
+                    self._scales[row] = self._scales[last]
+                    if self._full is not None:
+                        self._full[row] = self._full[last]
+                    self._ids[row] = moved
+                    self._documents[row] = self._documents[last]
+                    self._metadatas[row] = self._metadatas[last]
+                    self._rows[moved] = row
+                self._ids.pop()
+                self._documents.pop()
+                self._metadatas.pop()
+                self._size = last
+            self._masks = {}
+
+    def vectors(self, ids: list[str]) -> np.ndarray:
+        """Normalized float32 embeddings for ids, in order (zeros if missing).
+
+        Compact storage returns the full-precision originals.
+        """
+        with self._lock:
+            dim = self._full.dim if self._full is not None else self._matrix.shape[1]
+            out = np.zeros((len(ids), dim), dtype=np.float32)
+            for i, doc_id in enumerate(ids):
+                row = self._rows.get(doc_id)
+                if row is not None:
+                    out[i] = self._full[row] if self._full is not None else self._matrix[row]
+            return out
+
+    def _mask(self, categories: set[str]) -> np.ndarray:
+        key = tuple(sorted(categories))
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (m.get("category") in categories for m in self._metadatas),
+                dtype=bool,
+                count=self._size,
+            )
+            self._masks[key] = mask
+        return mask
+
+    def query(
+        self,
+        embeddings: list[list[float]],
+        n_results: int,
+        category_filter: str | list[str] | None = None,
+    ) -> list[list[dict]]:
+        """Batched search: one (queries × rows) matmul, then argpartition.
+
+        Compact storage scans the codes for rescore × k candidates and
+        re-ranks them with exact float32 scores.
+        """
+        queries = np.asarray(embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        queries = normalize(queries)
+
+        with self._lock:
+            if not self._size or n_results <= 0:
+                return [[] for _ in range(len(queries))]
+            scores = scan(
+                self._matrix[:self._size],
+                self._scales[:self._size] if self.storage == "int8" else None,
+                truncate(queries, self.dims),
+            )
+            candidates = self._size
+            categories = filter_categories(category_filter)
+            if categories:
+                mask = self._mask(categories)
+                candidates = int(mask.sum())
+                scores[:, ~mask] = -np.inf
+            k = min(n_results, candidates)
+            if k == 0:
+                return [[] for _ in range(len(queries))]
+            rescore = self.compact and self._full is not None and self.rescore > 0
+            n_top = min(k * self.rescore, candidates) if rescore else k
+
+            if n_top < self._size:
+                top = np.argpartition(-scores, n_top - 1, axis=1)[:, :n_top]
+            else:
+                top = np.broadcast_to(np.arange(self._size), (len(queries), self._size))
+            batches = []
+            for q in range(len(queries)):
+                rows = top[q]
+                if rescore:
+                    # Exact float32 re-scoring (sorted rows = sequential memmap reads)
+                    rows = np.sort(rows)
+                    exact = self._full[rows] @ queries[q]
+                    order = np.argsort(-exact, kind="stable")[:k]
+                    rows, row_scores = rows[order], exact[order]
+                else:
+                    order = np.argsort(-scores[q, rows], kind="stable")
+                    rows, row_scores = rows[order], scores[q, rows[order]]
+                batches.append([
+                    {
+                        "id": self._ids[row],
+                        "document": self._documents[row],
+                        "metadata": dict(self._metadatas[row]),
+                        "distance": float(1.0 - score),
+                    }
+                    for row, score in zip(rows, row_scores)
+                ])
+            return batches
+
+
+class PartitionedBackend:
+    """Per-category exact indexes behind a router.
+
+    Partitions are created on the fly for each category seen in chunk
+    metadata (as assigned by ingest's _detect_category). A query runs
+    only against the partitions its filter names, or all of them when
+    unfiltered, and the per-partition top-k lists are merged by distance.
+    """
+
+    name = "partitioned"
+    needs_embeddings = True
+
+    def __init__(self, storage: str = "float32", dims: int = 0, rescore: int = RESCORE_FACTOR):
+        dtype_for(storage)  # validate up front, not on first insert
+        self.storage = storage
+        self.dims = dims or 0
+        self.rescore = rescore
+        self._lock = threading.RLock()
+        self._partitions: dict[str, NumpyBackend] = {}
+        self._category_of: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._category_of)
+
+    def partition_sizes(self) -> dict[str, int]:
+        """Chunks per category partition."""
+        with self._lock:
+            return {category: len(part) for category, part in sorted(self._partitions.items())}
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(part.memory_bytes() for part in self._partitions.values())
+
+    def load(self, collection):
+        with self._lock:
+            self._partitions = {}
+            self._category_of = {}
+            for page in _iter_collection(collection):
+                self.add(page["ids"], page["documents"], page["metadatas"], page["embeddings"])
+
+    def add(self, ids, documents, metadatas, embeddings):
+        if not ids:
+            return
+        groups: dict[str, list[int]] = {}
+        for i in range(len(ids)):
+            metadata = (metadatas[i] if metadatas else None) or {}
+            groups.setdefault(metadata.get("category", "general"), []).append(i)
+        with self._lock:
+            # An upsert may move a chunk to another category
+            self.remove([doc_id for doc_id in ids if doc_id in self._category_of])
+            for category, rows in groups.items():
+                partition = self._partitions.get(category)
+                if partition is None:
+                    partition = self._partitions[category] = NumpyBackend(self.storage, self.dims, self.rescore)
+                partition.add(
+                    [ids[i] for i in rows],
+                    [documents[i] for i in rows],
+                    [metadatas[i] for i in rows] if metadatas else None,
+                    [embeddings[i] for i in rows],
+                )
+                for i in rows:
+                    self._category_of[ids[i]] = category
+
+    def remove(self, ids):
+        with self._lock:
+            by_category: dict[str, list[str]] = {}
+            for doc_id in ids:
+                category = self._category_of.pop(doc_id, None)
+                if category is not None:
+                    by_category.setdefault(category, []).append(doc_id)
+            for category, doc_ids in by_category.items():
+                partition = self._partitions[category]
+                partition.remove(doc_ids)
+                if not len(partition):
+                    del self._partitions[category]
+
+    def vectors(self, ids: list[str]) -> np.ndarray:
+        with self._lock:
+            parts = [self._partitions.get(self._category_of.get(doc_id)) for doc_id in ids]
+            found = [(i, part.vectors([doc_id])[0]) for i, (doc_id, part) in enumerate(zip(ids, parts)) if part is not None]
+            dim = len(found[0][1]) if found else 0
+            out = np.zeros((len(ids), dim), dtype=np.float32)
+            for i, vector in found:
+                out[i] = vector
+            return out
+
+    def query(
+        self,
+        embeddings: list[list[float]],
+        n_results: int,
+        category_filter: str | list[str] | None = None,
+    ) -> list[list[dict]]:
+        categories = filter_categories(category_filter)
+        with self._lock:
+            partitions = [
+                part for category, part in self._partitions.items()
+                if categories is None or category in categories
+            ]
+            per_partition = [part.query(embeddings, n_results, None) for part in partitions]
+        merged = []
+        for q in range(len(embeddings)):
+            ranked = heapq.merge(*(results[q] for results in per_partition), key=lambda r: r["distance"])
+            merged.append(list(ranked)[:n_results])
+        return merged
+
+
+def make_backend(name: str, storage: str = "float32", dims: int = 0):
+    """Create a backend by name ("chroma", "numpy", or "partitioned").
+
+    storage and dims select compact vector codes for the in-memory
+    backends; Chroma manages its own storage and ignores them.
+    """
+    if name == "chroma":
+        return ChromaBackend()
+    if name == "numpy":
+        return NumpyBackend(storage, dims)
+    if name == "partitioned":
+        return PartitionedBackend(storage, dims)
+    raise ValueError(f"Unknown vector backend {name!r} (expected one of {', '.join(BACKENDS)})")
@@ -0,0 +1,257 @@
+# Woodshed AI — Document Chunking
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Streaming, bounded-memory chunker for knowledge-base documents.
+
+Strategy: split into sections by markdown headings; keep a section
+whole if it fits in one chunk, otherwise split it by paragraphs (and
+over-long paragraphs by words); then pack the pieces into chunks of at
+most chunk_size tokens, each prefixed with the last overlap tokens of
+the previous chunk.
+
+Chunk sizes are measured with the LLM's tokenizer (app.llm.tokenizer),
+so chord-dense tables and tab diagrams aren't under- or over-filled.
+Character counts are only used as a cheap upper bound when buffering.
+
+Everything is a generator over line fragments of bounded length, so
+memory stays proportional to a single chunk no matter how large the
+document is.
+"""
+
+import re
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.llm.tokenizer import count_tokens, tail_tokens, tokenizer_id
+
+# Chunking parameters
+CHUNKER_VERSION = 1  # bump when the same file would chunk differently
+CHUNK_SIZE = 500  # target tokens
+CHUNK_OVERLAP = 50  # overlap tokens
+CHARS_PER_TOKEN = 4  # typical prose ratio; only bounds how much text is buffered
+
+
+def chunker_version() -> str:
+    """CHUNKER_VERSION plus the tokenizer in use, since both move chunk boundaries."""
+    return f"{CHUNKER_VERSION}+{tokenizer_id()}"
+
+_HEADING_RE = re.compile(r"#{1,3} ")
+_WORD_RE = re.compile(r"\S+")
+
+
+def _iter_fragments(f, max_chars: int) -> Iterator[str]:
+    """Read a text stream in line fragments no longer than max_chars."""
+    return iter(lambda: f.readline(max_chars), "")
+
+
+def _split_words(text: str, max_len: int, length=len) -> Iterator[str]:
+    """Pack words into pieces of at most max_len (linear time).
+
+    length measures a word (characters by default, or tokens); pieces
+    are joined with single spaces.
+    """
+    words: list[str] = []
+    total = 0
+    for match in _WORD_RE.finditer(text):
+        word = match.group()
+        added = length(word) + (1 if words else 0)
+        if words and total + added > max_len:
+            yield " ".join(words)
+            words, total = [], 0
+            added = length(word)
+        words.append(word)
+        total += added
+    if words:
+        yield " ".join(words)
+
+
+def _split_lines(text: str, max_tokens: int) -> Iterator[str]:
+    """Pack lines into pieces of at most max_tokens, keeping line breaks.
+
+    Keeps tables and tab diagrams intact; a single line that is too long
+    on its own is split by words.
+    """
+    lines: list[str] = []
+    total = 0
+    newline = count_tokens("\n")
+    for line in text.split("\n"):
+        line_tokens = count_tokens(line)
+        if line_tokens > max_tokens:
+            if lines:
+                yield "\n".join(lines)
+                lines, total = [], 0
+            yield from _split_words(line, max_tokens, count_tokens)
+            continue
+        added = line_tokens + (newline if lines else 0)
+        if lines and total + added > max_tokens:
+            yield "\n".join(lines)
+            lines, total = [], 0
+            added = line_tokens
+        lines.append(line)
+        total += added
+    if lines:
+        yield "\n".join(lines)
+
+
+def _iter_pieces(fragments: Iterable[str], max_chars: int) -> Iterator[str]:
+    """Yield sections that fit in a chunk, else their paragraphs.
+
+    A section is buffered only until it outgrows max_chars; after that
+    its paragraphs are yielded as they complete, and a paragraph that
+    itself outgrows max_chars is flushed up to its last line break.
+    """
+    buf: list[str] = []  # fragments of the current section (or paragraph)
+    buf_len = 0
+    split_mode = False  # current section too big: emitting paragraphs
+    at_line_start = True
+
+    def paragraphs(text: str) -> Iterator[str]:
+        for para in re.split(r"\n\n+", text):
+            if para.strip():
+                yield para.strip()
+
+    for frag in fragments:
+        starts_line = at_line_start
+        at_line_start = frag.endswith("\n")
+
+        if starts_line and _HEADING_RE.match(frag):
+            # New section: flush the previous one
+            text = "".join(buf)
+            if split_mode:
+                yield from paragraphs(text)
+            elif text.strip():
+                yield text.strip()
+            buf, buf_len, split_mode = [], 0, False
+
+        if split_mode and starts_line and not frag.strip():
+            # Blank line ends a paragraph
+            text = "".join(buf)
+            if text.strip():
+                yield text.strip()
+            buf, buf_len = [], 0
+            continue
+
+        buf.append(frag)
+        buf_len += len(frag)
+        if buf_len <= max_chars:
+            continue
+
+        if not split_mode:
+            # Section outgrew a chunk: emit its finished paragraphs, keep the last
+            split_mode = True
+            parts = re.split(r"\n\n+", "".join(buf))
+            for para in parts[:-1]:
+                if para.strip():
+                    yield para.strip()
+            buf = [parts[-1]]
+            buf_len = len(parts[-1])
+            if buf_len <= max_chars:
+                continue
+
+        # One paragraph longer than a chunk: flush up to its last complete
+        # line (or word), leaving token-level splitting to the packer
+        text = "".join(buf)
+        cut = text.rfind("\n") + 1
+        if cut <= 0:
+            cut = max(text.rfind(" "), text.rfind("\t")) + 1
+        if cut <= 0:
+            # No whitespace at all — cut it here rather than buffer forever
+            cut = len(text)
+        if text[:cut].strip():
+            yield text[:cut].strip()
+        buf = [text[cut:]]
+        buf_len = len(buf[0])
+
+    text = "".join(buf)
+    if split_mode:
+        yield from paragraphs(text)
+    elif text.strip():
+        yield text.strip()
+
+
+@dataclass
+class Chunk:
+    """A chunk of text and its exact token count.
+
+    Chunks from paged documents (see app.knowledge.extractors) also
+    record the page and section they came from, for citations.
+    """
+    text: str
+    tokens: int
+    page: int | None = None
+    section: str | None = None
+
+
+def iter_token_chunks(
+    fragments: Iterable[str],
+    chunk_size: int = CHUNK_SIZE,
+    overlap: int = CHUNK_OVERLAP,
+) -> Iterator[Chunk]:
+    """Pack pieces into overlapping chunks of at most chunk_size tokens.
+
+    Pieces are packed by summing their (cached) token counts; each
+    emitted chunk, overlap included, is then counted exactly once.
+    """
+    max_chars = chunk_size * CHARS_PER_TOKEN
+    sep_tokens = count_tokens("\n\n")
+    prev_tail = ""
+    # Leave room for the overlap prefix so the final chunk stays in budget
+    overlap = min(overlap, chunk_size // 2)
+    budget = chunk_size - overlap - sep_tokens if overlap > 0 else chunk_size
+
+    def emit(body: str) -> Chunk:
+        nonlocal prev_tail
+        text = prev_tail + "\n\n" + body if prev_tail else body
+        prev_tail = tail_tokens(body, overlap) if overlap > 0 else ""
+        return Chunk(text=text, tokens=count_tokens(text))
+
+    current, current_tokens = "", 0
+    for piece in _iter_pieces(fragments, max_chars):
+        piece_tokens = count_tokens(piece)
+        if current and current_tokens + sep_tokens + piece_tokens <= budget:
+            current = current + "\n\n" + piece
+            current_tokens += sep_tokens + piece_tokens
+            continue
+        if current:
+            yield emit(current)
+            current, current_tokens = "", 0
+        if piece_tokens <= budget:
+            current, current_tokens = piece, piece_tokens
+            continue
+        # Piece is too many tokens on its own — split it by lines, then words
+        parts = [p for p in _split_lines(piece, budget) if p.strip()]
+        for part in parts[:-1]:
+            yield emit(part)
+        if parts:
+            current, current_tokens = parts[-1], count_tokens(parts[-1])
+
+    if current:
+        yield emit(current)
+
+
+def iter_chunks(
+    fragments: Iterable[str],
+    chunk_size: int = CHUNK_SIZE,
+    overlap: int = CHUNK_OVERLAP,
+) -> Iterator[str]:
+    """Like iter_token_chunks, yielding just the chunk text."""
+    for chunk in iter_token_chunks(fragments, chunk_size, overlap):
+        yield chunk.text
+
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list[str]:
+    """Split an in-memory string into overlapping chunks."""
+    return list(iter_chunks(text.splitlines(keepends=True), chunk_size, overlap))
+
+
+def iter_file_chunks(
+    path: Path,
+    chunk_size: int = CHUNK_SIZE,
+    overlap: int = CHUNK_OVERLAP,
+) -> Iterator[Chunk]:
+    """Stream token-counted chunks from a UTF-8 file without reading it whole."""
+    max_chars = chunk_size * CHARS_PER_TOKEN
+    with open(path, encoding="utf-8") as f:
+        yield from iter_token_chunks(_iter_fragments(f, max_chars), chunk_size, overlap)
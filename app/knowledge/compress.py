@@ -0,0 +1,145 @@
+# Woodshed AI — Context Compression
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Query-aware trimming of retrieved chunks before they reach the prompt.
+
+A 500-token chunk is often picked for one paragraph of it. Each chunk
+is split into spans (paragraphs, with long prose paragraphs split into
+sentences; tables stay whole), every span is scored against the query
+embedding, and only the best spans are kept up to a token budget, in
+their original order. Span embeddings go through the embedding cache,
+so each span is embedded once, by the first query that needs it (or at
+ingest, see EmbeddingPipeline and config.COMPRESS_WARM_SPANS).
+"""
+
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.knowledge.selection import chunk_tokens
+from app.llm.tokenizer import count_tokens
+
+SPAN_MAX_TOKENS = 120  # prose paragraphs longer than this are split into sentences
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9*\"'(])")
+
+
+def split_spans(text: str) -> list[str]:
+    """Split a chunk into paragraphs, and long prose paragraphs into sentences."""
+    spans = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tabular = paragraph.lstrip().startswith(("|", "```", "e|", "E|"))
+        if tabular or count_tokens(paragraph) <= SPAN_MAX_TOKENS:
+            spans.append(paragraph)
+        else:
+            spans.extend(s for s in _SENTENCE_RE.split(paragraph) if s.strip())
+    return spans
+
+
+@dataclass
+class CompressionStats:
+    """Prompt tokens before and after compressing one turn's context."""
+    chunks: int = 0
+    compressed: int = 0  # chunks that lost at least one span
+    tokens_before: int = 0
+    tokens_after: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def summary(self) -> str:
+        return (
+            f"context {self.tokens_before} → {self.tokens_after} tokens "
+            f"(saved {self.tokens_saved}; {self.compressed}/{self.chunks} chunks trimmed)"
+        )
+
+
+def _split_chunks(chunks: list[dict], sizes: list[int], token_budget: int, min_tokens: int) -> dict[int, list[str]]:
+    """Spans of each chunk worth trimming; empty if everything fits the budget."""
+    if sum(sizes) <= token_budget:
+        return {}
+    split = {}
+    for i, chunk in enumerate(chunks):
+        if sizes[i] > min_tokens:
+            spans = split_spans(chunk.get("document") or "")
+            if len(spans) > 1:
+                split[i] = spans
+    return split
+
+
+def spans_to_embed(chunks: list[dict], token_budget: int, min_tokens: int = SPAN_MAX_TOKENS) -> list[str]:
+    """The texts compress_chunks will pass to embed_fn, so they can be embedded ahead of time."""
+    split = _split_chunks(chunks, [chunk_tokens(c) for c in chunks], token_budget, min_tokens)
+    return [span for spans in split.values() for span in spans]
+
+
+def compress_chunks(
+    chunks: list[dict],
+    query_vector: np.ndarray | list[float],
+    embed_fn: Callable[[list[str]], list],
+    token_budget: int,
+    min_tokens: int = SPAN_MAX_TOKENS,
+) -> tuple[list[dict], CompressionStats]:
+    """Keep the spans most similar to the query, up to token_budget.
+
+    Chunks of min_tokens or fewer are kept whole. Every other chunk
+    keeps at least its best span (and its heading, if it starts with
+    one); remaining budget goes to the best spans overall. All spans are
+    embedded with one embed_fn call.
+    """
+    stats = CompressionStats(chunks=len(chunks))
+    sizes = [chunk_tokens(c) for c in chunks]
+    stats.tokens_before = sum(sizes)
+
+    split = _split_chunks(chunks, sizes, token_budget, min_tokens)
+    if not split:
+        stats.tokens_after = stats.tokens_before
+        return chunks, stats
+
+    texts = [span for spans in split.values() for span in spans]
+    vectors = np.asarray(embed_fn(texts), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_vector, dtype=np.float32)
+    scores = vectors @ (query / (np.linalg.norm(query) or 1.0))
+
+    # (score, chunk, span, tokens) for every span of a split chunk
+    candidates = []
+    offset = 0
+    for i, spans in split.items():
+        for j, span in enumerate(spans):
+            candidates.append((float(scores[offset + j]), i, j, count_tokens(span)))
+        offset += len(spans)
+
+    used = sum(sizes[i] for i in range(len(chunks)) if i not in split)
+    keep: dict[int, set[int]] = {i: set() for i in split}
+    # Every split chunk keeps its heading and its best span...
+    for i, spans in split.items():
+        best = max((c for c in candidates if c[1] == i), key=lambda c: c[0])
+        keep[i].add(best[2])
+        used += best[3]
+        if spans[0].startswith("#") and best[2] != 0:
+            keep[i].add(0)
+            used += count_tokens(spans[0])
+    # ...then the rest of the budget goes to the best spans overall
+    for score, i, j, tokens in sorted(candidates, key=lambda c: -c[0]):
+        if j not in keep[i] and used + tokens <= token_budget:
+            keep[i].add(j)
+            used += tokens
+
+    compressed = []
+    for i, chunk in enumerate(chunks):
+        if i in split and len(keep[i]) < len(split[i]):
+            document = "\n\n".join(span for j, span in enumerate(split[i]) if j in keep[i])
+            chunk = dict(chunk, document=document, metadata=dict(chunk.get("metadata") or {}, token_count=count_tokens(document)))
+            stats.compressed += 1
+        compressed.append(chunk)
+    stats.tokens_after = sum(chunk_tokens(c) for c in compressed)
+    return compressed, stats
@@ -0,0 +1,272 @@
+# Woodshed AI — Near-Duplicate Detection
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""MinHash/LSH near-duplicate detection for ingested chunks.
+
+Chunk overlap and material repeated across guides (the same progression
+table in several files) produce chunks that say the same thing. Each
+chunk gets a MinHash signature over its word shingles; an LSH table
+finds candidates, which are confirmed by estimated Jaccard similarity.
+
+The first chunk seen with some content is the canonical copy and is
+stored; later near-duplicates are only linked to it. Links keep the
+duplicate's text and metadata so it can take over if the canonical
+chunk is deleted or rewritten (see take_orphans).
+"""
+
+import json
+import os
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+INDEX_VERSION = 1
+NUM_PERM = 128  # MinHash permutations per signature
+SHINGLE_SIZE = 3  # words per shingle
+SEED = 1
+
+_PRIME = (1 << 31) - 1  # a·x + b stays below 2**63 for 31-bit x, a, b
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set[str]:
+    """Lowercased word n-grams (the whole text if it is shorter than size)."""
+    words = text.lower().split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _permutations(num_perm: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM) -> tuple[int, int]:
+    """Pick (bands, rows) whose S-curve midpoint sits at or just below threshold."""
+    best = (num_perm, 1)
+    best_gap = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        midpoint = (1 / bands) ** (1 / rows)
+        # Err towards recall: candidates are verified against the full signature
+        gap = threshold - midpoint if midpoint <= threshold else 2 * (midpoint - threshold)
+        if gap < best_gap:
+            best, best_gap = (bands, rows), gap
+    return best
+
+
+class MinHasher:
+    """Deterministic MinHash signatures (stable across processes and runs)."""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = SEED):
+        self.num_perm = num_perm
+        self._a, self._b = _permutations(num_perm, seed)
+
+    def signature(self, text: str) -> np.ndarray | None:
+        """Signature of the text's shingle set, or None for empty text."""
+        grams = shingles(text)
+        if not grams:
+            return None
+        hashes = np.fromiter((zlib.crc32(g.encode()) % _PRIME for g in grams), dtype=np.uint64, count=len(grams))
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(sig_a == sig_b))
+
+
+class DedupIndex:
+    """Signatures of canonical chunks plus duplicate → canonical links.
+
+    Persisted as a JSON sidecar next to the collection and kept in step
+    by ingest, the same way as the ingest manifest.
+    """
+
+    def __init__(self, path: Path | None = None, threshold: float = 0.9, num_perm: int = NUM_PERM):
+        self.path = Path(path) if path else None
+        self.threshold = threshold
+        self._hasher = MinHasher(num_perm)
+        self._bands, self._rows = lsh_params(threshold, num_perm)
+        self._lock = threading.RLock()
+        self._signatures: dict[str, np.ndarray] = {}
+        self._buckets: list[dict[bytes, set[str]]] = [{} for _ in range(self._bands)]
+        self._links: dict[str, dict] = {}  # dup id → {"canonical", "document", "metadata"}
+        self._orphans: set[str] = set()
+        if self.path:
+            self.load()
+
+    def __len__(self) -> int:
+        """Number of canonical chunks."""
+        return len(self._signatures)
+
+    @property
+    def linked(self) -> int:
+        return len(self._links)
+
+    # --- Persistence ---
+
+    def load(self) -> bool:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION or data.get("num_perm") != self._hasher.num_perm:
+            return False
+        with self._lock:
+            self.clear()
+            for chunk_id, sig in data["signatures"].items():
+                self._index(chunk_id, np.asarray(sig, dtype=np.uint32))
+            self._links = data["links"]
+            self._orphans = {d for d, link in self._links.items() if link["canonical"] not in self._signatures}
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                "version": INDEX_VERSION,
+                "num_perm": self._hasher.num_perm,
+                "signatures": {chunk_id: sig.tolist() for chunk_id, sig in self._signatures.items()},
+                "links": self._links,
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        with self._lock:
+            self._signatures = {}
+            self._buckets = [{} for _ in range(self._bands)]
+            self._links = {}
+            self._orphans = set()
+
+    def rebuild(self, collection, page_size: int = 5000):
+        """Re-sign every stored chunk, keeping links whose canonical survives."""
+        with self._lock:
+            links = self._links
+            self._signatures = {}
+            self._buckets = [{} for _ in range(self._bands)]
+            offset = 0
+            while True:
+                page = collection.get(include=["documents"], limit=page_size, offset=offset)
+                if not page["ids"]:
+                    break
+                for chunk_id, document in zip(page["ids"], page["documents"]):
+                    sig = self._hasher.signature(document or "")
+                    if sig is not None:
+                        self._index(chunk_id, sig)
+                offset += len(page["ids"])
+            self._links = {d: link for d, link in links.items() if d not in self._signatures}
+            self._orphans = {d for d, link in self._links.items() if link["canonical"] not in self._signatures}
+
+    # --- Mutation ---
+
+    def _band_keys(self, sig: np.ndarray) -> list[bytes]:
+        return [sig[i * self._rows:(i + 1) * self._rows].tobytes() for i in range(self._bands)]
+
+    def _index(self, chunk_id: str, sig: np.ndarray):
+        self._signatures[chunk_id] = sig
+        for bucket, key in zip(self._buckets, self._band_keys(sig)):
+            bucket.setdefault(key, set()).add(chunk_id)
+
+    def _unindex(self, chunk_id: str) -> bool:
+        sig = self._signatures.pop(chunk_id, None)
+        if sig is None:
+            return False
+        for bucket, key in zip(self._buckets, self._band_keys(sig)):
+            members = bucket.get(key)
+            if members is not None:
+                members.discard(chunk_id)
+                if not members:
+                    del bucket[key]
+        # Anything linked to this chunk needs a new home
+        self._orphans.update(d for d, link in self._links.items() if link["canonical"] == chunk_id)
+        return True
+
+    def find(self, sig: np.ndarray, exclude: str | None = None) -> str | None:
+        """Most similar canonical chunk at or above the threshold."""
+        with self._lock:
+            candidates = set()
+            for bucket, key in zip(self._buckets, self._band_keys(sig)):
+                candidates |= bucket.get(key, set())
+            candidates.discard(exclude)
+            best, best_score = None, self.threshold
+            for chunk_id in sorted(candidates):
+                score = similarity(sig, self._signatures[chunk_id])
+                if score >= best_score and (best is None or score > best_score):
+                    best, best_score = chunk_id, score
+            return best
+
+    def check(self, chunk_id: str, document: str, metadata: dict) -> str | None:
+        """Register a chunk; return its canonical ID if it is a near-duplicate.
+
+        A new or rewritten chunk with no near-duplicate becomes canonical.
+        Otherwise it is linked to the existing copy and should not be
+        stored. A chunk that was canonical with different content orphans
+        its old duplicates.
+        """
+        if self.threshold <= 0:
+            return None
+        sig = self._hasher.signature(document)
+        with self._lock:
+            self._orphans.discard(chunk_id)
+            if sig is None:
+                self._links.pop(chunk_id, None)
+                self._unindex(chunk_id)
+                return None
+            canonical = self.find(sig, exclude=chunk_id)
+            previous = self._signatures.get(chunk_id)
+            if canonical is None:
+                self._links.pop(chunk_id, None)
+                if previous is None or not np.array_equal(previous, sig):
+                    self._unindex(chunk_id)
+                    self._index(chunk_id, sig)
+                return None
+            self._unindex(chunk_id)
+            self._links[chunk_id] = {"canonical": canonical, "document": document, "metadata": metadata}
+            return canonical
+
+    def remove(self, ids: list[str]):
+        """Forget chunks (canonical or linked); their duplicates become orphans."""
+        with self._lock:
+            for chunk_id in ids:
+                self._links.pop(chunk_id, None)
+                self._orphans.discard(chunk_id)
+                self._unindex(chunk_id)
+
+    def take_orphans(self) -> list[tuple[str, str, dict]]:
+        """Pop links whose canonical is gone as (id, document, metadata)."""
+        with self._lock:
+            orphans = []
+            for chunk_id in sorted(self._orphans):
+                link = self._links.pop(chunk_id, None)
+                if link is not None:
+                    orphans.append((chunk_id, link["document"], link["metadata"]))
+            self._orphans = set()
+            return orphans
+
+    # --- Query ---
+
+    def canonical_of(self, chunk_id: str) -> str | None:
+        """Canonical ID a duplicate is linked to (None if not a duplicate)."""
+        link = self._links.get(chunk_id)
+        return link["canonical"] if link else None
+
+    def duplicates_of(self, chunk_id: str) -> list[dict]:
+        """Metadata of every chunk linked to a canonical chunk."""
+        with self._lock:
+            return [
+                dict(link["metadata"], id=dup_id)
+                for dup_id, link in sorted(self._links.items())
+                if link["canonical"] == chunk_id
+            ]
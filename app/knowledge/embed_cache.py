@@ -0,0 +1,194 @@
+# Woodshed AI — Embedding Cache
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Persistent on-disk cache of text embeddings.
+
+Entries are keyed by (embedding model, SHA-256 of the text). Each model
+gets its own directory holding:
+
+- ``vectors.f32`` — raw float32 rows, read back through a memory map
+- ``index.txt``   — one text hash per line; line N names row N
+- ``meta.json``   — model name and vector dimension
+
+Rows are append-only: vectors are written before their index lines, so
+a crash mid-write leaves at worst an unreferenced tail, which the next
+append truncates. Appends take an exclusive lock on ``append.lock`` and
+first read any rows other processes added (say a CLI ingest running
+next to the API), so row numbers always match the files.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: one writing process at a time
+    fcntl = None
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _model_dirname(model: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", model)
+
+
+class EmbeddingCache:
+    """Append-only float32 embedding store for a single model."""
+
+    def __init__(self, model: str | None = None, cache_dir: Path | None = None):
+        self.model = model or config.EMBEDDING_MODEL
+        self.dir = Path(cache_dir or config.EMBED_CACHE_DIR) / _model_dirname(self.model)
+        self._vectors_path = self.dir / "vectors.f32"
+        self._index_path = self.dir / "index.txt"
+        self._meta_path = self.dir / "meta.json"
+
+        self._lock_path = self.dir / "append.lock"
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._rows: dict[str, int] = {}
+        self._count = 0  # index lines read so far (= rows committed)
+        self._index_offset = 0  # bytes of index.txt read so far
+        self._dim: int | None = None
+        self._mmap: np.memmap | None = None
+        self._load()
+
+    def _load(self):
+        if not self._meta_path.exists():
+            return
+        try:
+            meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if meta.get("model") != self.model:
+            return
+        self._dim = int(meta["dim"])
+        self._sync()
+
+    def _sync(self):
+        """Read index lines appended since the last call (by us or another process)."""
+        if not self._index_path.exists():
+            return
+        stored_rows = self._vectors_path.stat().st_size // (self._dim * 4) if self._vectors_path.exists() else 0
+        with open(self._index_path, "rb") as f:
+            f.seek(self._index_offset)
+            for line in f:
+                if not line.endswith(b"\n") or self._count >= stored_rows:
+                    break  # a partial line or an index ahead of its vectors
+                self._rows.setdefault(line.strip().decode("ascii"), self._count)
+                self._count += 1
+                self._index_offset += len(line)
+
+    @contextmanager
+    def _append_lock(self):
+        """Hold an exclusive lock on the cache directory across processes."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self._lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _matrix(self) -> np.ndarray:
+        """Return a read-only memmap covering every committed row."""
+        n = self._count
+        if self._mmap is None or self._mmap.shape[0] < n:
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(n, self._dim))
+        return self._mmap
+
+    def get_many(self, texts: list[str]) -> list[np.ndarray | None]:
+        """Look up embeddings; misses come back as None."""
+        keys = [text_hash(t) for t in texts]
+        with self._lock:
+            rows = [self._rows.get(k) for k in keys]
+            found = sum(r is not None for r in rows)
+            self.hits += found
+            self.misses += len(rows) - found
+            if not found:
+                return [None] * len(texts)
+            matrix = self._matrix()
+            return [np.array(matrix[r]) if r is not None else None for r in rows]
+
+    def put_many(self, texts: list[str], embeddings) -> None:
+        """Append embeddings for texts not already cached."""
+        if not texts:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        with self._lock, self._append_lock():
+            if self._dim is None:
+                self._load()  # another process may have created the cache
+            if self._dim is None:
+                self._dim = int(vectors.shape[1])
+                self._meta_path.write_text(
+                    json.dumps({"model": self.model, "dim": self._dim}), encoding="utf-8"
+                )
+            if vectors.shape[1] != self._dim:
+                return
+            self._sync()
+
+            new_keys, new_rows = [], []
+            for text, vec in zip(texts, vectors):
+                key = text_hash(text)
+                if key in self._rows or key in new_keys:
+                    continue
+                new_keys.append(key)
+                new_rows.append(vec)
+            if not new_keys:
+                return
+
+            # Row numbers come from the files, not from what this instance has seen
+            row_bytes = self._dim * 4
+            with open(self._vectors_path, "ab") as f:
+                if f.tell() != self._count * row_bytes:
+                    f.truncate(self._count * row_bytes)  # drop a crashed writer's tail
+                f.write(np.stack(new_rows).tobytes())
+            lines = "".join(k + "\n" for k in new_keys).encode("ascii")
+            with open(self._index_path, "ab") as f:
+                if f.tell() != self._index_offset:
+                    f.truncate(self._index_offset)
+                f.write(lines)
+            for i, key in enumerate(new_keys):
+                self._rows[key] = self._count + i
+            self._count += len(new_keys)
+            self._index_offset += len(lines)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model,
+            "entries": len(self._rows),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+# Shared cache instances, one per model
+_caches: dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(model: str | None = None) -> EmbeddingCache:
+    model = model or config.EMBEDDING_MODEL
+    with _caches_lock:
+        if model not in _caches:
+            _caches[model] = EmbeddingCache(model)
+        return _caches[model]
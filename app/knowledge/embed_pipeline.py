@@ -0,0 +1,260 @@
+# Woodshed AI — Batched Embedding Pipeline
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Overlapping chunk → embed → write pipeline for ingestion.
+
+The caller chunks documents and submits them; chunks are grouped into
+fixed-size batches, embedded by a bounded pool of concurrent batch calls
+(one ``ollama.embed(input=[...])`` request each, via the store's
+embedding function), and written to the collection in bulk by a single
+writer thread. All three stages run at the same time, so Ollama stays
+busy while the next file is being read and chunked. Deletes go through
+the same writer, so the store is only ever written from one thread.
+
+With config.COMPRESS_WARM_SPANS (and compression on, and the store's
+embeddings cached) each chunk's spans are embedded too, so query-time
+compression finds them in the cache instead of calling Ollama. That
+roughly doubles the embedding calls of an ingest, so it is off by
+default and spans are cached the first time a query needs them.
+"""
+
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import config
+from app.knowledge.compress import split_spans
+from app.knowledge.vectorstore import VectorStore
+
+
+@dataclass
+class PipelineStats:
+    """Throughput counters for one pipeline run."""
+    chunks: int = 0
+    batches: int = 0
+    embed_seconds: float = 0.0
+    write_seconds: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.chunks} chunks in {self.elapsed:.2f}s "
+            f"({self.chunks_per_second:.1f} chunks/s; "
+            f"embed {self.embed_seconds:.2f}s, write {self.write_seconds:.2f}s)"
+        )
+
+
+_STOP = object()
+
+
+class _Delete(NamedTuple):
+    """A delete for the writer thread: a VectorStore method and its arguments."""
+    method: Callable
+    args: tuple
+
+
+class EmbeddingPipeline:
+    """Batch, embed, and write chunks with bounded concurrency.
+
+    Use as a context manager, or call flush()/close() explicitly. Errors
+    raised by the embed or write stages are re-raised from submit(),
+    flush(), or close().
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        embed_fn: Callable[[list[str]], list[list[float]]] | None = None,
+        batch_size: int | None = None,
+        concurrency: int | None = None,
+        embed_spans: bool | None = None,
+    ):
+        self._store = store
+        self._embed_fn = embed_fn or store.embed_documents
+        if embed_spans is None:
+            embed_spans = config.COMPRESS_WARM_SPANS and config.COMPRESS_CONTEXT and store.embeddings_cached
+        self.embed_spans = embed_spans
+        self.batch_size = max(1, batch_size or config.EMBED_BATCH_SIZE)
+        self.concurrency = max(1, concurrency or config.EMBED_CONCURRENCY)
+        self.stats = PipelineStats()
+
+        self._buffer: tuple[list, list, list] = ([], [], [])
+        # Caps batches that are embedding or waiting to be written, which
+        # bounds memory and applies backpressure to the chunking stage
+        self._slots = threading.Semaphore(self.concurrency * 2)
+        self._pending = 0
+        self._pending_cond = threading.Condition()
+        self._error: BaseException | None = None
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="woodshed-embed"
+        )
+        self._write_queue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="woodshed-embed-writer", daemon=True
+        )
+        self._writer.start()
+        self._closed = False
+
+    # --- Stage 1: caller submits chunks ---
+
+    def submit(self, ids: list[str], documents: list[str], metadatas: list[dict]):
+        """Queue chunks for embedding. Blocks when the pipeline is saturated."""
+        self._raise_if_failed()
+        buf_ids, buf_docs, buf_metas = self._buffer
+        for i, doc_id in enumerate(ids):
+            buf_ids.append(doc_id)
+            buf_docs.append(documents[i])
+            buf_metas.append(metadatas[i])
+            if len(buf_ids) >= self.batch_size:
+                self._dispatch()
+                buf_ids, buf_docs, buf_metas = self._buffer
+
+    def _dispatch(self):
+        batch = self._buffer
+        if not batch[0]:
+            return
+        self._buffer = ([], [], [])
+        self._slots.acquire()
+        with self._pending_cond:
+            self._pending += 1
+        self._executor.submit(self._embed_batch, batch)
+
+    # --- Stage 2: concurrent embedding ---
+
+    def _embed_batch(self, batch):
+        ids, docs, metas = batch
+        try:
+            if self._error is None:
+                start = time.perf_counter()
+                embeddings = self._embed_fn(docs)
+                if self.embed_spans:
+                    # Results land in the embedding cache for compress_context()
+                    spans = [span for doc in docs for span in split_spans(doc)]
+                    if spans:
+                        self._embed_fn(spans)
+                with self._lock:
+                    self.stats.embed_seconds += time.perf_counter() - start
+                self._write_queue.put((ids, docs, metas, embeddings))
+                return
+        except BaseException as e:
+            self._fail(e)
+        self._finish_batch()
+
+    # --- Deletes, queued for the writer ---
+
+    def delete_ids(self, ids: list[str]):
+        """Delete chunks by ID on the writer thread (see _queue_delete)."""
+        if ids:
+            self._queue_delete(self._store.delete_ids, ids)
+
+    def delete_by_source(self, source: str, source_dir: str | None = None):
+        """Delete a source file's chunks on the writer thread (see _queue_delete)."""
+        self._queue_delete(self._store.delete_by_source, source, source_dir)
+
+    def _queue_delete(self, method: Callable, *args):
+        """Queue a delete behind the writes already queued.
+
+        Chunks submitted afterwards are written after it. Batches still
+        embedding may be written before or after it, so don't delete
+        chunks that are in flight.
+        """
+        self._raise_if_failed()
+        with self._pending_cond:
+            self._pending += 1
+        self._write_queue.put(_Delete(method, args))
+
+    # --- Stage 3: single bulk writer ---
+
+    def _write_loop(self):
+        while True:
+            item = self._write_queue.get()
+            if item is _STOP:
+                return
+            if isinstance(item, _Delete):
+                try:
+                    if self._error is None:
+                        item.method(*item.args)
+                except BaseException as e:
+                    self._fail(e)
+                with self._pending_cond:
+                    self._pending -= 1
+                    self._pending_cond.notify_all()
+                continue
+            ids, docs, metas, embeddings = item
+            try:
+                if self._error is None:
+                    start = time.perf_counter()
+                    self._store.upsert_documents(
+                        ids=ids, documents=docs, metadatas=metas, embeddings=embeddings
+                    )
+                    with self._lock:
+                        self.stats.write_seconds += time.perf_counter() - start
+                        self.stats.chunks += len(ids)
+                        self.stats.batches += 1
+            except BaseException as e:
+                self._fail(e)
+            self._finish_batch()
+
+    # --- Bookkeeping ---
+
+    def _finish_batch(self):
+        self._slots.release()
+        with self._pending_cond:
+            self._pending -= 1
+            self._pending_cond.notify_all()
+
+    def _fail(self, error: BaseException):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise self._error
+
+    def flush(self) -> PipelineStats:
+        """Embed and write everything submitted so far, then return stats."""
+        self._dispatch()
+        with self._pending_cond:
+            self._pending_cond.wait_for(lambda: self._pending == 0)
+        self.stats.elapsed = time.perf_counter() - self._started
+        self._raise_if_failed()
+        return self.stats
+
+    def close(self) -> PipelineStats:
+        """Flush and shut down the worker threads."""
+        if self._closed:
+            return self.stats
+        try:
+            return self.flush()
+        finally:
+            self._closed = True
+            self._executor.shutdown(wait=True)
+            self._write_queue.put(_STOP)
+            self._writer.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Don't mask the original error with a pipeline one
+            try:
+                self.close()
+            except Exception:
+                pass
+        return False
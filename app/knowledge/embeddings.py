@@ -4,11 +4,82 @@
 
 """Embedding generation via Ollama for the knowledge base.
 
-ChromaDB handles embeddings internally via OllamaEmbeddingFunction,
-but this module exposes the standalone embedding API for use outside
-the vector store (e.g., for similarity comparisons in the RAG pipeline).
+Both entry points here read through the shared on-disk EmbeddingCache,
+so text that has been embedded once — by ingest, by a search, or by
+the RAG pipeline — never goes back to Ollama for the same model.
 """
 
-from app.llm.ollama_client import get_embedding
+import numpy as np
+from chromadb.utils.embedding_functions import OllamaEmbeddingFunction
 
-__all__ = ["get_embedding"]
+import config
+from app.knowledge.embed_cache import get_cache
+from app.knowledge.io_executor import get_io_executor
+from app.llm import ollama_client
+
+
+def get_embedding(text: str, model: str | None = None) -> list[float]:
+    """Generate an embedding vector for the given text (cached)."""
+    cache = get_cache(model)
+    cached = cache.get_many([text])[0]
+    if cached is not None:
+        return cached.tolist()
+    embedding = ollama_client.get_embedding(text, model=cache.model)
+    cache.put_many([text], [embedding])
+    return embedding
+
+
+async def aget_embeddings(texts: list[str], model: str | None = None) -> list[list[float]]:
+    """Embed texts over Ollama's async API, reading through the cache.
+
+    Cache reads and writes are file I/O under a lock, so they run on the
+    I/O executor; only the Ollama call is awaited on the event loop.
+    """
+    io = get_io_executor()
+    cache = await io.run(get_cache, model)
+    found = await io.run(cache.get_many, texts)
+    missing = [i for i, vec in enumerate(found) if vec is None]
+    if missing:
+        fresh = await ollama_client.aembed([texts[i] for i in missing], model=cache.model)
+        await io.run(cache.put_many, [texts[i] for i in missing], fresh)
+        for i, vec in zip(missing, fresh):
+            found[i] = vec
+    return [list(map(float, vec)) for vec in found]
+
+
+class CachedOllamaEmbeddingFunction(OllamaEmbeddingFunction):
+    """Chroma's Ollama embedding function with the shared cache in front.
+
+    Keeps the parent's name() and config so collections created with the
+    plain OllamaEmbeddingFunction still open with this one.
+    """
+
+    def __call__(self, input):
+        cache = get_cache(self.model_name)
+        found = cache.get_many(list(input))
+        missing = [i for i, vec in enumerate(found) if vec is None]
+        if missing:
+            fresh = super().__call__([input[i] for i in missing])
+            cache.put_many([input[i] for i in missing], fresh)
+            for i, vec in zip(missing, fresh):
+                found[i] = np.asarray(vec, dtype=np.float32)
+        return found
+
+    @staticmethod
+    def build_from_config(config_dict):
+        return CachedOllamaEmbeddingFunction(
+            url=config_dict["url"],
+            model_name=config_dict["model_name"],
+            timeout=config_dict["timeout"],
+        )
+
+
+def get_embedding_function() -> CachedOllamaEmbeddingFunction:
+    """Create the cached Ollama embedding function used by the vector store."""
+    return CachedOllamaEmbeddingFunction(
+        url=config.OLLAMA_HOST,
+        model_name=config.EMBEDDING_MODEL,
+    )
+
+
+__all__ = ["get_embedding", "aget_embeddings", "get_embedding_function", "CachedOllamaEmbeddingFunction"]
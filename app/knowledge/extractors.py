@@ -0,0 +1,369 @@
+# Woodshed AI — Document Extractors
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Pluggable text extraction for knowledge-base source files.
+
+Each extractor streams a document as a sequence of pages — PDF pages,
+EPUB chapters (spine items), or the heading-delimited sections of an
+HTML file — and each page is run through the chunker on its own, so
+chunks carry the page and section they came from. Documents are never
+held in memory whole: HTML is fed to the parser in blocks, EPUB
+chapters are read straight out of the zip, and PDF pages are extracted
+one at a time.
+
+Extractors that can count their pages up front (PDF, EPUB) can be split
+into page ranges, which ingest extracts in parallel across processes.
+"""
+
+import io
+import posixpath
+import re
+import zipfile
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import unquote
+from xml.etree import ElementTree
+
+from app.knowledge.chunker import (
+    CHARS_PER_TOKEN,
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    Chunk,
+    _iter_fragments,
+    iter_file_chunks,
+    iter_token_chunks,
+)
+
+READ_BLOCK_SIZE = 1 << 16  # characters fed to the HTML parser at a time
+PAGE_MAX_CHARS = 1 << 16  # an HTML section longer than this is split into several pages
+
+
+class ExtractorUnavailable(RuntimeError):
+    """Raised when an extractor's optional dependency isn't installed."""
+
+
+@dataclass
+class Page:
+    """One unit of extracted text: a PDF page, EPUB chapter, or HTML section."""
+    text: str
+    page: int | None = None  # 1-based page (PDF) or chapter (EPUB) number
+    section: str | None = None  # nearest heading or outline entry
+
+
+class Extractor(ABC):
+    """Base extractor: subclasses yield pages, chunks() chunks them."""
+
+    suffixes: tuple[str, ...] = ()
+
+    def available(self) -> bool:
+        return True
+
+    def page_count(self, path: Path) -> int | None:
+        """Number of pages, if the document can be split into page ranges."""
+        return None
+
+    @abstractmethod
+    def pages(self, path: Path, start: int = 0, stop: int | None = None) -> Iterator[Page]:
+        """Yield pages [start, stop) of a document."""
+
+    def chunks(
+        self,
+        path: Path,
+        start: int = 0,
+        stop: int | None = None,
+        chunk_size: int = CHUNK_SIZE,
+        overlap: int = CHUNK_OVERLAP,
+    ) -> Iterator[Chunk]:
+        """Chunk pages [start, stop) of a document, one page at a time."""
+        max_chars = chunk_size * CHARS_PER_TOKEN
+        for page in self.pages(path, start, stop):
+            fragments = _iter_fragments(io.StringIO(page.text), max_chars)
+            for chunk in iter_token_chunks(fragments, chunk_size, overlap):
+                chunk.page, chunk.section = page.page, page.section
+                yield chunk
+
+
+class TextExtractor(Extractor):
+    """Markdown and plain text, streamed straight through the chunker."""
+
+    suffixes = (".md", ".txt")
+
+    def pages(self, path, start=0, stop=None):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            while text := f.read(PAGE_MAX_CHARS):
+                yield Page(text)
+
+    def chunks(self, path, start=0, stop=None, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+        return iter_file_chunks(path, chunk_size, overlap)
+
+
+# --- HTML ---
+
+_SKIP_TAGS = {"script", "style", "head", "noscript", "svg", "template"}
+_BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "figcaption",
+    "figure", "footer", "header", "hr", "main", "nav", "ol", "p", "section", "ul",
+}
+_SECTION_LEVEL = 2  # h1/h2 start a new page; h3 and below stay inline as markdown headings
+
+
+class _HtmlText(HTMLParser):
+    """Incremental HTML to markdown-ish text, split into section pages.
+
+    Headings become markdown headings (so the chunker splits on them),
+    table rows become pipe-delimited lines, and completed pages are
+    collected in self.done as parsing goes.
+    """
+
+    def __init__(self, page: int | None = None, section: str | None = None):
+        super().__init__(convert_charrefs=True)
+        self.page = page
+        self.section = section
+        self.done: list[Page] = []
+        self._parts: list[str] = []
+        self._size = 0
+        self._skip = 0
+        self._pre = 0
+        self._heading: list[str] | None = None
+
+    def _write(self, text: str):
+        self._parts.append(text)
+        self._size += len(text)
+        # Split over-long sections at a block boundary (or anywhere, if
+        # a single block runs on far too long)
+        boundary = text.startswith("\n") or self._size > 2 * PAGE_MAX_CHARS
+        if self._size > PAGE_MAX_CHARS and boundary and self._heading is None:
+            self._flush()
+
+    def _flush(self):
+        text = _tidy("".join(self._parts))
+        if text:
+            self.done.append(Page(text, self.page, self.section))
+        self._parts, self._size = [], 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif self._skip:
+            return
+        elif re.fullmatch(r"h[1-6]", tag):
+            level = int(tag[1])
+            if level <= _SECTION_LEVEL:
+                self._flush()
+            self._heading = []
+            self._write("\n\n" + "#" * min(level, 3) + " ")
+        elif tag == "pre":
+            self._pre += 1
+            self._write("\n\n")
+        elif tag == "br":
+            self._write("\n")
+        elif tag == "tr":
+            self._write("\n|")
+        elif tag in ("td", "th"):
+            self._write(" ")
+        elif tag == "li":
+            self._write("\n- ")
+        elif tag == "table" or tag in _BLOCK_TAGS:
+            self._write("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif self._skip:
+            return
+        elif re.fullmatch(r"h[1-6]", tag) and self._heading is not None:
+            title = " ".join("".join(self._heading).split())
+            if int(tag[1]) <= _SECTION_LEVEL and title:
+                self.section = title
+            self._heading = None
+            self._write("\n\n")
+        elif tag == "pre":
+            self._pre = max(0, self._pre - 1)
+            self._write("\n\n")
+        elif tag in ("td", "th"):
+            self._write(" |")
+        elif tag == "table" or tag in _BLOCK_TAGS:
+            self._write("\n\n")
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if not self._pre:
+            data = re.sub(r"\s+", " ", data)
+        if self._heading is not None:
+            self._heading.append(data)
+        self._write(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def _tidy(text: str) -> str:
+    """Trim spaces around line breaks and collapse runs of blank lines."""
+    text = re.sub(r"[ \t]*\n[ \t]*", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def _iter_html(stream, page: int | None = None) -> Iterator[Page]:
+    """Stream pages from an HTML text stream, parsing it block by block."""
+    parser = _HtmlText(page)
+    for block in iter(lambda: stream.read(READ_BLOCK_SIZE), ""):
+        parser.feed(block)
+        yield from parser.done
+        parser.done = []
+    parser.close()
+    yield from parser.done
+
+
+class HtmlExtractor(Extractor):
+    """HTML pages, split into sections at h1/h2 headings."""
+
+    suffixes = (".html", ".htm", ".xhtml")
+
+    def pages(self, path, start=0, stop=None):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            yield from _iter_html(f)
+
+
+# --- EPUB ---
+
+_CONTAINER = "META-INF/container.xml"
+
+
+def _local(tag: str) -> str:
+    """Tag name without its XML namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _epub_spine(archive: zipfile.ZipFile) -> list[str]:
+    """Archive paths of the book's content documents, in reading order."""
+    try:
+        container = ElementTree.fromstring(archive.read(_CONTAINER))
+        rootfile = next(el for el in container.iter() if _local(el.tag) == "rootfile")
+        opf_path = rootfile.attrib["full-path"]
+        opf = ElementTree.fromstring(archive.read(opf_path))
+    except (KeyError, StopIteration, ElementTree.ParseError) as exc:
+        raise ValueError(f"Not a readable EPUB: {exc}") from exc
+    base = posixpath.dirname(opf_path)
+    hrefs = {
+        el.attrib.get("id"): el.attrib.get("href", "")
+        for el in opf.iter() if _local(el.tag) == "item"
+    }
+    spine = []
+    for el in opf.iter():
+        if _local(el.tag) == "itemref" and el.attrib.get("idref") in hrefs:
+            href = unquote(hrefs[el.attrib["idref"]].split("#", 1)[0])
+            spine.append(posixpath.normpath(posixpath.join(base, href)))
+    return spine
+
+
+class EpubExtractor(Extractor):
+    """EPUB books; each chapter (spine item) is one page."""
+
+    suffixes = (".epub",)
+
+    def page_count(self, path):
+        with zipfile.ZipFile(path) as archive:
+            return len(_epub_spine(archive))
+
+    def pages(self, path, start=0, stop=None):
+        with zipfile.ZipFile(path) as archive:
+            spine = _epub_spine(archive)
+            for number, name in enumerate(spine[start:stop], start=start + 1):
+                try:
+                    member = archive.open(name)
+                except KeyError:
+                    continue  # listed in the spine but missing from the archive
+                with io.TextIOWrapper(member, encoding="utf-8", errors="replace") as f:
+                    yield from _iter_html(f, page=number)
+
+
+# --- PDF ---
+
+def _pdf_reader(path: Path):
+    try:
+        from pypdf import PdfReader
+    except ImportError as exc:
+        raise ExtractorUnavailable("PDF ingestion needs pypdf: pip install pypdf") from exc
+    return PdfReader(path)
+
+
+def _outline_starts(reader) -> list[tuple[int, str]]:
+    """(page index, title) for every outline entry, sorted by page."""
+    starts = []
+
+    def walk(items):
+        for item in items:
+            if isinstance(item, list):
+                walk(item)
+                continue
+            try:
+                starts.append((reader.get_destination_page_number(item), str(item.title).strip()))
+            except Exception:
+                continue  # entries that point nowhere are common in the wild
+
+    try:
+        walk(reader.outline)
+    except Exception:
+        return []
+    return sorted(s for s in starts if s[0] is not None and s[0] >= 0 and s[1])
+
+
+class PdfExtractor(Extractor):
+    """PDF documents, page by page, with sections from the outline (needs pypdf)."""
+
+    suffixes = (".pdf",)
+
+    def available(self):
+        try:
+            import pypdf  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def page_count(self, path):
+        return len(_pdf_reader(path).pages)
+
+    def pages(self, path, start=0, stop=None):
+        reader = _pdf_reader(path)
+        outline = _outline_starts(reader)
+        stop = len(reader.pages) if stop is None else min(stop, len(reader.pages))
+        for index in range(start, stop):
+            section = None
+            for first, title in outline:
+                if first > index:
+                    break
+                section = title
+            text = reader.pages[index].extract_text() or ""
+            if text.strip():
+                yield Page(_tidy(text), index + 1, section)
+
+
+# --- Registry ---
+
+EXTRACTORS: dict[str, Extractor] = {}
+
+
+def register_extractor(extractor: Extractor):
+    """Handle the extractor's suffixes with it (replacing any existing one)."""
+    for suffix in extractor.suffixes:
+        EXTRACTORS[suffix.lower()] = extractor
+
+
+for _extractor in (TextExtractor(), HtmlExtractor(), EpubExtractor(), PdfExtractor()):
+    register_extractor(_extractor)
+
+
+def get_extractor(path: Path) -> Extractor | None:
+    """The extractor for a file, or None if its type isn't ingested."""
+    return EXTRACTORS.get(Path(path).suffix.lower())
+
+
+def source_suffixes() -> tuple[str, ...]:
+    """Every file suffix ingest picks up."""
+    return tuple(sorted(EXTRACTORS))
@@ -5,90 +5,29 @@
 """Pipeline for ingesting music theory documents into the knowledge base."""
 
 import argparse
-import re
+import multiprocessing
 import sys
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 
 # Ensure project root is on path when run as module
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 import config
+from app.knowledge.chunker import Chunk, chunk_text as _chunk_text, chunker_version
+from app.knowledge.dedup import DedupIndex
+from app.knowledge.embed_pipeline import EmbeddingPipeline, PipelineStats
+from app.knowledge.extractors import get_extractor, source_suffixes
+from app.knowledge.manifest import IngestManifest, hash_file
 from app.knowledge.vectorstore import VectorStore
 
 
-# Chunking parameters
-CHUNK_SIZE = 500  # target tokens (approx 4 chars per token)
-CHUNK_OVERLAP = 50  # overlap tokens
-CHARS_PER_TOKEN = 4  # rough approximation
-
-
-def _split_into_sections(text: str) -> list[str]:
-    """Split markdown text on headings (##, ###) to get logical sections."""
-    # Split on markdown headings (keep the heading with its section)
-    parts = re.split(r"(?=^#{1,3} )", text, flags=re.MULTILINE)
-    return [p.strip() for p in parts if p.strip()]
-
-
-def _chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list[str]:
-    """Split text into overlapping chunks of roughly chunk_size tokens.
-
-    Strategy: split into sections first (by headings), then split large
-    sections by paragraphs, then combine small pieces to fill chunks.
-    """
-    max_chars = chunk_size * CHARS_PER_TOKEN
-    overlap_chars = overlap * CHARS_PER_TOKEN
-
-    sections = _split_into_sections(text)
-
-    # Further split large sections by paragraphs
-    pieces = []
-    for section in sections:
-        if len(section) <= max_chars:
-            pieces.append(section)
-        else:
-            # Split by double newline (paragraphs)
-            paragraphs = re.split(r"\n\n+", section)
-            for para in paragraphs:
-                if para.strip():
-                    pieces.append(para.strip())
-
-    # Combine small pieces into chunks of target size with overlap
-    chunks = []
-    current = ""
-    for piece in pieces:
-        candidate = (current + "\n\n" + piece).strip() if current else piece
-        if len(candidate) <= max_chars:
-            current = candidate
-        else:
-            if current:
-                chunks.append(current)
-            # If this single piece exceeds max, force-split it
-            if len(piece) > max_chars:
-                words = piece.split()
-                current = ""
-                for word in words:
-                    test = (current + " " + word).strip() if current else word
-                    if len(test) <= max_chars:
-                        current = test
-                    else:
-                        if current:
-                            chunks.append(current)
-                        current = word
-            else:
-                current = piece
-
-    if current:
-        chunks.append(current)
-
-    # Apply overlap: prepend tail of previous chunk to each chunk
-    if overlap_chars > 0 and len(chunks) > 1:
-        overlapped = [chunks[0]]
-        for i in range(1, len(chunks)):
-            prev_tail = chunks[i - 1][-overlap_chars:]
-            overlapped.append(prev_tail + "\n\n" + chunks[i])
-        chunks = overlapped
-
-    return chunks
+# Files are streamed through the chunker and submitted in batches of this size
+INGEST_BATCH_SIZE = 64
 
 
 def _detect_category(filepath: Path) -> str:
@@ -123,83 +62,441 @@ def _detect_category(filepath: Path) -> str:
     return "general"
 
 
+@dataclass
+class _PreparedFile:
+    """A file that has been hashed and, if its content changed, chunked."""
+    digest: str
+    category: str = "general"
+    chunks: Iterable[Chunk] | None = None  # None when the content hash matched
+    pages: int | None = None  # set instead of chunks when pages are extracted in parallel
+
+
+def _prepare_file(filepath: Path, known_digest: str | None, stream: bool = True) -> _PreparedFile:
+    """Hash a file and chunk it unless its content is already indexed.
+
+    With stream=True chunks are produced lazily as they're consumed.
+    Otherwise they're materialized so the result can cross a process
+    boundary — except for paged documents (PDF, EPUB), which only report
+    their page count so the pages can be split across workers.
+    """
+    digest = hash_file(filepath)
+    if digest == known_digest:
+        return _PreparedFile(digest)
+    category = _detect_category(filepath)
+    extractor = get_extractor(filepath)
+    if not stream:
+        pages = extractor.page_count(filepath)
+        if pages is not None:
+            return _PreparedFile(digest, category, pages=pages)
+    chunks = extractor.chunks(filepath)
+    return _PreparedFile(digest, category, chunks if stream else list(chunks))
+
+
+def _extract_pages(filepath: Path, start: int, stop: int) -> list[Chunk]:
+    """Chunk one page range of a paged document (runs in a worker)."""
+    return list(get_extractor(filepath).chunks(filepath, start, stop))
+
+
+def _iter_page_chunks(executor, filepath: Path, pages: int, window: int) -> Iterator[Chunk]:
+    """Yield a paged document's chunks in order, extracting page ranges in parallel.
+
+    At most window ranges are in flight, so memory is bounded by a few
+    ranges' worth of chunks however long the document is.
+    """
+    step = max(1, config.INGEST_PAGES_PER_TASK)
+    ranges = iter(range(0, pages, step))
+    in_flight: deque = deque()
+
+    def submit_next():
+        start = next(ranges, None)
+        if start is not None:
+            in_flight.append(executor.submit(_extract_pages, filepath, start, min(start + step, pages)))
+
+    for _ in range(window):
+        submit_next()
+    while in_flight:
+        future = in_flight.popleft()
+        submit_next()
+        yield from future.result()
+
+
+def _iter_prepared(
+    candidates: list[tuple[Path, str | None]],
+    workers: int,
+) -> Iterator[tuple[Path, _PreparedFile]]:
+    """Yield (path, prepared) in order, preparing files in a process pool.
+
+    Only a few files per worker are in flight at once, so memory stays
+    bounded however large the directory is.
+    """
+    if workers <= 1 or len(candidates) <= 1:
+        for filepath, known_digest in candidates:
+            yield filepath, _prepare_file(filepath, known_digest)
+        return
+
+    # spawn, not fork: the parent already runs embedding threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        pending = iter(candidates)
+        in_flight: deque = deque()
+
+        def submit_next():
+            item = next(pending, None)
+            if item is not None:
+                in_flight.append((item[0], executor.submit(_prepare_file, item[0], item[1], False)))
+
+        for _ in range(workers * 2):
+            submit_next()
+        while in_flight:
+            filepath, future = in_flight.popleft()
+            submit_next()
+            prepared = future.result()
+            if prepared.pages is not None:
+                prepared.chunks = _iter_page_chunks(executor, filepath, prepared.pages, workers * 2)
+            yield filepath, prepared
+
+
+def _chunk_id(source_label: str, filepath: Path, index: int) -> str:
+    """Chunk IDs use the full filename, so notes.md and notes.txt don't collide."""
+    return f"{source_label}_{filepath.name}_{index}"
+
+
+def _has_legacy_ids(entry: dict, source_label: str, filepath: Path) -> bool:
+    """True if a manifest entry still uses the old stem-based IDs of text files."""
+    ids = entry["chunk_ids"]
+    return bool(ids) and ids[0] != _chunk_id(source_label, filepath, 0)
+
+
+def _submit_chunks(
+    chunks: Iterable[Chunk],
+    filepath: Path,
+    source_label: str,
+    category: str,
+    pipeline: EmbeddingPipeline,
+    batch_size: int = INGEST_BATCH_SIZE,
+    dedup: DedupIndex | None = None,
+) -> list[str]:
+    """Feed a file's chunks into the pipeline in fixed-size batches.
+
+    With a DedupIndex, near-duplicates of chunks already seen are linked
+    to their canonical copy instead of being embedded and stored.
+
+    Returns the file's chunk IDs (stored and linked), in order.
+    """
+    ids: list[str] = []
+    batch_ids: list[str] = []
+    batch_docs: list[str] = []
+    batch_metas: list[dict] = []
+    for chunk in chunks:
+        chunk_id = _chunk_id(source_label, filepath, len(ids))
+        # No total_chunks: batches are stored before the count is known (the manifest has it)
+        metadata = {
+            "source": filepath.name,
+            "source_dir": source_label,
+            "category": category,
+            "chunk_index": len(ids),
+            "token_count": chunk.tokens,
+        }
+        if chunk.page is not None:
+            metadata["page"] = chunk.page
+        if chunk.section:
+            metadata["section"] = chunk.section
+        ids.append(chunk_id)
+        if dedup is not None and dedup.check(chunk_id, chunk.text, metadata):
+            continue
+        batch_ids.append(chunk_id)
+        batch_docs.append(chunk.text)
+        batch_metas.append(metadata)
+        if len(batch_ids) >= batch_size:
+            pipeline.submit(ids=batch_ids, documents=batch_docs, metadatas=batch_metas)
+            batch_ids, batch_docs, batch_metas = [], [], []
+    if batch_ids:
+        pipeline.submit(ids=batch_ids, documents=batch_docs, metadatas=batch_metas)
+    return ids
+
+
+def _rehome_orphans(dedup: DedupIndex, pipeline: EmbeddingPipeline) -> int:
+    """Relink duplicates whose canonical chunk was deleted or rewritten.
+
+    Each orphan is linked to another near-duplicate if one remains,
+    otherwise it is stored and becomes canonical itself. Returns the
+    number of chunks stored.
+    """
+    promoted_ids: list[str] = []
+    promoted_docs: list[str] = []
+    promoted_metas: list[dict] = []
+    for chunk_id, document, metadata in dedup.take_orphans():
+        if dedup.check(chunk_id, document, metadata) is None:
+            promoted_ids.append(chunk_id)
+            promoted_docs.append(document)
+            promoted_metas.append(metadata)
+    if promoted_ids:
+        pipeline.submit(ids=promoted_ids, documents=promoted_docs, metadatas=promoted_metas)
+    return len(promoted_ids)
+
+
+@dataclass
+class IngestReport:
+    """What an ingest run did, file by file."""
+    added: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)  # no extractor available (e.g. PDF without pypdf)
+    chunks_written: int = 0
+    chunks_deleted: int = 0
+    chunks_linked: int = 0  # near-duplicates linked to a canonical chunk instead of stored
+    embed_stats: PipelineStats | None = None
+    elapsed: float = 0.0
+
+    @property
+    def files_seen(self) -> int:
+        return len(self.added) + len(self.changed) + len(self.unchanged)
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files_seen / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        linked = f", {self.chunks_linked} duplicates linked" if self.chunks_linked else ""
+        skipped = f", {len(self.skipped)} skipped" if self.skipped else ""
+        return (
+            f"{len(self.added)} added, {len(self.changed)} changed, "
+            f"{len(self.unchanged)} unchanged, {len(self.removed)} removed{skipped} "
+            f"({self.chunks_written} chunks written, {self.chunks_deleted} deleted{linked})"
+        )
+
+
 def ingest_directory(
     directory: Path,
     source_label: str,
     store: VectorStore,
     verbose: bool = True,
+    report: IngestReport | None = None,
+    pipeline: EmbeddingPipeline | None = None,
+    workers: int | None = None,
+    dedup_threshold: float | None = None,
 ) -> int:
-    """Ingest all .md and .txt files from a directory into the vector store.
-
-    Returns the number of new chunks added.
+    """Incrementally ingest every supported file in a directory.
+
+    Markdown and text are always supported; HTML, EPUB, and PDF go
+    through app.knowledge.extractors (PDF needs pypdf, and is skipped
+    with a warning without it). Chunks from paged documents carry page
+    and section metadata.
+
+    A manifest next to the collection records each file's size, mtime,
+    and content hash. Unchanged files are skipped, edited files are
+    re-chunked and upserted (dropping any chunks past the new end), and
+    files that disappeared have their chunks deleted.
+
+    Chunks are embedded and written through an EmbeddingPipeline, so the
+    next file is chunked while earlier batches are still embedding. Stale
+    chunks are deleted through the pipeline's writer too, so nothing
+    writes to the store while it is upserting.
+
+    Args:
+        report: Optional IngestReport to collect per-file outcomes.
+        pipeline: Optional shared EmbeddingPipeline. If omitted, one is
+            created for this directory and closed before returning.
+        workers: Processes used to hash and chunk files (default
+            config.INGEST_WORKERS). With 1, files are streamed through
+            the chunker in this process. PDF and EPUB pages are split
+            across the workers in ranges of config.INGEST_PAGES_PER_TASK.
+        dedup_threshold: Estimated Jaccard similarity at which a chunk
+            counts as a near-duplicate of one already stored (default
+            config.DEDUP_THRESHOLD; 0 disables deduplication).
+
+    Returns the number of chunks written.
     """
     if not directory.exists():
         if verbose:
             print(f"  Directory not found: {directory}")
         return 0
 
-    files = sorted(list(directory.glob("*.md")) + list(directory.glob("*.txt")))
-    if not files:
-        if verbose:
-            print(f"  No .md or .txt files in {directory}")
-        return 0
-
-    total_added = 0
-    for filepath in files:
-        text = filepath.read_text(encoding="utf-8")
-        if not text.strip():
-            continue
-
-        chunks = _chunk_text(text)
-        category = _detect_category(filepath)
-
-        ids = [f"{source_label}_{filepath.stem}_{i}" for i in range(len(chunks))]
-        metadatas = [
-            {
-                "source": filepath.name,
-                "source_dir": source_label,
-                "category": category,
-                "chunk_index": i,
-                "total_chunks": len(chunks),
-            }
-            for i in range(len(chunks))
-        ]
-
-        added = store.add_documents(ids=ids, documents=chunks, metadatas=metadatas)
-        total_added += added
-        if verbose:
-            print(f"  {filepath.name}: {len(chunks)} chunks ({added} new) [{category}]")
-
-    return total_added
+    report = report if report is not None else IngestReport()
+    workers = max(1, workers or config.INGEST_WORKERS)
+    started = time.perf_counter()
+    manifest = IngestManifest(store.manifest_path)
+    version = chunker_version()
+    threshold = config.DEDUP_THRESHOLD if dedup_threshold is None else dedup_threshold
+    dedup = DedupIndex(store.dedup_path, threshold) if threshold > 0 else None
+    if dedup is not None and len(dedup) != store.collection.count():
+        dedup.rebuild(store.collection)
+    written_before = report.chunks_written
+    owns_pipeline = pipeline is None
+    if owns_pipeline:
+        pipeline = EmbeddingPipeline(store)
+
+    suffixes = source_suffixes()
+    files = sorted(p for p in directory.iterdir() if p.is_file() and p.suffix.lower() in suffixes)
+    if not files and verbose:
+        print(f"  No {', '.join(suffixes)} files in {directory}")
+
+    try:
+        seen = set()
+        candidates = []
+        for filepath in files:
+            # Keep the chunks of files we can't read right now rather than delete them
+            seen.add(filepath.name)
+            if not get_extractor(filepath).available():
+                report.skipped.append(filepath.name)
+                if verbose:
+                    print(f"  {filepath.name}: skipped (no extractor installed for {filepath.suffix})")
+                continue
+            stat = filepath.stat()
+            entry = manifest.get(source_label, filepath.name)
+            if entry and (entry.get("chunker") != version or _has_legacy_ids(entry, source_label, filepath)):
+                # Chunked with another chunker or tokenizer, or stored under the old
+                # stem-based IDs: re-chunk even if unchanged
+                candidates.append((filepath, None))
+                continue
+
+            # Fast path: size and mtime match — don't even read the file
+            if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                report.unchanged.append(filepath.name)
+                continue
+            candidates.append((filepath, entry["sha256"] if entry else None))
+
+        for n, (filepath, prepared) in enumerate(_iter_prepared(candidates, workers), start=1):
+            stat = filepath.stat()
+            entry = manifest.get(source_label, filepath.name)
+            if prepared.chunks is None:
+                # Touched but not edited — just refresh the fingerprint
+                manifest.set(
+                    source_label, filepath, stat.st_size, stat.st_mtime, prepared.digest, entry["chunk_ids"], version,
+                )
+                report.unchanged.append(filepath.name)
+                continue
+
+            category = prepared.category
+            if entry:
+                report.changed.append(filepath.name)
+            else:
+                # Not in the manifest — clear anything a pre-manifest ingest left behind
+                pipeline.delete_by_source(filepath.name, source_dir=source_label)
+                report.added.append(filepath.name)
+
+            ids = _submit_chunks(prepared.chunks, filepath, source_label, category, pipeline, dedup=dedup)
+            linked = [cid for cid in ids if dedup is not None and dedup.canonical_of(cid)]
+            report.chunks_written += len(ids) - len(linked)
+            report.chunks_linked += len(linked)
+            if entry:
+                new_ids = set(ids)
+                stale = [cid for cid in entry["chunk_ids"] if cid not in new_ids]
+                # Chunks that are now duplicates may still be stored from the last run
+                pipeline.delete_ids(stale + linked)
+                if dedup is not None:
+                    dedup.remove(stale)
+                report.chunks_deleted += len(stale)
+            manifest.set(source_label, filepath, stat.st_size, stat.st_mtime, prepared.digest, ids, version)
+            if verbose:
+                status = "updated" if entry else "new"
+                dups = f", {len(linked)} duplicates linked" if linked else ""
+                print(f"  [{n}/{len(candidates)}] {filepath.name}: {len(ids)} chunks ({status}{dups}) [{category}]")
+
+        for name in manifest.filenames(source_label):
+            if name in seen:
+                continue
+            entry = manifest.remove(source_label, name)
+            pipeline.delete_ids(entry["chunk_ids"])
+            if dedup is not None:
+                dedup.remove(entry["chunk_ids"])
+            report.removed.append(name)
+            report.chunks_deleted += len(entry["chunk_ids"])
+            if verbose:
+                print(f"  {name}: removed ({len(entry['chunk_ids'])} chunks deleted)")
+
+        if dedup is not None:
+            report.chunks_written += _rehome_orphans(dedup, pipeline)
+
+    except BaseException:
+        if owns_pipeline:
+            try:
+                pipeline.close()
+            except Exception:
+                pass
+        raise
+
+    # Only record files in the manifest once their chunks are stored
+    stats = pipeline.close() if owns_pipeline else pipeline.flush()
+    report.embed_stats = stats
+    report.elapsed += time.perf_counter() - started
+    store.persist()
+    manifest.save()
+    if dedup is not None:
+        dedup.save()
+    if verbose:
+        print(f"  {source_label}: {report.summary()}")
+        if owns_pipeline and stats.chunks:
+            print(f"  Throughput: {stats.summary()}")
+    return report.chunks_written - written_before
+
+
+def _peak_rss_mb() -> dict:
+    """Peak resident set size of this process and its finished workers, in MB."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return {"main": None, "workers": None}
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 / (1 << 20) if sys.platform == "darwin" else 1 / 1024
+    return {
+        "main": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale, 1),
+        "workers": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale, 1),
+    }
 
 
-def ingest_all(starter_only: bool = False, local_only: bool = False, verbose: bool = True) -> dict:
+def ingest_all(
+    starter_only: bool = False,
+    local_only: bool = False,
+    verbose: bool = True,
+    batch_size: int | None = None,
+    embed_concurrency: int | None = None,
+    workers: int | None = None,
+    dedup_threshold: float | None = None,
+) -> dict:
     """Run the full ingestion pipeline.
 
-    Returns stats dict with counts.
+    Returns stats dict with counts and throughput.
     """
     store = VectorStore()
 
     starter_count = 0
     local_count = 0
-
-    if not local_only:
-        if verbose:
-            print("Ingesting starter docs...")
-        starter_count = ingest_directory(
-            config.STARTER_DATA_DIR, "starter", store, verbose=verbose
-        )
-
-    if not starter_only:
-        if verbose:
-            print("Ingesting local docs...")
-        local_count = ingest_directory(
-            config.LOCAL_SOURCES_DIR, "local", store, verbose=verbose
-        )
+    report = IngestReport()
+    started = time.perf_counter()
+
+    with EmbeddingPipeline(store, batch_size=batch_size, concurrency=embed_concurrency) as pipeline:
+        if not local_only:
+            if verbose:
+                print("Ingesting starter docs...")
+            starter_count = ingest_directory(
+                config.STARTER_DATA_DIR, "starter", store,
+                verbose=verbose, report=report, pipeline=pipeline, workers=workers,
+                dedup_threshold=dedup_threshold,
+            )
+
+        if not starter_only:
+            if verbose:
+                print("Ingesting local docs...")
+            local_count = ingest_directory(
+                config.LOCAL_SOURCES_DIR, "local", store,
+                verbose=verbose, report=report, pipeline=pipeline, workers=workers,
+                dedup_threshold=dedup_threshold,
+            )
+    throughput = pipeline.stats
+    elapsed = time.perf_counter() - started
+    files_per_second = report.files_seen / elapsed if elapsed > 0 else 0.0
+    peak_rss = _peak_rss_mb()
 
     stats = store.get_stats()
     if verbose:
-        print(f"\nDone! {starter_count + local_count} new chunks added.")
+        print(f"\nDone! {report.summary()}")
+        print(f"Files: {report.files_seen} in {elapsed:.2f}s ({files_per_second:.1f} files/s)")
+        if throughput.chunks:
+            print(f"Throughput: {throughput.summary()}")
+        if peak_rss["main"] is not None:
+            print(f"Peak RSS: {peak_rss['main']} MB (largest worker {peak_rss['workers']} MB)")
         print(f"Total in knowledge base: {stats['total_chunks']} chunks")
         print(f"Sources: {stats['sources']}")
         print(f"Categories: {stats['categories']}")
@@ -207,6 +504,19 @@ def ingest_all(starter_only: bool = False, local_only: bool = False, verbose: bo
     return {
         "starter_added": starter_count,
         "local_added": local_count,
+        "files_added": len(report.added),
+        "files_changed": len(report.changed),
+        "files_unchanged": len(report.unchanged),
+        "files_removed": len(report.removed),
+        "chunks_deleted": report.chunks_deleted,
+        "chunks_linked": report.chunks_linked,
+        "elapsed_seconds": elapsed,
+        "files_per_second": files_per_second,
+        "chunks_per_second": throughput.chunks_per_second,
+        "embed_seconds": throughput.embed_seconds,
+        "write_seconds": throughput.write_seconds,
+        "peak_rss_mb": peak_rss["main"],
+        "worker_peak_rss_mb": peak_rss["workers"],
         "total_chunks": stats["total_chunks"],
         "sources": stats["sources"],
         "categories": stats["categories"],
@@ -217,5 +527,36 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Ingest documents into the Woodshed AI knowledge base.")
     parser.add_argument("--starter-only", action="store_true", help="Only ingest starter docs")
     parser.add_argument("--local-only", action="store_true", help="Only ingest local docs")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for reading and chunking files")
+    parser.add_argument("--batch-size", type=int, default=None, help="Chunks per embedding request")
+    parser.add_argument("--embed-concurrency", type=int, default=None, help="Concurrent embedding requests")
+    parser.add_argument("--dedup-threshold", type=float, default=None,
+                        help="Similarity at which chunks count as near-duplicates (0 disables)")
+    parser.add_argument("--export-snapshot", metavar="PATH", help="Write the knowledge base to a snapshot file and exit")
+    parser.add_argument("--import-snapshot", metavar="PATH", help="Replace the knowledge base with a snapshot and exit")
     args = parser.parse_args()
-    ingest_all(starter_only=args.starter_only, local_only=args.local_only)
+
+    if args.export_snapshot or args.import_snapshot:
+        from app.knowledge.snapshot import SnapshotError, export_snapshot, import_snapshot
+
+        started = time.perf_counter()
+        try:
+            if args.export_snapshot:
+                info = export_snapshot(VectorStore(), args.export_snapshot)
+                print(f"Exported {info.summary()} to {info.path}")
+            else:
+                info = import_snapshot(args.import_snapshot, VectorStore(), verbose=True)
+                print(f"Imported {info.summary()} from {info.path}")
+        except SnapshotError as exc:
+            sys.exit(f"Error: {exc}")
+        print(f"Done in {time.perf_counter() - started:.2f}s")
+        sys.exit(0)
+
+    ingest_all(
+        starter_only=args.starter_only,
+        local_only=args.local_only,
+        batch_size=args.batch_size,
+        embed_concurrency=args.embed_concurrency,
+        workers=args.workers,
+        dedup_threshold=args.dedup_threshold,
+    )
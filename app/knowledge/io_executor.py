@@ -0,0 +1,100 @@
+# Woodshed AI — Vector Store I/O Executor
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Dedicated, bounded thread pool for blocking vector store calls.
+
+The async VectorStore API runs Chroma reads and writes here instead of
+on the event loop's default executor, so retrieval never competes with
+chat streaming for threads. Every task records how long it waited for
+a free thread; a rising queue wait means the pool is undersized.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import config
+
+WAIT_SAMPLES = 1024  # recent queue-wait samples kept for percentiles
+
+
+class InstrumentedExecutor:
+    """ThreadPoolExecutor that tracks queue depth and queue wait time."""
+
+    def __init__(self, max_workers: int, name: str):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._waits: deque = deque(maxlen=WAIT_SAMPLES)
+        self.submitted = 0
+        self.completed = 0
+        self.active = 0
+        self.max_wait = 0.0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        queued_at = time.perf_counter()
+        with self._lock:
+            self.submitted += 1
+
+        def task():
+            wait = time.perf_counter() - queued_at
+            with self._lock:
+                self.active += 1
+                self._waits.append(wait)
+                self.max_wait = max(self.max_wait, wait)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+
+        return self._executor.submit(task)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking call on the pool and await its result."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            submitted, completed, active = self.submitted, self.completed, self.active
+            max_wait = self.max_wait
+
+        def pct(p: float) -> float:
+            return waits[min(len(waits) - 1, int(p / 100 * len(waits)))] * 1000 if waits else 0.0
+
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "submitted": submitted,
+            "completed": completed,
+            "active": active,
+            "queued": submitted - completed - active,
+            "queue_wait_ms": {
+                "mean": sum(waits) / len(waits) * 1000 if waits else 0.0,
+                "p50": pct(50),
+                "p95": pct(95),
+                "max": max_wait * 1000,
+            },
+        }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_io_executor: InstrumentedExecutor | None = None
+_io_lock = threading.Lock()
+
+
+def get_io_executor() -> InstrumentedExecutor:
+    """Return the process-wide vector store executor, creating it on first use."""
+    global _io_executor
+    with _io_lock:
+        if _io_executor is None:
+            _io_executor = InstrumentedExecutor(config.VECTORSTORE_IO_THREADS, "woodshed-vectorstore-io")
+        return _io_executor
@@ -0,0 +1,332 @@
+# Woodshed AI — Lexical Index
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""In-process BM25 inverted index over chunk text.
+
+Queries like "Dm7 G7 Cmaj7", "tritone sub", or "DADGAD voicing" hinge
+on exact tokens that embeddings blur. This index scores them directly,
+with no embedding call, and is kept in sync with the Chroma collection
+by VectorStore. It holds only chunk IDs, categories, and term counts;
+the documents themselves are read back from Chroma for the hits.
+
+On disk the index is a JSON snapshot plus an append-only journal of
+the changes since (``.bm25.json`` and ``.bm25.log``), so a save costs
+the size of what changed, not of the corpus. The journal is folded
+into a new snapshot once it outgrows it. Saves take an exclusive lock
+and first replay what other processes appended, and sync() replays
+them on demand, so an ingest CLI's writes (same-size upserts included)
+reach a running API without a rebuild.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: one writing process at a time
+    fcntl = None
+
+INDEX_VERSION = 2  # 2: term counts only, plus a journal
+SAVE_INTERVAL = 1.0  # seconds between journal appends during bulk ingest
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # reciprocal rank fusion damping constant
+
+# Keeps chord symbols (Dm7, C#maj7b5, F/A), Roman numeral runs (ii-V-I),
+# and accidentals together as single tokens
+_TOKEN_RE = re.compile(r"[\w#♯♭°ø+/]+(?:-[\w#♯♭°ø+/]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase text and split it into index terms."""
+    terms = _TOKEN_RE.findall(text.lower())
+    # Also index the parts of hyphenated runs so "ii-V" matches "ii-V-I"
+    parts = [p for t in terms if "-" in t for p in t.split("-") if p]
+    return terms + parts
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = RRF_K) -> list[tuple[str, float]]:
+    """Merge ranked ID lists: score(id) = Σ 1 / (k + rank)."""
+    scores: Counter = Counter()
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return scores.most_common()
+
+
+class BM25Index:
+    """Okapi BM25 over chunk term counts, keyed by chunk ID."""
+
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.RLock()
+        self._docs: dict[str, tuple[str | None, Counter, int]] = {}  # id → (category, tf, len)
+        self._postings: dict[str, dict[str, int]] = {}  # term → {id: tf}
+        self._total_len = 0
+        self._pending: dict[str, list | None] = {}  # unsaved changes: id → [category, tf], None if removed
+        self._rewrite = False  # next save writes a fresh snapshot
+        self._generation: str | None = None  # snapshot the journal entries belong to
+        self._snapshot_sig: tuple | None = None
+        self._journal_offset = 0  # bytes of the journal applied so far
+        self._last_save = 0.0
+        if self.path:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # --- Persistence ---
+
+    @property
+    def journal_path(self) -> Path:
+        return self.path.with_suffix(".log")
+
+    @contextmanager
+    def _file_lock(self):
+        """Hold an exclusive lock on the index files across processes."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _signature(self) -> tuple | None:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _journal_size(self) -> int:
+        try:
+            return self.journal_path.stat().st_size
+        except OSError:
+            return 0
+
+    def load(self) -> bool:
+        """Load the snapshot and replay its journal. Returns False if missing or unreadable."""
+        with self._lock, self._file_lock():
+            return self._load_locked()
+
+    def _load_locked(self) -> bool:
+        sig = self._signature()
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION:
+            return False
+        self._reset()
+        for doc_id, entry in data["docs"].items():
+            self._apply(doc_id, entry)
+        self._generation = data["generation"]
+        self._snapshot_sig = sig
+        self._journal_offset = 0
+        self._replay()
+        # Changes not saved yet are newer than anything on disk
+        for doc_id, entry in self._pending.items():
+            self._apply(doc_id, entry)
+        return True
+
+    def _replay(self) -> bool:
+        """Apply journal entries appended since the last read. Returns True if any."""
+        changed = False
+        try:
+            f = open(self.journal_path, "rb")
+        except OSError:
+            return False
+        with f:
+            f.seek(self._journal_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # an append still in progress
+                self._journal_offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("generation") != self._generation:
+                    continue  # left over from before the last snapshot
+                for doc_id, entry in record["docs"].items():
+                    if doc_id not in self._pending:
+                        self._apply(doc_id, entry)
+                        changed = True
+        return changed
+
+    def changed_on_disk(self) -> bool:
+        """True if another process saved changes this index hasn't read."""
+        if not self.path:
+            return False
+        return self._signature() != self._snapshot_sig or self._journal_size() != self._journal_offset
+
+    def sync(self) -> bool:
+        """Pick up changes other processes saved. Returns True if anything changed."""
+        if not self.path:
+            return False
+        with self._lock, self._file_lock():
+            if self._signature() != self._snapshot_sig:
+                return self._load_locked()
+            return self._replay()
+
+    def save(self, force: bool = True):
+        """Journal unsaved changes. With force=False, rate-limit writes."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._pending and not self._rewrite:
+                return
+            if not force and time.monotonic() - self._last_save < SAVE_INTERVAL:
+                return
+            with self._file_lock():
+                if not self._rewrite:
+                    # Catch up with other writers so the snapshot or journal stays complete
+                    if self._signature() != self._snapshot_sig:
+                        self._rewrite = not self._load_locked()
+                    else:
+                        self._replay()
+                line = (json.dumps({"generation": self._generation, "docs": self._pending}) + "\n").encode("utf-8")
+                snapshot_size = self._snapshot_sig[2] if self._snapshot_sig else 0
+                if self._rewrite or self._journal_size() + len(line) > snapshot_size:
+                    self._write_snapshot()
+                else:
+                    with open(self.journal_path, "ab") as f:
+                        f.write(line)
+                    self._journal_offset = self._journal_size()
+            self._pending = {}
+            self._rewrite = False
+            self._last_save = time.monotonic()
+
+    def _write_snapshot(self):
+        generation = uuid.uuid4().hex
+        data = {
+            "version": INDEX_VERSION,
+            "generation": generation,
+            "docs": {doc_id: [category, tf] for doc_id, (category, tf, _) in self._docs.items()},
+        }
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.journal_path.unlink(missing_ok=True)
+        self._generation = generation
+        self._snapshot_sig = self._signature()
+        self._journal_offset = 0
+
+    # --- Mutation ---
+
+    def _reset(self):
+        self._docs = {}
+        self._postings = {}
+        self._total_len = 0
+
+    def _apply(self, doc_id: str, entry: list | None):
+        self._remove_one(doc_id)
+        if entry is None:
+            return
+        category, tf = entry[0], Counter(entry[1])
+        length = sum(tf.values())
+        self._docs[doc_id] = (category, tf, length)
+        self._total_len += length
+        for term, count in tf.items():
+            self._postings.setdefault(term, {})[doc_id] = count
+
+    def _remove_one(self, doc_id: str):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        _, tf, length = doc
+        self._total_len -= length
+        for term in tf:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def _add_many(self, ids: list[str], documents: list[str], metadatas: list[dict] | None):
+        for i, doc_id in enumerate(ids):
+            category = (metadatas[i] or {}).get("category") if metadatas else None
+            entry = [category, Counter(tokenize(documents[i] or ""))]
+            self._apply(doc_id, entry)
+            self._pending[doc_id] = entry
+
+    def add(self, ids: list[str], documents: list[str], metadatas: list[dict] | None = None):
+        with self._lock:
+            self._add_many(ids, documents, metadatas)
+        self.save(force=False)
+
+    def remove(self, ids: list[str]):
+        with self._lock:
+            for doc_id in ids:
+                self._remove_one(doc_id)
+                self._pending[doc_id] = None
+        self.save(force=False)
+
+    def clear(self, save: bool = True):
+        with self._lock:
+            self._reset()
+            self._pending = {}
+            self._rewrite = True
+        if save:
+            self.save()
+
+    def rebuild(self, collection, page_size: int = 5000):
+        """Re-index every chunk in a Chroma collection (paged)."""
+        with self._lock:
+            self.clear(save=False)
+            offset = 0
+            while True:
+                page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+                if not page["ids"]:
+                    break
+                self._add_many(page["ids"], page["documents"], page["metadatas"])
+                offset += len(page["ids"])
+            self._pending = {}
+        self.save()
+
+    # --- Query ---
+
+    def search(
+        self,
+        query: str,
+        n_results: int = 5,
+        category_filter: str | list[str] | None = None,
+    ) -> list[dict]:
+        """Return the top BM25 matches as dicts with id and score.
+
+        category_filter may be one category or a list of them.
+        """
+        terms = set(tokenize(query))
+        if isinstance(category_filter, str):
+            category_filter = [category_filter]
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs or not terms:
+                return []
+            avg_len = self._total_len / n_docs
+            scores: Counter = Counter()
+            for term in terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    category, _, length = self._docs[doc_id]
+                    if category_filter and category not in category_filter:
+                        continue
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len)
+                    scores[doc_id] += idf * tf * (BM25_K1 + 1) / norm
+
+            return [{"id": doc_id, "score": score} for doc_id, score in scores.most_common(n_results)]
@@ -0,0 +1,108 @@
+# Woodshed AI — Ingest Manifest
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Persisted record of which source files are in the knowledge base.
+
+Each entry stores a file's size, mtime, and content hash along with how
+many chunks it produced, so re-ingestion can skip unchanged files and
+clean up chunks left behind by edited or deleted ones. It also records
+the chunker version (see chunker.chunker_version) the file was chunked
+with; a file chunked by another version is re-chunked even if unchanged.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def hash_file(path: Path) -> str:
+    """Return the hex SHA-256 digest of a file, read in fixed-size blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """JSON-backed map of ``{source_label}/{filename}`` → file fingerprint."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._files: dict[str, dict] = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            # A corrupt manifest just means a full re-ingest
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self._files = data.get("files", {})
+
+    def save(self):
+        """Write the manifest atomically (temp file + rename)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(
+            json.dumps({"version": MANIFEST_VERSION, "files": self._files}, indent=1),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def key(source_label: str, filename: str) -> str:
+        return f"{source_label}/{filename}"
+
+    def get(self, source_label: str, filename: str) -> dict | None:
+        return self._files.get(self.key(source_label, filename))
+
+    def set(
+        self,
+        source_label: str,
+        filepath: Path,
+        size: int,
+        mtime: float,
+        sha256: str,
+        chunk_ids: list[str],
+        chunker: str | None = None,
+    ):
+        self._files[self.key(source_label, filepath.name)] = {
+            "path": str(filepath),
+            "source_dir": source_label,
+            "size": size,
+            "mtime": mtime,
+            "sha256": sha256,
+            "chunk_ids": chunk_ids,
+            "chunker": chunker,
+        }
+
+    def remove(self, source_label: str, filename: str) -> dict | None:
+        return self._files.pop(self.key(source_label, filename), None)
+
+    def filenames(self, source_label: str) -> list[str]:
+        """Return the filenames recorded under a source label."""
+        prefix = f"{source_label}/"
+        return [k[len(prefix):] for k in self._files if k.startswith(prefix)]
+
+    def entries(self) -> dict[str, dict]:
+        """Copy of every entry, keyed by ``{source_label}/{filename}``."""
+        return {key: dict(entry) for key, entry in self._files.items()}
+
+    def replace(self, entries: dict[str, dict]):
+        """Swap in a full set of entries (e.g. from a snapshot)."""
+        self._files = {key: dict(entry) for key, entry in entries.items()}
+
+    def clear(self):
+        self._files = {}
+
+    def __len__(self) -> int:
+        return len(self._files)
@@ -0,0 +1,102 @@
+# Woodshed AI — Compact Vector Storage
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Reduced-precision and dimension-truncated vector codes.
+
+Used by the in-memory search backends to shrink the resident index:
+
+- ``float32``: vectors as-is (4 bytes/dim).
+- ``float16``: half precision (2 bytes/dim).
+- ``int8``: symmetric scalar quantization with one float32 scale per
+  vector (1 byte/dim + 4 bytes).
+
+Vectors may also be truncated to their first ``dims`` dimensions and
+re-normalized, which suits Matryoshka-trained models such as
+nomic-embed-text. Compact codes only pick candidates; FullPrecisionRows
+keeps the original float32 vectors on disk for exact re-scoring.
+"""
+
+import tempfile
+
+import numpy as np
+
+STORAGE_MODES = ("float32", "float16", "int8")
+SCAN_BLOCK = 4096  # rows upcast per block when scanning compact codes
+
+_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows (zero rows are left as zeros)."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def truncate(vectors: np.ndarray, dims: int) -> np.ndarray:
+    """Keep the first dims dimensions (0 = all) and re-normalize."""
+    if not dims or dims >= vectors.shape[1]:
+        return vectors
+    return normalize(vectors[:, :dims])
+
+
+def dtype_for(storage: str):
+    if storage not in _DTYPES:
+        raise ValueError(f"Unknown vector storage {storage!r} (expected one of {', '.join(STORAGE_MODES)})")
+    return _DTYPES[storage]
+
+
+def encode(vectors: np.ndarray, storage: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """Encode normalized float32 rows; returns (codes, per-row scales or None)."""
+    if storage == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+    return vectors.astype(dtype_for(storage)), None
+
+
+def scan(codes: np.ndarray, scales: np.ndarray | None, queries: np.ndarray) -> np.ndarray:
+    """Approximate (queries × rows) dot products against compact codes."""
+    if codes.dtype == np.float32:
+        return queries @ codes.T
+    scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+    for start in range(0, len(codes), SCAN_BLOCK):
+        block = codes[start:start + SCAN_BLOCK].astype(np.float32)
+        scores[:, start:start + SCAN_BLOCK] = queries @ block.T
+    if scales is not None:
+        scores *= scales[None, :]
+    return scores
+
+
+class FullPrecisionRows:
+    """Growable float32 row store backed by an anonymous temp-file memmap.
+
+    Holds the original vectors for re-scoring without keeping them
+    resident; only the rows being re-scored are paged in.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._file = tempfile.TemporaryFile()
+        self._rows = None
+        self.capacity = 0
+
+    def reserve(self, capacity: int):
+        if capacity <= self.capacity:
+            return
+        if self._rows is not None:
+            self._rows.flush()
+        self._file.truncate(capacity * self.dim * 4)
+        self._rows = np.memmap(self._file, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self.capacity = capacity
+
+    def __getitem__(self, rows):
+        return self._rows[rows]
+
+    def __setitem__(self, rows, values):
+        self._rows[rows] = values
+
+    def close(self):
+        self._rows = None
+        self._file.close()
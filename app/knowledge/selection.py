@@ -0,0 +1,86 @@
+# Woodshed AI — Context Selection
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Pick which retrieved chunks go into the prompt.
+
+Retrieval overfetches candidates; this module then
+
+1. drops candidates farther than max_distance (cosine) from the query,
+2. orders the rest by maximal marginal relevance — relevance to the
+   query minus similarity to chunks already picked — so near-identical
+   chunks don't crowd each other out, and
+3. stops at max_chunks or when the token budget is spent.
+
+Small talk ends up with no context at all, and a deep theory question
+can take several chunks, instead of a fixed k either way.
+"""
+
+import numpy as np
+
+from app.llm.tokenizer import count_tokens
+
+
+def chunk_tokens(item: dict) -> int:
+    """Token count of a result, from ingest metadata when available."""
+    tokens = (item.get("metadata") or {}).get("token_count")
+    return int(tokens) if tokens else count_tokens(item.get("document") or "")
+
+
+def select_context(
+    candidates: list[dict],
+    query_vector: np.ndarray | list[float] | None,
+    chunk_vectors: np.ndarray | None,
+    max_chunks: int,
+    max_distance: float | None = None,
+    token_budget: int | None = None,
+    mmr_lambda: float = 0.7,
+) -> list[dict]:
+    """Choose up to max_chunks candidates within the token budget.
+
+    query_vector and chunk_vectors (one row per candidate) enable the
+    distance cutoff and MMR; without them — e.g. lexical-only search —
+    candidates keep their ranked order and only the limits apply.
+    Distances on the returned items are recomputed from the vectors, so
+    chunks found only lexically get one too.
+    """
+    if not candidates or max_chunks <= 0:
+        return []
+
+    relevance = similarity = None
+    if query_vector is not None and chunk_vectors is not None and len(chunk_vectors):
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        vectors = np.asarray(chunk_vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        relevance = vectors @ query
+        similarity = vectors @ vectors.T
+
+    remaining = list(range(len(candidates)))
+    if relevance is not None and max_distance is not None:
+        remaining = [i for i in remaining if 1.0 - relevance[i] <= max_distance]
+
+    picked: list[int] = []
+    used = 0
+    while remaining and len(picked) < max_chunks:
+        if relevance is None:
+            best = remaining[0]
+        else:
+            redundancy = similarity[np.ix_(remaining, picked)].max(axis=1) if picked else 0.0
+            scores = mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * redundancy
+            best = remaining[int(np.argmax(scores))]
+        remaining.remove(best)
+        tokens = chunk_tokens(candidates[best])
+        if token_budget is not None and used + tokens > token_budget:
+            continue  # a shorter candidate may still fit
+        picked.append(best)
+        used += tokens
+
+    selected = []
+    for i in picked:
+        item = dict(candidates[i], metadata=dict(candidates[i]["metadata"]))
+        if relevance is not None:
+            item["distance"] = float(1.0 - relevance[i])
+        selected.append(item)
+    return selected
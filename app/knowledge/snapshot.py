@@ -0,0 +1,204 @@
+# Woodshed AI — Knowledge Base Snapshots
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Export and import the knowledge base as a single prebuilt file.
+
+A snapshot carries every chunk with its metadata and embedding, plus the
+ingest manifest and dedup links, so a fresh deployment can load it
+without a single embedding call and later ingests stay incremental.
+
+Layout (little-endian):
+
+    0    magic b"WSHDSNAP"
+    8    uint64 header offset, uint64 header length
+    64   float32 embeddings, count × dim, row-major (memory-mappable)
+    ...  UTF-8 JSON header: version, embedding model, chunker version,
+         count, dim, ids, documents, metadatas, manifest, dedup
+"""
+
+import json
+import os
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from app.knowledge import chunker
+from app.knowledge.backends import LOAD_PAGE_SIZE
+from app.knowledge.manifest import IngestManifest
+from app.llm.tokenizer import tokenizer_id
+
+SNAPSHOT_MAGIC = b"WSHDSNAP"
+SNAPSHOT_VERSION = 1
+DATA_OFFSET = 64
+_OFFSETS = struct.Struct("<QQ")
+
+
+class SnapshotError(ValueError):
+    """Raised for unreadable snapshots or ones this store can't use."""
+
+
+@dataclass
+class SnapshotInfo:
+    """What a snapshot holds (read from its header)."""
+    path: Path
+    embedding_model: str
+    chunker: dict
+    count: int
+    dim: int
+    created: float
+
+    def summary(self) -> str:
+        return f"{self.count} chunks, {self.dim}-dim {self.embedding_model} embeddings"
+
+
+def _chunker_fingerprint() -> dict:
+    return {
+        "version": chunker.CHUNKER_VERSION,
+        "tokenizer": tokenizer_id(),
+        "chunk_size": chunker.CHUNK_SIZE,
+        "chunk_overlap": chunker.CHUNK_OVERLAP,
+    }
+
+
+def _info(path: Path, header: dict) -> SnapshotInfo:
+    return SnapshotInfo(
+        path=Path(path),
+        embedding_model=header["embedding_model"],
+        chunker=header["chunker"],
+        count=header["count"],
+        dim=header["dim"],
+        created=header["created"],
+    )
+
+
+def export_snapshot(store, path: str | Path) -> SnapshotInfo:
+    """Write every chunk in the store, with embeddings, to one file.
+
+    Embeddings are streamed to disk page by page; only chunk text and
+    metadata are held in memory. The file is written atomically.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    ids: list[str] = []
+    documents: list[str] = []
+    metadatas: list[dict] = []
+    dim = 0
+    with open(tmp, "wb") as f:
+        f.write(SNAPSHOT_MAGIC + bytes(DATA_OFFSET - len(SNAPSHOT_MAGIC)))
+        offset = 0
+        while True:
+            page = store.collection.get(
+                include=["embeddings", "documents", "metadatas"], limit=LOAD_PAGE_SIZE, offset=offset,
+            )
+            if not page["ids"]:
+                break
+            vectors = np.asarray(page["embeddings"], dtype="<f4")
+            dim = dim or vectors.shape[1]
+            f.write(vectors.tobytes())
+            ids.extend(page["ids"])
+            documents.extend(page["documents"])
+            metadatas.extend(m or {} for m in page["metadatas"])
+            offset += len(page["ids"])
+
+        dedup = None
+        if store.dedup_path.exists():
+            dedup = json.loads(store.dedup_path.read_text(encoding="utf-8"))
+        header = {
+            "version": SNAPSHOT_VERSION,
+            "embedding_model": store.embedding_model,
+            "chunker": _chunker_fingerprint(),
+            "created": time.time(),
+            "count": len(ids),
+            "dim": dim,
+            "dtype": "<f4",
+            "data_offset": DATA_OFFSET,
+            "ids": ids,
+            "documents": documents,
+            "metadatas": metadatas,
+            "manifest": IngestManifest(store.manifest_path).entries(),
+            "dedup": dedup,
+        }
+        encoded = json.dumps(header).encode("utf-8")
+        header_offset = f.tell()
+        f.write(encoded)
+        f.seek(len(SNAPSHOT_MAGIC))
+        f.write(_OFFSETS.pack(header_offset, len(encoded)))
+    os.replace(tmp, path)
+    return _info(path, header)
+
+
+def read_snapshot(path: str | Path) -> tuple[dict, np.ndarray]:
+    """Return (header, embeddings) with the embeddings memory-mapped."""
+    path = Path(path)
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(len(SNAPSHOT_MAGIC) + _OFFSETS.size)
+            if not prefix.startswith(SNAPSHOT_MAGIC):
+                raise SnapshotError(f"{path} is not a Woodshed knowledge snapshot")
+            header_offset, header_length = _OFFSETS.unpack(prefix[len(SNAPSHOT_MAGIC):])
+            f.seek(header_offset)
+            header = json.loads(f.read(header_length).decode("utf-8"))
+    except (OSError, ValueError, struct.error) as exc:
+        if isinstance(exc, SnapshotError):
+            raise
+        raise SnapshotError(f"Can't read snapshot {path}: {exc}") from exc
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Snapshot version {header.get('version')} is not supported (expected {SNAPSHOT_VERSION})")
+    if not header["count"]:
+        return header, np.zeros((0, header["dim"]), dtype=np.float32)
+    embeddings = np.memmap(
+        path, dtype=np.dtype(header["dtype"]), mode="r",
+        offset=header["data_offset"], shape=(header["count"], header["dim"]),
+    )
+    return header, embeddings
+
+
+def snapshot_info(path: str | Path) -> SnapshotInfo:
+    header, _ = read_snapshot(path)
+    return _info(path, header)
+
+
+def import_snapshot(path: str | Path, store, verbose: bool = False) -> SnapshotInfo:
+    """Replace the store's contents with a snapshot, without embedding anything.
+
+    Refuses a snapshot built with a different embedding model: its
+    vectors would be meaningless to queries embedded by this store. If
+    the chunker changed since export, the ingest manifest is dropped so
+    the next ingest re-chunks every file.
+    """
+    header, embeddings = read_snapshot(path)
+    info = _info(path, header)
+    if info.embedding_model != store.embedding_model:
+        raise SnapshotError(
+            f"Snapshot was embedded with {info.embedding_model!r} but this store uses "
+            f"{store.embedding_model!r}; re-export it with the matching model or run a full ingest"
+        )
+
+    store.reset()
+    ids, documents, metadatas = header["ids"], header["documents"], header["metadatas"]
+    for start in range(0, info.count, LOAD_PAGE_SIZE):
+        end = start + LOAD_PAGE_SIZE
+        store.upsert_documents(
+            ids=ids[start:end],
+            documents=documents[start:end],
+            metadatas=metadatas[start:end],
+            embeddings=np.ascontiguousarray(embeddings[start:end], dtype=np.float32),
+        )
+        if verbose:
+            print(f"  Imported {min(end, info.count)}/{info.count} chunks")
+
+    if info.chunker == _chunker_fingerprint():
+        manifest = IngestManifest(store.manifest_path)
+        manifest.replace(header["manifest"])
+        manifest.save()
+        if header.get("dedup") is not None:
+            store.dedup_path.write_text(json.dumps(header["dedup"]), encoding="utf-8")
+    elif verbose:
+        print("  Chunker changed since export; the next ingest will re-chunk every file")
+    store.persist()
+    return info
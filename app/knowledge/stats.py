@@ -0,0 +1,184 @@
+# Woodshed AI — Knowledge Base Statistics
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Incrementally maintained per-source and per-category chunk counts.
+
+VectorStore updates these on every write instead of scanning all chunk
+metadata, and persists them as a JSON sidecar next to the collection.
+If the sidecar is missing or from an older schema, it is rebuilt with a
+single metadata scan. A total that merely disagrees with the
+collection's count (an ingest in another process between saves, or a
+crash before the last save) is reported as stale rather than rebuilt,
+since a rebuild would race that ingest's own saves.
+
+Sources are counted under the same ``{source_label}/{filename}`` key the
+ingest manifest uses, so same-named files from different directories
+are counted separately.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from app.knowledge.manifest import IngestManifest
+
+STATS_VERSION = 2  # 2: sources keyed by label/filename
+SAVE_INTERVAL = 1.0  # seconds between sidecar writes during bulk ingest
+SCAN_PAGE_SIZE = 5000
+
+
+def source_key(meta: dict) -> str | None:
+    """The manifest key for a chunk's source file (bare filename if unlabelled)."""
+    if "source" not in meta:
+        return None
+    if meta.get("source_dir"):
+        return IngestManifest.key(meta["source_dir"], meta["source"])
+    return meta["source"]
+
+
+class KnowledgeStats:
+    """Chunk counts by source and category, plus the last ingest time."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.total = 0
+        self.sources: Counter = Counter()
+        self.categories: Counter = Counter()
+        self.last_ingest: float | None = None
+        self._lock = threading.Lock()
+        self._loaded_mtime: float | None = None
+        self._seen_mtime: float | None = None
+        self._last_save = 0.0
+        self._dirty = False
+        self.valid = self.load()  # False until counts come from this schema's sidecar or a scan
+
+    def load(self) -> bool:
+        """Load the sidecar from disk. Returns False if missing or unreadable."""
+        try:
+            mtime = self.path.stat().st_mtime
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != STATS_VERSION:
+            return False
+        with self._lock:
+            self.total = data["total_chunks"]
+            self.sources = Counter(data["sources"])
+            self.categories = Counter(data["categories"])
+            self.last_ingest = data.get("last_ingest")
+            self._loaded_mtime = mtime
+            self._dirty = False
+            self.valid = True
+        return True
+
+    def reload_if_changed(self):
+        """Pick up a sidecar rewritten by another process (e.g. the ingest CLI)."""
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return
+        if mtime != self._loaded_mtime and not self._dirty:
+            self.load()
+
+    def changed_on_disk(self) -> bool:
+        """True once for each rewrite of the sidecar by another process."""
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return False
+        if mtime in (self._loaded_mtime, self._seen_mtime):
+            return False
+        self._seen_mtime = mtime
+        return True
+
+    def save(self, force: bool = True):
+        """Write the sidecar atomically. With force=False, rate-limit writes."""
+        with self._lock:
+            if not force and time.monotonic() - self._last_save < SAVE_INTERVAL:
+                return
+            data = {
+                "version": STATS_VERSION,
+                "total_chunks": self.total,
+                "sources": dict(self.sources),
+                "categories": dict(self.categories),
+                "last_ingest": self.last_ingest,
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(tmp, self.path)
+            self._loaded_mtime = self.path.stat().st_mtime
+            self._last_save = time.monotonic()
+            self._dirty = False
+            self.valid = True
+
+    def _apply(self, metadatas: list[dict | None], sign: int):
+        for meta in metadatas:
+            self.total += sign
+            if not meta:
+                continue
+            for counter, key in ((self.sources, source_key(meta)), (self.categories, meta.get("category"))):
+                if key is not None:
+                    counter[key] += sign
+                    if counter[key] <= 0:
+                        del counter[key]
+
+    def record_added(self, metadatas: list[dict | None]):
+        with self._lock:
+            self._apply(metadatas, +1)
+            self.last_ingest = time.time()
+            self._dirty = True
+        self.save(force=False)
+
+    def record_removed(self, metadatas: list[dict | None]):
+        with self._lock:
+            self._apply(metadatas, -1)
+            self._dirty = True
+        self.save(force=False)
+
+    def clear(self):
+        with self._lock:
+            self.total = 0
+            self.sources = Counter()
+            self.categories = Counter()
+            self.last_ingest = None
+        self.save()
+
+    def rebuild(self, collection):
+        """Recount everything from the collection's metadata (paged)."""
+        sources: Counter = Counter()
+        categories: Counter = Counter()
+        total = 0
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=SCAN_PAGE_SIZE, offset=offset)
+            metas = page["metadatas"] or []
+            if not page["ids"]:
+                break
+            for meta in metas:
+                total += 1
+                if meta and "source" in meta:
+                    sources[source_key(meta)] += 1
+                if meta and "category" in meta:
+                    categories[meta["category"]] += 1
+            offset += len(page["ids"])
+        with self._lock:
+            self.total = total
+            self.sources = sources
+            self.categories = categories
+        self.save()
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "total_chunks": self.total,
+                "sources": sorted(self.sources),
+                "source_counts": dict(self.sources),
+                "categories": sorted(self.categories),
+                "category_counts": dict(self.categories),
+                "last_ingest": self.last_ingest,
+            }
@@ -4,50 +4,179 @@
 
 """ChromaDB wrapper for the music theory knowledge base."""
 
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
 import chromadb
-from chromadb.utils.embedding_functions import OllamaEmbeddingFunction
 
 import config
+from app.knowledge.backends import filter_categories, make_backend
+from app.knowledge.compress import CompressionStats, compress_chunks, spans_to_embed
+from app.knowledge.embeddings import CachedOllamaEmbeddingFunction, aget_embeddings, get_embedding_function
+from app.knowledge.io_executor import get_io_executor
+from app.knowledge.lexical import BM25Index, reciprocal_rank_fusion
+from app.knowledge.query_cache import LRUCache, normalize_query
+from app.knowledge.selection import select_context
+from app.knowledge.stats import KnowledgeStats
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ("hybrid", "lexical", "vector")
+HYBRID_CANDIDATES = 4  # each ranker contributes n_results × this to the fusion
+SYNC_CHECK_INTERVAL = 1.0  # seconds between checks for writes by other processes
+
+
+def _check_mode(mode: str | None) -> str:
+    mode = mode or config.SEARCH_MODE
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode {mode!r} (expected one of {', '.join(SEARCH_MODES)})")
+    return mode
+
+
+def _filter_key(category_filter) -> tuple | None:
+    categories = filter_categories(category_filter)
+    return tuple(sorted(categories)) if categories else None
+
+
+def _copy_results(items: list[dict]) -> list[dict]:
+    """Copy cached results so callers can't mutate the cache."""
+    return [dict(item, metadata=dict(item["metadata"])) for item in items]
 
 
 def _get_embedding_fn():
-    """Create an Ollama embedding function for ChromaDB."""
-    return OllamaEmbeddingFunction(
-        url=config.OLLAMA_HOST,
-        model_name=config.EMBEDDING_MODEL,
-    )
+    """Create the (cached) Ollama embedding function for ChromaDB."""
+    return get_embedding_function()
 
 
 class VectorStore:
     """Manages the ChromaDB collection for music theory documents."""
 
-    def __init__(self, persist_dir: str | None = None, collection_name: str | None = None):
+    def __init__(
+        self,
+        persist_dir: str | None = None,
+        collection_name: str | None = None,
+        embedding_fn=None,
+        backend: str | None = None,
+        cache_size: int | None = None,
+        storage: str | None = None,
+        dims: int | None = None,
+    ):
         persist_dir = persist_dir or str(config.CHROMA_PERSIST_DIR)
         collection_name = collection_name or config.CHROMA_COLLECTION
 
+        self._persist_dir = Path(persist_dir)
         self._client = chromadb.PersistentClient(path=persist_dir)
-        self._embedding_fn = _get_embedding_fn()
+        self._embedding_fn = embedding_fn or _get_embedding_fn()
         self._collection = self._client.get_or_create_collection(
             name=collection_name,
             embedding_function=self._embedding_fn,
             metadata={"hnsw:space": "cosine"},
         )
 
+        # Retrieval caches. Result keys include a version counter that every
+        # write bumps, so cached results never outlive the data they came from.
+        # Writes made elsewhere (the ingest CLI or the source watcher) are
+        # picked up by refresh(), which also bumps the version.
+        self._version = 0
+        self._version_lock = threading.Lock()
+        cache_size = config.QUERY_CACHE_SIZE if cache_size is None else cache_size
+        self._query_embeddings = LRUCache(cache_size)
+        self._results = LRUCache(cache_size)
+
+        # Running counts so get_stats() never scans chunk metadata
+        self._stats = KnowledgeStats(self.stats_path)
+
+        # Nearest-neighbour search backend ("chroma" HNSW or exact "numpy"),
+        # optionally holding compact (float16/int8, truncated) vector codes
+        self._backend_spec = (
+            backend or config.VECTOR_BACKEND,
+            storage or config.VECTOR_STORAGE,
+            config.VECTOR_DIMS if dims is None else dims,
+        )
+        self._backend = make_backend(*self._backend_spec)
+        self._backend.load(self._collection)
+        self._synced_at = time.monotonic()
+        self._refresh_lock = threading.Lock()
+        self._sync_holds = 0
+
+        # BM25 index over chunk text, kept in step with the collection
+        self._lexical = BM25Index(self.lexical_path)
+        if len(self._lexical) != self._collection.count():
+            self._lexical.rebuild(self._collection)
+
+    def _bump_version(self):
+        with self._version_lock:
+            self._version += 1
+
+    @property
+    def version(self) -> int:
+        """Counter bumped by every write; part of the retrieval cache key."""
+        return self._version
+
+    @property
+    def backend(self) -> str:
+        """Name of the vector search backend in use."""
+        return self._backend.name
+
+    @property
+    def embedding_model(self) -> str:
+        """Name of the model behind the store's embeddings."""
+        return getattr(self._embedding_fn, "model_name", None) or self._embedding_fn.name()
+
+    @property
+    def embedding_function(self):
+        """The collection's embedding function."""
+        return self._embedding_fn
+
+    @property
+    def embeddings_cached(self) -> bool:
+        """True when embeddings read through the on-disk EmbeddingCache."""
+        return isinstance(self._embedding_fn, CachedOllamaEmbeddingFunction)
+
     @property
     def collection(self):
         return self._collection
 
-    def add_documents(
+    @property
+    def persist_dir(self) -> Path:
+        return self._persist_dir
+
+    @property
+    def manifest_path(self) -> Path:
+        """Sidecar file where ingestion records which files are indexed."""
+        return self._persist_dir / f"{self._collection.name}.manifest.json"
+
+    @property
+    def stats_path(self) -> Path:
+        """Sidecar file holding incrementally maintained collection stats."""
+        return self._persist_dir / f"{self._collection.name}.stats.json"
+
+    @property
+    def dedup_path(self) -> Path:
+        """Sidecar file where ingestion links near-duplicate chunks."""
+        return self._persist_dir / f"{self._collection.name}.dedup.json"
+
+    @property
+    def lexical_path(self) -> Path:
+        """Sidecar file holding the BM25 index."""
+        return self._persist_dir / f"{self._collection.name}.bm25.json"
+
+    def _existing_metadatas(self, ids: list[str]) -> list[dict | None]:
+        """Fetch metadata for whichever of these IDs are already stored."""
+        result = self._collection.get(ids=ids, include=["metadatas"])
+        return list(result["metadatas"] or [None] * len(result["ids"]))
+
+    def _filter_new(
         self,
         ids: list[str],
         documents: list[str],
-        metadatas: list[dict] | None = None,
-    ):
-        """Add document chunks to the collection.
-
-        Skips any IDs that already exist to allow safe re-ingestion.
-        """
-        # Filter out already-existing IDs
+        metadatas: list[dict] | None,
+    ) -> tuple[list[str], list[str], list[dict]]:
+        """Drop entries whose IDs already exist in the collection."""
         existing = set()
         if ids:
             try:
@@ -65,65 +194,504 @@ class VectorStore:
                 new_docs.append(documents[i])
                 if metadatas:
                     new_metas.append(metadatas[i])
+        return new_ids, new_docs, new_metas
 
+    def _add_new(
+        self,
+        ids: list[str],
+        documents: list[str],
+        metadatas: list[dict],
+        embeddings: list[list[float]] | None,
+    ) -> int:
+        kwargs = dict(ids=ids, documents=documents)
+        if metadatas:
+            kwargs["metadatas"] = metadatas
+        if embeddings is not None:
+            kwargs["embeddings"] = embeddings
+        self._collection.add(**kwargs)
+        self._backend.add(ids, documents, metadatas or None, embeddings)
+        self._stats.record_added(metadatas or [None] * len(ids))
+        self._lexical.add(ids, documents, metadatas or None)
+        self._bump_version()
+        return len(ids)
+
+    def add_documents(
+        self,
+        ids: list[str],
+        documents: list[str],
+        metadatas: list[dict] | None = None,
+    ):
+        """Add document chunks to the collection.
+
+        Skips any IDs that already exist to allow safe re-ingestion.
+        """
+        new_ids, new_docs, new_metas = self._filter_new(ids, documents, metadatas)
         if not new_ids:
             return 0
+        embeddings = self.embed_documents(new_docs) if self._backend.needs_embeddings else None
+        return self._add_new(new_ids, new_docs, new_metas, embeddings)
 
-        kwargs = dict(ids=new_ids, documents=new_docs)
-        if new_metas:
-            kwargs["metadatas"] = new_metas
-        self._collection.add(**kwargs)
-        return len(new_ids)
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed a batch of texts with the collection's embedding function."""
+        if not texts:
+            return []
+        return [list(map(float, e)) for e in self._embedding_fn(texts)]
+
+    def upsert_documents(
+        self,
+        ids: list[str],
+        documents: list[str],
+        metadatas: list[dict] | None = None,
+        embeddings: list[list[float]] | None = None,
+    ) -> int:
+        """Insert or overwrite document chunks. Returns the number written.
+
+        Pass precomputed embeddings to skip the collection's embedding function.
+        """
+        if not ids:
+            return 0
+        kwargs = dict(ids=ids, documents=documents)
+        if metadatas:
+            kwargs["metadatas"] = metadatas
+        if embeddings is None and self._backend.needs_embeddings:
+            embeddings = self.embed_documents(documents)
+        if embeddings is not None:
+            kwargs["embeddings"] = embeddings
+        replaced = self._existing_metadatas(ids)
+        self._collection.upsert(**kwargs)
+        self._backend.add(ids, documents, metadatas, embeddings)
+        self._stats.record_removed(replaced)
+        self._stats.record_added(metadatas or [None] * len(ids))
+        self._lexical.add(ids, documents, metadatas)
+        self._bump_version()
+        return len(ids)
+
+    def delete_ids(self, ids: list[str]):
+        """Delete specific chunks by ID (missing IDs are ignored)."""
+        if ids:
+            removed = self._existing_metadatas(ids)
+            self._collection.delete(ids=ids)
+            self._backend.remove(ids)
+            self._stats.record_removed(removed)
+            self._lexical.remove(ids)
+            self._bump_version()
 
     def search(
         self,
         query: str,
         n_results: int = 5,
-        category_filter: str | None = None,
+        category_filter: str | list[str] | None = None,
+        mode: str | None = None,
     ) -> list[dict]:
         """Search the knowledge base and return matching chunks.
 
-        Returns a list of dicts with keys: id, document, metadata, distance.
+        mode is "vector" (embedding similarity), "lexical" (BM25 only, no
+        embedding call), or "hybrid" (both, merged with reciprocal rank
+        fusion); it defaults to config.SEARCH_MODE. If the embedding call
+        fails in hybrid mode, lexical results are returned instead.
+        category_filter may be one category or a list of categories.
+
+        Query embeddings and top-k results are cached (LRU) on the
+        normalized query text, so repeat questions skip the embedding
+        round trip entirely.
+
+        Returns a list of dicts with keys: id, document, metadata, distance
+        (None for chunks found only lexically).
         """
-        kwargs = dict(query_texts=[query], n_results=n_results)
-        if category_filter:
-            kwargs["where"] = {"category": category_filter}
-
-        results = self._collection.query(**kwargs)
-
-        items = []
-        for i in range(len(results["ids"][0])):
-            items.append({
-                "id": results["ids"][0][i],
-                "document": results["documents"][0][i],
-                "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
-                "distance": results["distances"][0][i] if results["distances"] else None,
-            })
-        return items
-
-    def get_stats(self) -> dict:
-        """Return collection statistics."""
-        count = self._collection.count()
-        # Get unique sources and categories from metadata
-        all_data = self._collection.get(include=["metadatas"]) if count > 0 else {"metadatas": []}
-        sources = set()
-        categories = set()
-        for meta in (all_data["metadatas"] or []):
-            if meta:
-                if "source" in meta:
-                    sources.add(meta["source"])
-                if "category" in meta:
-                    categories.add(meta["category"])
+        return self._search(query, n_results, category_filter, mode)[0]
+
+    def _search(
+        self,
+        query: str,
+        n_results: int,
+        category_filter: str | list[str] | None,
+        mode: str | None,
+    ) -> tuple[list[dict], list[float] | None]:
+        """search(), also returning the query embedding it used (None if lexical or degraded)."""
+        mode = _check_mode(mode)
+        if self._sync_due():
+            self._sync_external()
+        normalized = normalize_query(query)
+        result_key = (normalized, n_results, _filter_key(category_filter), mode, self._version)
+        cached = self._results.get(result_key)
+        if cached is not None:
+            items, embedding = cached
+            return _copy_results(items), embedding
+
+        embedding = None
+        if mode != "lexical":
+            embedding = self._query_embeddings.get(normalized)
+            if embedding is None:
+                try:
+                    embedding = self.embed_documents([query])[0]
+                except Exception as exc:
+                    if mode == "vector":
+                        raise
+                    return self._degraded_search(query, n_results, category_filter, exc), None
+                self._query_embeddings.put(normalized, embedding)
+
+        items = self._retrieve(query, n_results, category_filter, mode, embedding)
+        self._results.put(result_key, (items, embedding))
+        return _copy_results(items), embedding
+
+    def _retrieve(
+        self,
+        query: str,
+        n_results: int,
+        category_filter: str | list[str] | None,
+        mode: str,
+        embedding: list[float] | None,
+    ) -> list[dict]:
+        """Run one search once the query embedding (if needed) is in hand."""
+        if mode == "lexical":
+            return self._lexical_search(query, n_results, category_filter)
+        if mode == "vector":
+            return self.search_embeddings([embedding], n_results, category_filter)[0]
 
+        n_candidates = n_results * HYBRID_CANDIDATES
+        lexical = self._lexical.search(query, n_candidates, category_filter)
+        vector = self.search_embeddings([embedding], n_candidates, category_filter)[0]
+        fused = reciprocal_rank_fusion([
+            [item["id"] for item in vector],
+            [hit["id"] for hit in lexical],
+        ])[:n_results]
+        by_id = {item["id"]: item for item in vector}
+        # Only chunks found lexically alone need their documents fetched
+        lexical_only = [doc_id for doc_id, _ in fused if doc_id not in by_id]
+        by_id.update({item["id"]: item for item in self._lexical_results(lexical_only)})
+        return [by_id[doc_id] for doc_id, _ in fused if doc_id in by_id]
+
+    def _degraded_search(
+        self,
+        query: str,
+        n_results: int,
+        category_filter: str | list[str] | None,
+        exc: Exception,
+    ) -> list[dict]:
+        # Not cached, so the next query retries the embedder
+        logger.warning("Query embedding failed, using lexical results: %s", exc)
+        return self._lexical_search(query, n_results, category_filter)
+
+    def _lexical_search(self, query: str, n_results: int, category_filter: str | list[str] | None) -> list[dict]:
+        hits = self._lexical.search(query, n_results, category_filter)
+        return self._lexical_results([hit["id"] for hit in hits])
+
+    def _lexical_results(self, ids: list[str]) -> list[dict]:
+        """Result dicts for lexical hits, in order, with documents read from the collection."""
+        if not ids:
+            return []
+        got = self._collection.get(ids=ids, include=["documents", "metadatas"])
+        found = dict(zip(got["ids"], zip(got["documents"], got["metadatas"])))
+        return [
+            {"id": doc_id, "document": found[doc_id][0], "metadata": found[doc_id][1] or {}, "distance": None}
+            for doc_id in ids
+            if doc_id in found
+        ]
+
+    def search_embeddings(
+        self,
+        embeddings: list[list[float]],
+        n_results: int = 5,
+        category_filter: str | list[str] | None = None,
+    ) -> list[list[dict]]:
+        """Uncached vector search for precomputed query embeddings (batched).
+
+        Returns one result list per query embedding, in the same format
+        as search().
+        """
+        if self._sync_due():
+            self._sync_external()
+        return self._backend.query(embeddings, n_results, category_filter)
+
+    def _sync_due(self) -> bool:
+        return not self._sync_holds and time.monotonic() - self._synced_at > SYNC_CHECK_INTERVAL
+
+    def _sync_external(self):
+        """Reload if another process (e.g. the ingest CLI) wrote to the collection.
+
+        Writes through this instance keep the indexes current. Another
+        writer changes the collection's count or rewrites the stats
+        sidecar (which also catches same-size upserts); either way the
+        indexes are rebuilt and the version bump drops cached results.
+        Whatever the backend, BM25 changes the other writer journaled
+        since are replayed without a rebuild.
+        """
+        self._synced_at = time.monotonic()
+        stale = self._stats.changed_on_disk()
+        if not stale:
+            count = self._collection.count()
+            stale = len(self._lexical) != count or (self._backend.needs_embeddings and len(self._backend) != count)
+        if stale:
+            self.refresh()
+        elif self._lexical.changed_on_disk() and self._lexical.sync():
+            self._bump_version()
+
+    # --- Double-buffered refresh ---
+
+    def refresh(self):
+        """Rebuild the in-memory indexes from the collection and swap them in.
+
+        The new vector backend and BM25 index are built off to the side
+        while searches keep using the current ones; the swap is a pair of
+        reference assignments, so a search sees either the old or the new
+        index, never one half-loaded. Cached results are invalidated.
+        """
+        with self._refresh_lock:
+            self._lexical.save()  # so the reloaded index keeps this instance's own writes
+            backend = make_backend(*self._backend_spec)
+            backend.load(self._collection)
+            lexical = BM25Index(self.lexical_path)
+            if len(lexical) != self._collection.count():
+                lexical.rebuild(self._collection)
+            self._backend, self._lexical = backend, lexical
+            self._stats.reload_if_changed()
+            self._synced_at = time.monotonic()
+            self._bump_version()
+
+    @contextmanager
+    def suspend_sync(self):
+        """Pause the automatic reload while another writer updates the collection.
+
+        Searches keep being served from the current indexes until the
+        writer finishes and refresh() is called.
+        """
+        with self._refresh_lock:
+            self._sync_holds += 1
+        try:
+            yield self
+        finally:
+            with self._refresh_lock:
+                self._sync_holds -= 1
+
+    # --- Context selection ---
+
+    def search_context(
+        self,
+        query: str,
+        category_filter: str | list[str] | None = None,
+        mode: str | None = None,
+        max_chunks: int | None = None,
+        max_distance: float | None = None,
+        token_budget: int | None = None,
+    ) -> list[dict]:
+        """Adaptive-k retrieval of prompt context.
+
+        Fetches max_chunks × config.RAG_OVERFETCH candidates with
+        search(), then keeps those within max_distance of the query,
+        diversified by MMR, up to token_budget tokens (see
+        app.knowledge.selection). Limits default to the RAG_* settings.
+        """
+        max_chunks = config.RAG_RESULTS if max_chunks is None else max_chunks
+        candidates, query_vector = self._search(query, max_chunks * config.RAG_OVERFETCH, category_filter, mode)
+        return self._select_context(query_vector, candidates, max_chunks, max_distance, token_budget)
+
+    def _select_context(
+        self,
+        query_vector: list[float] | None,
+        candidates: list[dict],
+        max_chunks: int,
+        max_distance: float | None,
+        token_budget: int | None,
+    ) -> list[dict]:
+        # No query vector for lexical or degraded searches, which skip the cutoff and MMR
+        vectors = None
+        if query_vector is not None and candidates:
+            vectors = self._backend.vectors([item["id"] for item in candidates])
+        return select_context(
+            candidates,
+            query_vector,
+            vectors,
+            max_chunks,
+            max_distance=config.RAG_MAX_DISTANCE if max_distance is None else max_distance,
+            token_budget=config.RAG_TOKEN_BUDGET if token_budget is None else token_budget,
+            mmr_lambda=config.RAG_MMR_LAMBDA,
+        )
+
+    # --- Async API ---
+    # Embeddings go over Ollama's async HTTP client; blocking Chroma calls
+    # run on the dedicated vector store executor, never the loop's default.
+
+    async def _aembed(self, texts: list[str]) -> list[list[float]]:
+        if isinstance(self._embedding_fn, CachedOllamaEmbeddingFunction):
+            return await aget_embeddings(texts, model=self._embedding_fn.model_name)
+        return await get_io_executor().run(self.embed_documents, texts)
+
+    async def asearch(
+        self,
+        query: str,
+        n_results: int = 5,
+        category_filter: str | list[str] | None = None,
+        mode: str | None = None,
+    ) -> list[dict]:
+        """Async search(): same arguments, caching, and results."""
+        return (await self._asearch(query, n_results, category_filter, mode))[0]
+
+    async def _asearch(
+        self,
+        query: str,
+        n_results: int,
+        category_filter: str | list[str] | None,
+        mode: str | None,
+    ) -> tuple[list[dict], list[float] | None]:
+        mode = _check_mode(mode)
+        io = get_io_executor()
+        if self._sync_due():
+            await io.run(self._sync_external)
+        normalized = normalize_query(query)
+        result_key = (normalized, n_results, _filter_key(category_filter), mode, self._version)
+        cached = self._results.get(result_key)
+        if cached is not None:
+            items, embedding = cached
+            return _copy_results(items), embedding
+
+        embedding = None
+        if mode != "lexical":
+            embedding = self._query_embeddings.get(normalized)
+            if embedding is None:
+                try:
+                    embedding = (await self._aembed([query]))[0]
+                except Exception as exc:
+                    if mode == "vector":
+                        raise
+                    return await io.run(self._degraded_search, query, n_results, category_filter, exc), None
+                self._query_embeddings.put(normalized, embedding)
+
+        items = await io.run(self._retrieve, query, n_results, category_filter, mode, embedding)
+        self._results.put(result_key, (items, embedding))
+        return _copy_results(items), embedding
+
+    def compress_context(
+        self,
+        query: str,
+        chunks: list[dict],
+        token_budget: int | None = None,
+    ) -> tuple[list[dict], CompressionStats]:
+        """Trim chunks to the spans most relevant to the query.
+
+        See app.knowledge.compress. Span embeddings read through the
+        embedding cache.
+        """
+        normalized = normalize_query(query)
+        query_vector = self._query_embeddings.get(normalized)
+        if query_vector is None:
+            query_vector = self.embed_documents([query])[0]
+            self._query_embeddings.put(normalized, query_vector)
+        return compress_chunks(
+            chunks,
+            query_vector,
+            self.embed_documents,
+            config.COMPRESS_TOKEN_BUDGET if token_budget is None else token_budget,
+        )
+
+    async def acompress_context(
+        self,
+        query: str,
+        chunks: list[dict],
+        token_budget: int | None = None,
+    ) -> tuple[list[dict], CompressionStats]:
+        """Async compress_context().
+
+        Spans missing from the embedding cache are embedded over Ollama's
+        async API, bounded by config.COMPRESS_EMBED_TIMEOUT (TimeoutError
+        past it), so a slow embed never holds an I/O thread; only the
+        scoring runs on the I/O executor.
+        """
+        token_budget = config.COMPRESS_TOKEN_BUDGET if token_budget is None else token_budget
+        texts = spans_to_embed(chunks, token_budget)
+        if not texts:
+            return compress_chunks(chunks, [], lambda t: [], token_budget)  # nothing to trim
+        normalized = normalize_query(query)
+        query_vector = self._query_embeddings.get(normalized)
+        batch = texts if query_vector is not None else texts + [query]
+        vectors = await asyncio.wait_for(self._aembed(batch), config.COMPRESS_EMBED_TIMEOUT)
+        if query_vector is None:
+            query_vector = vectors.pop()
+            self._query_embeddings.put(normalized, query_vector)
+        embedded = dict(zip(texts, vectors))
+        return await get_io_executor().run(
+            compress_chunks, chunks, query_vector, lambda spans: [embedded[s] for s in spans], token_budget
+        )
+
+    async def asearch_context(
+        self,
+        query: str,
+        category_filter: str | list[str] | None = None,
+        mode: str | None = None,
+        max_chunks: int | None = None,
+        max_distance: float | None = None,
+        token_budget: int | None = None,
+    ) -> list[dict]:
+        """Async search_context()."""
+        max_chunks = config.RAG_RESULTS if max_chunks is None else max_chunks
+        candidates, query_vector = await self._asearch(query, max_chunks * config.RAG_OVERFETCH, category_filter, mode)
+        return await get_io_executor().run(
+            self._select_context, query_vector, candidates, max_chunks, max_distance, token_budget
+        )
+
+    async def aadd_documents(
+        self,
+        ids: list[str],
+        documents: list[str],
+        metadatas: list[dict] | None = None,
+    ) -> int:
+        """Async add_documents(): embeds new chunks asynchronously, then writes."""
+        io = get_io_executor()
+        new_ids, new_docs, new_metas = await io.run(self._filter_new, ids, documents, metadatas)
+        if not new_ids:
+            return 0
+        embeddings = await self._aembed(new_docs)
+        return await io.run(self._add_new, new_ids, new_docs, new_metas, embeddings)
+
+    async def aget_stats(self, rebuild: bool = False) -> dict:
+        """Async get_stats()."""
+        return await get_io_executor().run(self.get_stats, rebuild)
+
+    def cache_stats(self) -> dict:
+        """Return hit/miss metrics for the retrieval caches."""
         return {
-            "total_chunks": count,
-            "sources": sorted(sources),
-            "categories": sorted(categories),
+            "query_embeddings": self._query_embeddings.stats(),
+            "results": self._results.stats(),
+            "version": self._version,
         }
 
-    def delete_by_source(self, source: str):
-        """Delete all chunks from a specific source file."""
-        self._collection.delete(where={"source": source})
+    def get_stats(self, rebuild: bool = False) -> dict:
+        """Return collection statistics.
+
+        Served from the incrementally maintained counts. They are rebuilt
+        with a full metadata scan only if the sidecar is missing or from
+        an older schema, or with rebuild=True. Counts that disagree with
+        the collection (another process mid-ingest) are returned as they
+        are, with "stale" set, instead of being rebuilt under it.
+        """
+        self._stats.reload_if_changed()
+        if rebuild or not self._stats.valid:
+            self._stats.rebuild(self._collection)
+        stats = self._stats.as_dict()
+        stats["stale"] = stats["total_chunks"] != self._collection.count()
+        return stats
+
+    def persist(self):
+        """Write pending stats and lexical index updates to disk now."""
+        self._stats.save()
+        self._lexical.save()
+
+    def delete_by_source(self, source: str, source_dir: str | None = None):
+        """Delete all chunks from a specific source file.
+
+        Pass source_dir to limit deletion to one source label, since
+        starter and local docs may share a filename.
+        """
+        where = {"source": source}
+        if source_dir:
+            where = {"$and": [{"source": source}, {"source_dir": source_dir}]}
+        matched = self._collection.get(where=where, include=["metadatas"])
+        if not matched["ids"]:
+            return
+        self._collection.delete(ids=matched["ids"])
+        self._backend.remove(matched["ids"])
+        self._stats.record_removed(list(matched["metadatas"] or [None] * len(matched["ids"])))
+        self._lexical.remove(matched["ids"])
+        self._bump_version()
 
     def reset(self):
         """Delete all documents in the collection."""
@@ -136,3 +704,25 @@ class VectorStore:
             embedding_function=self._embedding_fn,
             metadata=metadata,
         )
+        self._backend.load(self._collection)
+        # The ingest manifest and dedup links describe the old contents — drop them
+        self.manifest_path.unlink(missing_ok=True)
+        self.dedup_path.unlink(missing_ok=True)
+        self._stats.clear()
+        self._lexical.clear()
+        self._bump_version()
+        self._results.clear()
+
+
+# Shared instance for the API process (avoids a new ChromaDB client per request)
+_shared_store: VectorStore | None = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_store() -> VectorStore:
+    """Return the process-wide VectorStore, creating it on first use."""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = VectorStore()
+        return _shared_store
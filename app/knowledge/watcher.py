@@ -0,0 +1,195 @@
+# Woodshed AI — Source Watcher
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Background ingest of files dropped into the local sources directory.
+
+Started from the API lifespan. The directory is watched with watchfiles
+(inotify on Linux) or, if that isn't installed, polled. Bursts of
+changes are debounced into one incremental ingest, which runs on its
+own thread through a separate writer VectorStore: the serving store's
+in-memory indexes are untouched while the collection is updated, and
+are then rebuilt off to the side and swapped in (VectorStore.refresh).
+Searches never wait on ingest or see a half-applied update.
+
+That guarantee relies on the serving store searching its own in-memory
+index (VECTOR_BACKEND numpy or partitioned). With the chroma backend,
+searches read the collection being written, so the watcher refuses to
+run; re-ingest with the CLI instead.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import config
+from app.knowledge.extractors import source_suffixes
+from app.knowledge.ingest import IngestReport, ingest_directory
+from app.knowledge.vectorstore import VectorStore, get_shared_store
+
+try:
+    from watchfiles import awatch
+except ImportError:  # pragma: no cover - watchfiles ships with uvicorn[standard]
+    awatch = None
+
+logger = logging.getLogger(__name__)
+
+CHROMA_UNSUPPORTED = (
+    "the source watcher needs VECTOR_BACKEND=numpy or partitioned; with chroma, "
+    "searches would see the collection mid-ingest"
+)
+
+
+def _is_source(change, path: str) -> bool:
+    return path.lower().endswith(source_suffixes())
+
+
+class SourceWatcher:
+    """Keeps the knowledge base in step with a sources directory."""
+
+    def __init__(
+        self,
+        store: VectorStore | None = None,
+        directory: Path | None = None,
+        source_label: str = "local",
+        debounce: float | None = None,
+        poll_interval: float | None = None,
+    ):
+        self._store = store
+        self.directory = Path(directory or config.LOCAL_SOURCES_DIR)
+        self.source_label = source_label
+        self.debounce = config.WATCH_DEBOUNCE if debounce is None else debounce
+        self.poll_interval = config.WATCH_POLL_INTERVAL if poll_interval is None else poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="woodshed-watcher")
+        self._sync_lock = threading.Lock()
+        self._stop: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self.syncs = 0
+        self.swaps = 0
+        self.last_sync: float | None = None
+        self.last_report: IngestReport | None = None
+        self.last_error: str | None = None
+
+    @property
+    def store(self) -> VectorStore:
+        return self._store or get_shared_store()
+
+    @property
+    def supported(self) -> bool:
+        """False on the chroma backend, where searches read the collection directly."""
+        return self.store.backend != "chroma"
+
+    # --- Sync ---
+
+    def sync(self) -> IngestReport:
+        """Ingest changes into the collection, then swap in fresh indexes.
+
+        Blocking; runs on the watcher thread. The ingest goes through a
+        writer VectorStore on the same collection with Chroma as its
+        backend, so it builds no in-memory index of its own.
+        """
+        with self._sync_lock:
+            store = self.store
+            if not self.supported:
+                raise RuntimeError(CHROMA_UNSUPPORTED)
+            report = IngestReport()
+            with store.suspend_sync():
+                writer = VectorStore(
+                    persist_dir=str(store.persist_dir),
+                    collection_name=store.collection.name,
+                    embedding_fn=store.embedding_function,
+                    backend="chroma",
+                    cache_size=0,
+                )
+                ingest_directory(self.directory, self.source_label, writer, verbose=False, report=report)
+            if report.added or report.changed or report.removed:
+                store.refresh()
+                self.swaps += 1
+                logger.info("Source watcher: %s", report.summary())
+            self.syncs += 1
+            self.last_sync = time.time()
+            self.last_report = report
+            self.last_error = None
+            return report
+
+    def _sync_safely(self):
+        try:
+            self.sync()
+        except Exception as exc:
+            self.last_error = str(exc)
+            logger.warning("Source watcher ingest failed: %s", exc)
+
+    async def _run_sync(self):
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._sync_safely)
+
+    # --- Watch loop ---
+
+    async def run(self):
+        """Sync once, then again after every debounced burst of changes."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        await self._run_sync()
+        if awatch is not None:
+            step = max(50, int(self.debounce * 1000))
+            async for _ in awatch(
+                self.directory,
+                watch_filter=_is_source,
+                step=step,  # wait this long for the burst to go quiet...
+                debounce=step * 10,  # ...but never longer than this
+                stop_event=self._stop,
+            ):
+                await self._run_sync()
+        else:
+            while not self._stop.is_set():
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    await self._run_sync()
+
+    def start(self) -> asyncio.Task | None:
+        if not self.supported:
+            self.last_error = CHROMA_UNSUPPORTED
+            logger.warning("Source watcher not started: %s", CHROMA_UNSUPPORTED)
+            return None
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "directory": str(self.directory),
+            "mode": "watchfiles" if awatch is not None else "polling",
+            "running": self._task is not None and not self._task.done(),
+            "syncs": self.syncs,
+            "swaps": self.swaps,
+            "last_sync": self.last_sync,
+            "last_result": self.last_report.summary() if self.last_report else None,
+            "last_error": self.last_error,
+        }
+
+
+_watcher: SourceWatcher | None = None
+
+
+def get_source_watcher() -> SourceWatcher | None:
+    """The watcher started by the API lifespan, if any."""
+    return _watcher
+
+
+def set_source_watcher(watcher: SourceWatcher | None):
+    global _watcher
+    _watcher = watcher
@@ -0,0 +1,242 @@
+# Woodshed AI — Conversation History Window
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Token-budgeted view of a conversation's history.
+
+The full transcript is kept for the UI, but only a window of recent
+turns is sent to the model, within config.HISTORY_TOKEN_BUDGET. When a
+finished turn pushes the window over budget, the oldest turns are
+folded into a rolling summary by config.FAST_MODEL on a background
+thread, after the response has already streamed, so it never adds
+latency to a turn. Turns are folded down to half the budget at a time,
+so the summary (and with it the cached prompt prefix) changes only
+every few turns.
+
+If a summary isn't ready when the next turn starts, or the fast model
+fails, the window is trimmed to budget rather than overflowing NUM_CTX.
+It skips ahead to the turn the pending summary folds up to (without one,
+to where a summary would), so the turns sent change in the same steps as
+compaction, not on every call, and what the model has cached survives.
+"""
+
+import json
+import logging
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+import config
+from app.llm import ollama_client
+from app.llm.prompts import HISTORY_SUMMARY_PROMPT
+from app.llm.tokenizer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_OVERHEAD = 4  # role and turn-delimiter tokens per message
+KEEP_RATIO = 0.5  # compaction folds the window down to this share of the budget
+TOOL_RESULT_CHARS = 400  # tool output quoted in the summarizer's transcript
+
+_THINK_RE = re.compile(r"<think>.*?</think>", re.DOTALL)
+
+# One thread: summaries are cheap for the fast model and never urgent
+_summarizer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="woodshed-summarizer")
+
+
+def message_tokens(message: dict) -> int:
+    """Tokens a message occupies in the prompt, tool calls included."""
+    tokens = MESSAGE_OVERHEAD + count_tokens(message.get("content") or "")
+    if message.get("tool_calls"):
+        tokens += count_tokens(json.dumps(message["tool_calls"], default=str))
+    return tokens
+
+
+def turn_starts(messages: list[dict]) -> list[int]:
+    """Indexes of the user messages that start each turn."""
+    return [i for i, m in enumerate(messages) if m.get("role") == "user"]
+
+
+def format_transcript(messages: list[dict]) -> str:
+    """Render messages as plain text for the summarizer."""
+    lines = []
+    for message in messages:
+        role = message.get("role")
+        content = (message.get("content") or "").strip()
+        if role == "user":
+            lines.append(f"Musician: {content}")
+        elif role == "assistant":
+            for call in message.get("tool_calls") or []:
+                function = call.get("function", {})
+                lines.append(f"Woodshed called {function.get('name')}({json.dumps(function.get('arguments'), default=str)})")
+            if content:
+                lines.append(f"Woodshed: {content}")
+        elif role == "tool" and content:
+            lines.append(f"Tool result: {content[:TOOL_RESULT_CHARS]}")
+    return "\n".join(lines)
+
+
+@dataclass
+class HistoryStats:
+    """What the window has done to keep history within budget."""
+    compactions: int = 0  # background summaries folded in
+    turns_summarized: int = 0
+    trimmed_windows: int = 0  # prompts that left turns out (summary late or failed)
+    summary_failures: int = 0
+
+
+class ConversationHistory:
+    """A transcript plus the budgeted window of it that the model sees."""
+
+    def __init__(self, token_budget: int | None = None, summarize: bool | None = None):
+        self.token_budget = config.HISTORY_TOKEN_BUDGET if token_budget is None else token_budget
+        self.summarize = config.SUMMARIZE_HISTORY if summarize is None else summarize
+        self.messages: list[dict] = []
+        self.summary = ""
+        self.stats = HistoryStats()
+        self._start = 0  # first message not folded into the summary
+        self._trim = 0  # first message sent, when over budget before a summary caught up
+        self._folding: int | None = None  # where the pending summary folds up to
+        self._generation = 0  # bumped by reset(), so stale summaries are discarded
+        self._pending: Future | None = None
+        self._lock = threading.Lock()
+
+    def append(self, *messages: dict):
+        with self._lock:
+            self.messages.extend(messages)
+
+    def reset(self):
+        with self._lock:
+            self.messages = []
+            self.summary = ""
+            self._start = self._trim = 0
+            self._folding = None
+            self._generation += 1
+            self._pending = None
+
+    # --- The window ---
+
+    def window(self) -> tuple[str, list[dict]]:
+        """(summary, recent messages) to send, within the token budget.
+
+        Never blocks on a pending summary. If the recent turns don't fit,
+        the window skips ahead to the pending summary's fold point, or
+        else to where a summary would fold to, and stays there until the
+        next step; the newest turn is always kept.
+        """
+        with self._lock:
+            summary = self.summary
+            budget = self.token_budget - count_tokens(summary)
+            first = max(self._start, self._trim)
+            if self._tokens(first) > budget and self._folding is not None and self._folding > first:
+                first = self._trim = self._folding
+            if self._tokens(first) > budget:
+                first = self._trim = self._fold_point(first) or first
+            recent = self.messages[first:]
+            left_out = len(turn_starts(self.messages[self._start:first]))
+        if left_out:
+            self.stats.trimmed_windows += 1
+            logger.info("History over budget; left %d unsummarized turn(s) out of the prompt", left_out)
+        return summary, recent
+
+    def _tokens(self, start: int) -> int:
+        return sum(message_tokens(m) for m in self.messages[start:])
+
+    def window_tokens(self) -> int:
+        with self._lock:
+            return count_tokens(self.summary) + self._tokens(self._start)
+
+    # --- Compaction ---
+
+    def compact_in_background(self) -> Future | None:
+        """Summarize the oldest turns on the summarizer thread if over budget."""
+        if not self.summarize or self.window_tokens() <= self.token_budget:
+            return None
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                return self._pending
+            end = self._fold_point(self._start)
+            if end is None:
+                return None
+            self._folding = end
+            self._pending = _summarizer.submit(self._compact, end)
+            return self._pending
+
+    def _fold_point(self, first: int) -> int | None:
+        """Index from first up to which messages should be folded (always whole turns)."""
+        recent = self.messages[first:]
+        starts = turn_starts(recent)
+        target = self.token_budget * KEEP_RATIO
+        sizes = [message_tokens(m) for m in recent]
+        total = sum(sizes)
+        fold = None
+        # Keep the newest turn no matter what
+        for start in starts[1:]:
+            if total <= target:
+                break
+            total -= sum(sizes[(fold or 0):start])
+            fold = start
+        return None if fold is None else first + fold
+
+    def _compact(self, end: int) -> bool:
+        with self._lock:
+            generation = self._generation
+            start, previous = self._start, self.summary
+            folded = self.messages[start:end]
+        try:
+            summary = summarize_turns(previous, folded)
+        except Exception as exc:
+            with self._lock:
+                self._folding = None
+            self.stats.summary_failures += 1
+            logger.warning("History summary failed; old turns will be trimmed instead: %s", exc)
+            return False
+        with self._lock:
+            if generation != self._generation or start != self._start:
+                return False  # reset or compacted meanwhile
+            self.summary = summary
+            self._start = end
+            self._folding = None
+            self.stats.compactions += 1
+            self.stats.turns_summarized += len(turn_starts(folded))
+        logger.info("Folded %d turn(s) into the history summary (%d tokens)", len(turn_starts(folded)), count_tokens(summary))
+        return True
+
+    def wait(self, timeout: float | None = None):
+        """Block until a pending summary finishes (for tests and shutdown)."""
+        pending = self._pending
+        if pending is not None:
+            pending.result(timeout)
+
+    def as_dict(self) -> dict:
+        return {
+            "messages": len(self.messages),
+            "window_tokens": self.window_tokens(),
+            "token_budget": self.token_budget,
+            "summary_tokens": count_tokens(self.summary),
+            "compactions": self.stats.compactions,
+            "turns_summarized": self.stats.turns_summarized,
+            "trimmed_windows": self.stats.trimmed_windows,
+            "summary_failures": self.stats.summary_failures,
+        }
+
+
+def summarize_turns(previous_summary: str, messages: list[dict]) -> str:
+    """Fold turns into the running summary with FAST_MODEL."""
+    sections = []
+    if previous_summary:
+        sections.append(f"Summary so far:\n{previous_summary}")
+    sections.append(f"New turns:\n{format_transcript(messages)}")
+    response = ollama_client.chat(
+        messages=[
+            {"role": "system", "content": HISTORY_SUMMARY_PROMPT.format(max_tokens=config.HISTORY_SUMMARY_TOKENS)},
+            {"role": "user", "content": "\n\n".join(sections)},
+        ],
+        model=config.FAST_MODEL,
+        temperature=0.2,
+        max_tokens=config.HISTORY_SUMMARY_TOKENS,
+    )
+    summary = _THINK_RE.sub("", response.message.content or "").strip()
+    if not summary:
+        raise ValueError("empty summary")
+    return summary
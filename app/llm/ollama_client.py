@@ -4,6 +4,8 @@
 
 """Wrapper around the Ollama API for chat, streaming, tool-use, and embeddings."""
 
+import asyncio
+import weakref
 from collections.abc import Generator
 
 import ollama
@@ -16,19 +18,26 @@ def chat(
     tools: list[dict] | None = None,
     model: str | None = None,
     temperature: float | None = None,
+    keep_alive: str | float | None = None,
+    max_tokens: int | None = None,
 ) -> dict:
     """Send a chat message and return the full response.
 
     Returns the raw Ollama response dict with .message.content and
-    optionally .message.tool_calls.
+    optionally .message.tool_calls. keep_alive is how long Ollama keeps
+    the model (and its prompt cache) loaded afterwards; max_tokens caps
+    the length of the reply.
     """
     model = model or config.LLM_MODEL
     opts: dict = {"num_ctx": config.NUM_CTX}
     if temperature is not None:
         opts["temperature"] = temperature
+    if max_tokens is not None:
+        opts["num_predict"] = max_tokens
+    keep_alive = config.LLM_KEEP_ALIVE if keep_alive is None else keep_alive
 
     try:
-        kwargs = dict(model=model, messages=messages, options=opts)
+        kwargs = dict(model=model, messages=messages, options=opts, keep_alive=keep_alive)
         if tools:
             kwargs["tools"] = tools
         return ollama.chat(**kwargs)
@@ -45,18 +54,21 @@ def chat_stream(
     tools: list[dict] | None = None,
     model: str | None = None,
     temperature: float | None = None,
+    keep_alive: str | float | None = None,
 ) -> Generator:
     """Stream a chat response, yielding chunks as they arrive.
 
-    Each yielded item is a partial response dict from Ollama.
+    Each yielded item is a partial response dict from Ollama; the last
+    one (done=True) carries prompt_eval_count and timings.
     """
     model = model or config.LLM_MODEL
     opts: dict = {"num_ctx": config.NUM_CTX}
     if temperature is not None:
         opts["temperature"] = temperature
+    keep_alive = config.LLM_KEEP_ALIVE if keep_alive is None else keep_alive
 
     try:
-        kwargs = dict(model=model, messages=messages, stream=True, options=opts)
+        kwargs = dict(model=model, messages=messages, stream=True, options=opts, keep_alive=keep_alive)
         if tools:
             kwargs["tools"] = tools
         yield from ollama.chat(**kwargs)
@@ -78,6 +90,29 @@ def get_embedding(text: str, model: str | None = None) -> list[float]:
         raise OllamaError(f"Embedding generation failed: {e}") from e
 
 
+# One AsyncClient per event loop — its connection pool is bound to the loop
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _get_async_client() -> ollama.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = ollama.AsyncClient(host=config.OLLAMA_HOST)
+        _async_clients[loop] = client
+    return client
+
+
+async def aembed(texts: list[str], model: str | None = None) -> list[list[float]]:
+    """Embed a batch of texts without blocking the event loop."""
+    model = model or config.EMBEDDING_MODEL
+    try:
+        response = await _get_async_client().embed(model=model, input=texts)
+        return response["embeddings"]
+    except Exception as e:
+        raise OllamaError(f"Embedding generation failed: {e}") from e
+
+
 def list_models() -> list[str]:
     """Return names of locally available Ollama models."""
     try:
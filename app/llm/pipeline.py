@@ -5,25 +5,30 @@
 """RAG conversation pipeline: search → augment → LLM → tool-call loop."""
 
 import json
+import logging
 import os
 import re
+import time
 from collections.abc import Generator
 from dataclasses import dataclass, field
 from typing import Literal
 
 import config
-from app.knowledge.vectorstore import VectorStore
+from app.knowledge.compress import CompressionStats
+from app.knowledge.vectorstore import VectorStore, get_shared_store
 from app.llm import ollama_client
-from app.llm.prompts import build_system_prompt
-from app.theory.tools import MUSIC_TOOLS as THEORY_TOOLS, TOOL_FUNCTIONS as THEORY_FUNCS
-from app.audio.tools import AUDIO_TOOLS, AUDIO_TOOL_FUNCTIONS
-from app.output.tools import OUTPUT_TOOLS, OUTPUT_TOOL_FUNCTIONS
+from app.llm.history import ConversationHistory
+from app.llm.prompt_cache import PrefixTracker
+from app.llm.prompts import FINAL_ANSWER_PROMPT, HISTORY_TEMPLATE, build_system_prompt, build_user_turn
+from app.llm.router import check_prefix, prefix_settled, record_turn, route_message, validate_turn
+from app.llm.tool_cache import canonical_args
+from app.llm.tool_executor import get_tool_executor
+from app.llm.tools import MUSIC_TOOLS, TOOL_FUNCTIONS
 
-# Merge theory + audio + output tools
-MUSIC_TOOLS = THEORY_TOOLS + AUDIO_TOOLS + OUTPUT_TOOLS
-TOOL_FUNCTIONS = {**THEORY_FUNCS, **AUDIO_TOOL_FUNCTIONS, **OUTPUT_TOOL_FUNCTIONS}
+logger = logging.getLogger(__name__)
 
 MAX_TOOL_ROUNDS = 3
+RETRIEVAL_STATUS = "Checking my notes..."
 
 
 # --- Stream event types ---
@@ -172,14 +177,8 @@ class ThinkingParser:
 
 
 # Shared VectorStore instance (avoids recreating ChromaDB client per message)
-_vectorstore: VectorStore | None = None
-
-
 def _get_vectorstore() -> VectorStore:
-    global _vectorstore
-    if _vectorstore is None:
-        _vectorstore = VectorStore()
-    return _vectorstore
+    return get_shared_store()
 
 
 # --- Tool execution helper ---
@@ -204,23 +203,15 @@ def _execute_tool_calls(tool_calls, messages, generated_files=None):
         ],
     })
 
-    for tc in tool_calls:
-        name = tc.function.name
-        args = tc.function.arguments
-        if name in TOOL_FUNCTIONS:
-            try:
-                result = TOOL_FUNCTIONS[name](**args)
-            except Exception as e:
-                result = {"error": str(e)}
-        else:
-            result = {"error": f"Unknown tool: {name}"}
+    calls = [(tc.function.name, tc.function.arguments) for tc in tool_calls]
+    results = [None] * len(calls)
+    for i, result in get_tool_executor().run_round(calls):
+        results[i] = result
 
+    for result in results:
         # Track generated files (MIDI, MusicXML, etc.)
-        if generated_files is not None and isinstance(result, dict):
-            for key in ("file_path", "midi_path"):
-                path = result.get(key)
-                if path and isinstance(path, str):
-                    generated_files.append(path)
+        if generated_files is not None:
+            _collect_files(result, generated_files)
 
         messages.append({
             "role": "tool",
@@ -228,6 +219,15 @@ def _execute_tool_calls(tool_calls, messages, generated_files=None):
         })
 
 
+def _collect_files(result, generated_files: list[str]):
+    """Add file paths from a tool result to generated_files."""
+    if isinstance(result, dict):
+        for key in ("file_path", "midi_path"):
+            path = result.get(key)
+            if path and isinstance(path, str):
+                generated_files.append(path)
+
+
 def _emit_tool_parts(name: str, result) -> Generator[StreamPart, None, None]:
     """Emit typed content parts from a tool result for declarative rendering."""
     if not isinstance(result, dict) or "error" in result:
@@ -279,6 +279,35 @@ def _condense_tool_result(name: str, result) -> str:
     return json.dumps(condensed, default=str)
 
 
+@dataclass
+class _Turn:
+    """What one model's answer to a turn produced."""
+    text: str = ""
+    history_additions: list[dict] = field(default_factory=list)
+    tool_results: list[tuple[str, object]] = field(default_factory=list)
+    first_token_at: float | None = None
+    # Successful results by (name, canonical args), for an escalated retry to reuse
+    results_by_call: dict[tuple[str, str], object] = field(default_factory=dict)
+
+
+def _call_key(name: str, args: dict | None) -> tuple[str, str]:
+    return name, canonical_args(args)
+
+
+def _run_calls(calls: list[tuple[str, dict | None]], reuse: dict[tuple[str, str], object]):
+    """Yield (index, result) for a round: reused results first, then the rest as they finish."""
+    pending = []
+    for i, call in enumerate(calls):
+        key = _call_key(*call)
+        if key in reuse:
+            yield i, reuse[key]
+        else:
+            pending.append(i)
+    if pending:
+        for j, result in get_tool_executor().run_round([calls[i] for i in pending]):
+            yield pending[j], result
+
+
 def _find_user_message(messages: list[dict]) -> str:
     """Walk back through messages to find the last user message."""
     for msg in reversed(messages):
@@ -288,13 +317,141 @@ def _find_user_message(messages: list[dict]) -> str:
 
 
 class MusicConversation:
-    """Manages a multi-turn conversation with RAG and tool-use."""
+    """Manages a multi-turn conversation with RAG and tool-use.
 
-    def __init__(self):
-        self.messages: list[dict] = []
+    With the stable prompt layout (config.PROMPT_LAYOUT, the default)
+    the system prompt and tool schemas never change and each turn's RAG
+    context and MIDI analysis ride along with the newest user message,
+    so everything before it is a prefix Ollama can serve from its KV
+    cache. prefix_cache tracks how much of each prompt that covers.
+
+    History sent to the model is a token-budgeted window of recent turns
+    plus a rolling summary of older ones (see app.llm.history).
+    """
+
+    def __init__(self, keep_alive: str | float | None = None):
+        self.history = ConversationHistory()
         self.generated_files: list[str] = []
+        self.last_compression: CompressionStats | None = None
+        self.keep_alive = config.LLM_KEEP_ALIVE if keep_alive is None else keep_alive
+        self.prefix_cache = PrefixTracker()
         self._vectorstore = _get_vectorstore()
 
+    @property
+    def messages(self) -> list[dict]:
+        """The full transcript (the model sees a window of it)."""
+        return self.history.messages
+
+    def retrieve(self, user_message: str, category_filter: str | None = None) -> list[dict]:
+        """Fetch and compress RAG context for a message."""
+        chunks = self._vectorstore.search_context(user_message, category_filter=category_filter)
+        return self._compress(user_message, chunks)
+
+    async def aretrieve(self, user_message: str, category_filter: str | None = None) -> list[dict]:
+        """Fetch RAG context without blocking the event loop (see send_stream)."""
+        chunks = await self._vectorstore.asearch_context(user_message, category_filter=category_filter)
+        self.last_compression = None
+        if not config.COMPRESS_CONTEXT or not chunks:
+            return chunks
+        try:
+            compressed, stats = await self._vectorstore.acompress_context(user_message, chunks)
+        except Exception as exc:
+            logger.warning("Context compression skipped: %r", exc)
+            return chunks
+        return self._compressed(compressed, stats)
+
+    def _compress(self, user_message: str, chunks: list[dict]) -> list[dict]:
+        """Trim chunks to their query-relevant spans and record the savings."""
+        self.last_compression = None
+        if not config.COMPRESS_CONTEXT or not chunks:
+            return chunks
+        try:
+            chunks, stats = self._vectorstore.compress_context(user_message, chunks)
+        except Exception as exc:
+            logger.warning("Context compression skipped: %s", exc)
+            return chunks
+        return self._compressed(chunks, stats)
+
+    def _compressed(self, chunks: list[dict], stats: CompressionStats) -> list[dict]:
+        self.last_compression = stats
+        if stats.tokens_saved:
+            logger.info("Context compression: %s", stats.summary())
+        return chunks
+
+    # --- Prompt layout ---
+
+    def _build_messages(
+        self,
+        user_message: str,
+        context_chunks: list[dict] | None,
+        midi_summary: str | None,
+    ) -> list[dict]:
+        """Prompt for this turn: system prompt, history window, then the user turn.
+
+        In the stable layout the history summary is a message of its own
+        after the fixed system prompt, so a compaction leaves the system
+        prompt (and the cache for it) untouched.
+        """
+        summary, recent = self.history.window()
+        if config.PROMPT_LAYOUT == "system":
+            system_msg = build_system_prompt(context_chunks, midi_summary=midi_summary, history_summary=summary)
+            messages = [{"role": "system", "content": system_msg}]
+            user_turn = user_message
+        else:
+            messages = [{"role": "system", "content": build_system_prompt()}]
+            if summary:
+                messages.append({"role": "system", "content": HISTORY_TEMPLATE.format(summary=summary)})
+            user_turn = build_user_turn(user_message, context_chunks, midi_summary)
+        messages.extend(recent)
+        messages.append({"role": "user", "content": user_turn})
+        return messages
+
+    @staticmethod
+    def _round_tools(round_num: int) -> list[dict] | None:
+        """Tools offered on a post-tool round.
+
+        The last round normally drops them to force a text answer, but
+        that changes the prompt prefix; the stable layout keeps them. If
+        the model still answers the last round with only tool calls, one
+        follow-up call without tools asks for the text (_answer_messages).
+        """
+        if round_num < MAX_TOOL_ROUNDS - 1 or config.PROMPT_LAYOUT != "system":
+            return MUSIC_TOOLS
+        return None
+
+    @staticmethod
+    def _answer_messages(messages: list[dict]) -> list[dict]:
+        """The last round's prompt plus a nudge to answer in text (not kept in history)."""
+        return messages + [{"role": "user", "content": FINAL_ANSWER_PROMPT}]
+
+    def _chat(self, messages: list[dict], tools, model: str, temperature: float):
+        response = ollama_client.chat(
+            messages=messages,
+            tools=tools,
+            model=model,
+            temperature=temperature,
+            keep_alive=self.keep_alive,
+        )
+        self._record_prefix(model, messages, tools, response)
+        return response
+
+    def _chat_stream(self, messages: list[dict], tools, model: str, temperature: float):
+        last = None
+        for chunk in ollama_client.chat_stream(
+            messages=messages,
+            tools=tools,
+            model=model,
+            temperature=temperature,
+            keep_alive=self.keep_alive,
+        ):
+            last = chunk
+            yield chunk
+        self._record_prefix(model, messages, tools, last)
+
+    def _record_prefix(self, model: str, messages: list[dict], tools, response):
+        call = self.prefix_cache.record(model, messages, tools, response)
+        logger.debug("Prompt prefix: %s", call.summary())
+
     def send(
         self,
         user_message: str,
@@ -307,23 +464,13 @@ class MusicConversation:
         model = config.LLM_MODEL
 
         # 1. RAG retrieval
-        context_chunks = self._vectorstore.search(
-            user_message, n_results=config.RAG_RESULTS, category_filter=category_filter
-        )
+        context_chunks = self.retrieve(user_message, category_filter=category_filter)
 
         # 2. Build message list
-        system_msg = build_system_prompt(context_chunks, midi_summary=midi_summary)
-        messages = [{"role": "system", "content": system_msg}]
-        messages.extend(self.messages)
-        messages.append({"role": "user", "content": user_message})
+        messages = self._build_messages(user_message, context_chunks, midi_summary)
 
         # 3. Call LLM with tools
-        response = ollama_client.chat(
-            messages=messages,
-            tools=MUSIC_TOOLS,
-            model=model,
-            temperature=temperature,
-        )
+        response = self._chat(messages, MUSIC_TOOLS, model, temperature)
 
         # 4. Tool-call loop
         self.generated_files = []
@@ -331,17 +478,17 @@ class MusicConversation:
             if not response.message.tool_calls:
                 break
             _execute_tool_calls(response.message.tool_calls, messages, self.generated_files)
-            response = ollama_client.chat(
-                messages=messages,
-                tools=MUSIC_TOOLS,
-                model=model,
-                temperature=temperature,
-            )
+            response = self._chat(messages, MUSIC_TOOLS, model, temperature)
+        if response.message.tool_calls and not response.message.content:
+            response = self._chat(self._answer_messages(messages), None, model, temperature)
 
         # 5. Store in conversation history and return
         final_text = response.message.content or ""
-        self.messages.append({"role": "user", "content": user_message})
-        self.messages.append({"role": "assistant", "content": final_text})
+        self.history.append(
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": final_text},
+        )
+        self.history.compact_in_background()
         return final_text
 
     def send_stream(
@@ -350,52 +497,121 @@ class MusicConversation:
         temperature: float | None = None,
         category_filter: str | None = None,
         midi_summary: str | None = None,
+        context_chunks: list[dict] | None = None,
     ) -> Generator[StreamEvent, None, None]:
         """Send a message and stream the response as structured events.
 
         Streams tokens immediately via streaming + tools. If the model
         decides to call tools, they are executed and a post-tool streaming
         call follows. No non-streaming first call needed.
+
+        With ROUTER_ENABLED, chit-chat and single-tool turns are answered
+        by FAST_MODEL. Its status updates are shown as they happen; the
+        answer is checked as it streams and held only until a short prefix
+        (and, for tool turns, the tool results) has passed, then streams
+        live. If the check fails first, the fast model is stopped and the
+        turn is re-run on LLM_MODEL, reusing the fast turn's successful
+        tool results (a MIDI or MusicXML export isn't written twice).
+
+        Pass context_chunks (e.g. from aretrieve()) to skip the blocking
+        retrieval step.
         """
         temperature = temperature if temperature is not None else config.TEMPERATURE
-        model = config.LLM_MODEL
 
-        # 1. RAG retrieval
-        yield StreamStatus(step="Checking my notes...")
-        context_chunks = self._vectorstore.search(
-            user_message, n_results=config.RAG_RESULTS, category_filter=category_filter
-        )
+        # 1. RAG retrieval (with context_chunks the caller already showed RETRIEVAL_STATUS)
+        if context_chunks is None:
+            yield StreamStatus(step=RETRIEVAL_STATUS)
+            context_chunks = self.retrieve(user_message, category_filter=category_filter)
         n_chunks = len(context_chunks)
         if n_chunks:
             categories = {c.get("category", "general") for c in context_chunks if isinstance(c, dict)}
             cat_str = ", ".join(sorted(categories)) if categories else "music theory"
             yield StreamStatus(
-                step="Checking my notes...",
+                step=RETRIEVAL_STATUS,
                 detail=f"Found {n_chunks} relevant section{'s' if n_chunks != 1 else ''} on {cat_str}",
             )
 
-        # 2. Build message list
-        system_msg = build_system_prompt(context_chunks, midi_summary=midi_summary)
-        messages = [{"role": "system", "content": system_msg}]
-        messages.extend(self.messages)
-        messages.append({"role": "user", "content": user_message})
+        # 2. Route: simple turns go to the fast model, checked as they stream
+        route = route_message(user_message) if config.ROUTER_ENABLED else None
+        started = time.perf_counter()
+        turn = _Turn()
+        if route is not None and route.fast:
+            messages = self._build_messages(user_message, context_chunks, midi_summary)
+            held, text, results = [], "", []
+            problem = shown_at = None
+            for event in self._stream_turn(messages, route.model, temperature, turn):
+                # Stop a failed answer, but let a tool round finish so its results can be reused
+                if problem is not None and not isinstance(event, (StreamToolCall, StreamPart)):
+                    break
+                if shown_at is not None or isinstance(event, StreamStatus):
+                    yield event
+                    continue
+                held.append(event)
+                if isinstance(event, StreamToken):
+                    text += event.text
+                elif isinstance(event, StreamToolCall):
+                    results.append((event.name, event.result))
+                problem = check_prefix(route, text, results)
+                if problem is None and prefix_settled(route, text, results):
+                    shown_at = time.perf_counter()
+                    yield from held
+            if shown_at is None and problem is None:
+                problem = validate_turn(route, turn.text, turn.tool_results)
+                if problem is None:
+                    shown_at = time.perf_counter() if held else None
+                    yield from held
+            if problem is None:
+                # Latency is measured to what the client sees, not to held tokens
+                record_turn(route, started, shown_at)
+            else:
+                logger.info("Escalating %s turn from %s: %s", route.name, route.model, problem)
+                yield StreamStatus(step="Taking a closer look...")
+                reuse, turn = turn.results_by_call, _Turn()
+                messages = self._build_messages(user_message, context_chunks, midi_summary)
+                yield from self._stream_turn(messages, config.LLM_MODEL, temperature, turn, reuse)
+                record_turn(route, started, turn.first_token_at, escalated=True)
+        else:
+            messages = self._build_messages(user_message, context_chunks, midi_summary)
+            yield from self._stream_turn(messages, config.LLM_MODEL, temperature, turn)
+            if route is not None:
+                record_turn(route, started, turn.first_token_at)
+
+        # 3. Store full exchange in conversation history (user + tools + final text)
+        self.history.append(
+            {"role": "user", "content": user_message},
+            *turn.history_additions,
+            {"role": "assistant", "content": turn.text},
+        )
+        # Summarize old turns now, while the user reads the reply
+        self.history.compact_in_background()
 
-        # 3. Stream first call with tools — tokens arrive immediately
+    def _stream_turn(
+        self,
+        messages: list[dict],
+        model: str,
+        temperature: float,
+        turn: "_Turn",
+        reuse: dict[tuple[str, str], object] | None = None,
+    ) -> Generator[StreamEvent, None, None]:
+        """Stream one model's answer, running tool calls between rounds.
+
+        Streams tokens immediately via streaming + tools. If the model
+        decides to call tools, each round's calls run concurrently (see
+        tool_executor) and a post-tool streaming call follows. Calls
+        found in reuse (a failed fast turn's results) aren't run again.
+        What happened is recorded on turn.
+        """
+        # Stream first call with tools — tokens arrive immediately
         yield StreamStatus(step="Noodling on it...")
         self.generated_files = []
         tool_calls = None
         parser = ThinkingParser()
-        # Track messages to persist in conversation history
-        history_additions: list[dict] = []
 
-        for chunk in ollama_client.chat_stream(
-            messages=messages,
-            tools=MUSIC_TOOLS,
-            model=model,
-            temperature=temperature,
-        ):
+        for chunk in self._chat_stream(messages, MUSIC_TOOLS, model, temperature):
             token = chunk.message.content or ""
             if token:
+                if turn.first_token_at is None:
+                    turn.first_token_at = time.perf_counter()
                 yield from parser.feed(token)
             # Ollama sends tool_calls in the final chunk
             if hasattr(chunk.message, "tool_calls") and chunk.message.tool_calls:
@@ -403,45 +619,38 @@ class MusicConversation:
 
         yield from parser.flush()
 
-        # 4. If no tool calls, we're done — text was already streamed
+        # If no tool calls, we're done — text was already streamed
         if not tool_calls:
-            clean_text = parser.get_clean_text()
-            self.messages.append({"role": "user", "content": user_message})
-            self.messages.append({"role": "assistant", "content": clean_text})
+            turn.text = parser.get_clean_text()
             return
 
         # Store initial assistant text (if any was streamed before tool calls)
         initial_text = parser.get_clean_text()
         if initial_text:
-            history_additions.append({"role": "assistant", "content": initial_text})
+            turn.history_additions.append({"role": "assistant", "content": initial_text})
 
-        # 5. Tool-call loop — execute tools, yield events
+        # Tool-call loop — execute tools, yield events
         for round_num in range(MAX_TOOL_ROUNDS):
             if not tool_calls:
                 break
 
-            for tc in tool_calls:
-                name = tc.function.name
-                args = tc.function.arguments
-                step_msg = TOOL_STATUS_MESSAGES.get(name, f"Running {name}...")
-                yield StreamStatus(step=step_msg)
-                # Execute tool
-                if name in TOOL_FUNCTIONS:
-                    try:
-                        result = TOOL_FUNCTIONS[name](**args)
-                    except Exception as e:
-                        result = {"error": str(e)}
-                else:
-                    result = {"error": f"Unknown tool: {name}"}
-                # Track generated files
-                if isinstance(result, dict):
-                    for key in ("file_path", "midi_path"):
-                        path = result.get(key)
-                        if path and isinstance(path, str):
-                            self.generated_files.append(path)
+            # Run the round's calls at once; results go back in the model's order
+            calls = [(tc.function.name, tc.function.arguments) for tc in tool_calls]
+            for name, _ in calls:
+                yield StreamStatus(step=TOOL_STATUS_MESSAGES.get(name, f"Running {name}..."))
+            results = [None] * len(calls)
+            for i, result in _run_calls(calls, reuse or {}):
+                results[i] = result
+                name, args = calls[i]
+                if not (isinstance(result, dict) and "error" in result):
+                    turn.results_by_call[_call_key(name, args)] = result
                 yield StreamToolCall(name=name, arguments=args, result=result)
                 # Emit typed content parts from tool results
                 yield from _emit_tool_parts(name, result)
+
+            for (name, args), result in zip(calls, results):
+                turn.tool_results.append((name, result))
+                _collect_files(result, self.generated_files)
                 # Append full result to messages for the current LLM call
                 tool_call_msg = {
                     "role": "assistant",
@@ -455,8 +664,8 @@ class MusicConversation:
                 messages.append(tool_call_msg)
                 messages.append(tool_result_msg)
                 # Store condensed version in persistent history (saves tokens)
-                history_additions.append(tool_call_msg)
-                history_additions.append({
+                turn.history_additions.append(tool_call_msg)
+                turn.history_additions.append({
                     "role": "tool",
                     "content": _condense_tool_result(name, result),
                 })
@@ -466,12 +675,7 @@ class MusicConversation:
             parser = ThinkingParser()
             yield StreamStatus(step="Putting it all together...")
 
-            for chunk in ollama_client.chat_stream(
-                messages=messages,
-                tools=MUSIC_TOOLS if round_num < MAX_TOOL_ROUNDS - 1 else None,
-                model=model,
-                temperature=temperature,
-            ):
+            for chunk in self._chat_stream(messages, self._round_tools(round_num), model, temperature):
                 token = chunk.message.content or ""
                 if token:
                     yield from parser.feed(token)
@@ -480,15 +684,21 @@ class MusicConversation:
 
             yield from parser.flush()
 
-        # 6. Store full exchange in conversation history (user + tools + final text)
-        clean_text = parser.get_clean_text()
-        self.messages.append({"role": "user", "content": user_message})
-        self.messages.extend(history_additions)
-        self.messages.append({"role": "assistant", "content": clean_text})
+        # Tool calls out of rounds and nothing said: ask once more, without tools
+        if tool_calls and not parser.get_clean_text():
+            parser = ThinkingParser()
+            for chunk in self._chat_stream(self._answer_messages(messages), None, model, temperature):
+                token = chunk.message.content or ""
+                if token:
+                    yield from parser.feed(token)
+            yield from parser.flush()
+
+        turn.text = parser.get_clean_text()
 
     def reset(self):
         """Clear conversation history."""
-        self.messages = []
+        self.history.reset()
+        self.prefix_cache = PrefixTracker()
 
     def get_history(self) -> list[dict]:
         """Return conversation history."""
@@ -0,0 +1,124 @@
+# Woodshed AI — Prompt Prefix Reuse
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Track how much of each prompt the model's KV cache can reuse.
+
+Ollama keeps the KV cache of the last prompt a model ran and only
+prefills tokens after the longest prefix it shares with the new one.
+With the stable prompt layout (config.PROMPT_LAYOUT) the system prompt,
+tool schemas, and earlier history are byte-identical from call to call,
+so each turn only prefills what's new.
+
+For each call we estimate the reusable prefix — the leading messages
+identical to the previous call's — and record what Ollama reports it
+actually evaluated (prompt_eval_count / prompt_eval_duration).
+"""
+
+import json
+import threading
+from dataclasses import dataclass
+
+from app.llm.tokenizer import count_tokens
+
+
+@dataclass
+class PrefixStats:
+    """Prompt tokens sent vs. reusable from the previous call's prefix."""
+    calls: int = 0
+    prompt_tokens: int = 0  # estimated tokens per prompt, summed
+    reused_tokens: int = 0  # of which in a prefix shared with the previous call
+    prefill_tokens: int = 0  # tokens Ollama reports it actually evaluated
+    prefill_seconds: float = 0.0
+
+    @property
+    def reuse_ratio(self) -> float:
+        return self.reused_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    def add(self, other: "PrefixStats"):
+        self.calls += other.calls
+        self.prompt_tokens += other.prompt_tokens
+        self.reused_tokens += other.reused_tokens
+        self.prefill_tokens += other.prefill_tokens
+        self.prefill_seconds += other.prefill_seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "reused_tokens": self.reused_tokens,
+            "reuse_ratio": round(self.reuse_ratio, 3),
+            "prefill_tokens": self.prefill_tokens,
+            "prefill_seconds": round(self.prefill_seconds, 3),
+        }
+
+    def summary(self) -> str:
+        return (
+            f"{self.reused_tokens}/{self.prompt_tokens} prompt tokens in a reusable prefix "
+            f"({self.reuse_ratio:.0%}); {self.prefill_tokens} prefilled in {self.prefill_seconds:.2f}s"
+        )
+
+
+_totals = PrefixStats()
+_totals_lock = threading.Lock()
+
+
+def prefix_stats() -> dict:
+    """Prefix reuse across every conversation since startup."""
+    with _totals_lock:
+        return _totals.as_dict()
+
+
+def _serialize(message: dict) -> str:
+    return json.dumps(message, sort_keys=True, default=str)
+
+
+def _message_tokens(message: dict) -> int:
+    tokens = count_tokens(message.get("content") or "")
+    if message.get("tool_calls"):
+        tokens += count_tokens(json.dumps(message["tool_calls"], default=str))
+    return tokens
+
+
+class PrefixTracker:
+    """Per-conversation record of the last prompt sent to the model."""
+
+    def __init__(self):
+        self.stats = PrefixStats()
+        self.last: PrefixStats | None = None  # the most recent call alone
+        self._model: str | None = None
+        self._tools: str | None = None
+        self._messages: list[str] = []
+
+    def record(self, model: str, messages: list[dict], tools: list[dict] | None, response=None) -> PrefixStats:
+        """Record one chat call; response is the final (done) chunk, if any."""
+        tools_key = json.dumps(tools, sort_keys=True) if tools else ""
+        serialized = [_serialize(m) for m in messages]
+        tool_tokens = count_tokens(tools_key)
+        call = PrefixStats(calls=1)
+        call.prompt_tokens = tool_tokens + sum(_message_tokens(m) for m in messages)
+
+        # Tool schemas are rendered after the system message, so reuse past
+        # the first message needs the same tools as last time
+        if model == self._model:
+            shared = 0
+            for old, new in zip(self._messages, serialized):
+                if old != new:
+                    break
+                shared += 1
+            if shared and tools_key != self._tools:
+                shared = 1
+            call.reused_tokens = sum(_message_tokens(m) for m in messages[:shared])
+            if shared and tools_key == self._tools:
+                call.reused_tokens += tool_tokens
+
+        if response is not None:
+            call.prefill_tokens = int(getattr(response, "prompt_eval_count", 0) or 0)
+            call.prefill_seconds = (getattr(response, "prompt_eval_duration", 0) or 0) / 1e9
+
+        self._model, self._tools, self._messages = model, tools_key, serialized
+        self.stats.add(call)
+        self.last = call
+        with _totals_lock:
+            _totals.add(call)
+        return call
@@ -95,22 +95,95 @@ tempo, and other details from the file when relevant. Speak naturally about \
 what you observe in the music.\
 """
 
+HISTORY_TEMPLATE = """\
+Summary of the earlier conversation (older turns are not shown):
 
-def build_system_prompt(
+---
+{summary}
+---\
+"""
+
+HISTORY_SUMMARY_PROMPT = """\
+You maintain a running summary of a conversation between a musician and \
+Woodshed AI, a music theory and songwriting assistant. Merge the new turns \
+into the summary so far. Keep what later turns may refer back to: the \
+musician's goals, instrument, genre and preferences; keys, chords, \
+progressions and voicings discussed; files generated; open questions and \
+suggestions that were offered. Drop greetings and filler. Write compact \
+plain sentences, under {max_tokens} tokens. Reply with the summary only.\
+"""
+
+ROUTER_PROMPT = """\
+Classify the musician's message for a music theory assistant. Answer with \
+one word:
+chat — greetings, thanks, small talk
+tool — one quick lookup or file: a chord's notes, a key, voicings, a scale, \
+a MIDI file, a tab, notation
+creative — writing or arranging music, explanations, advice, anything open-ended\
+"""
+
+USER_TURN_TEMPLATE = """\
+{context}
+
+The musician's message:
+{message}\
+"""
+
+FINAL_ANSWER_PROMPT = """\
+No more tools this turn. Answer the musician now using the tool results \
+above.\
+"""
+
+
+def build_turn_context(
     context_chunks: list[dict] | None = None,
     midi_summary: str | None = None,
 ) -> str:
-    """Build the full system prompt, optionally with RAG context and MIDI analysis."""
-    prompt = SYSTEM_PROMPT
+    """Format this turn's RAG context and MIDI analysis ("" if there is none)."""
+    blocks = []
 
     if context_chunks:
         context_text = "\n\n".join(
             chunk["document"] for chunk in context_chunks if chunk.get("document")
         )
         if context_text.strip():
-            prompt += "\n\n" + CONTEXT_TEMPLATE.format(context=context_text)
+            blocks.append(CONTEXT_TEMPLATE.format(context=context_text))
 
     if midi_summary:
-        prompt += "\n\n" + MIDI_CONTEXT_TEMPLATE.format(midi_analysis=midi_summary)
+        blocks.append(MIDI_CONTEXT_TEMPLATE.format(midi_analysis=midi_summary))
+
+    return "\n\n".join(blocks)
+
+
+def build_system_prompt(
+    context_chunks: list[dict] | None = None,
+    midi_summary: str | None = None,
+    history_summary: str | None = None,
+) -> str:
+    """Build the full system prompt, optionally with RAG context and MIDI analysis.
+
+    history_summary (older turns folded away by the history window)
+    goes before the context. The stable layout leaves it out and sends
+    the summary as its own message instead (see MusicConversation).
+    """
+    prompt = SYSTEM_PROMPT
+    if history_summary:
+        prompt += "\n\n" + HISTORY_TEMPLATE.format(summary=history_summary)
+    context = build_turn_context(context_chunks, midi_summary)
+    return prompt + "\n\n" + context if context else prompt
+
 
-    return prompt
+def build_user_turn(
+    user_message: str,
+    context_chunks: list[dict] | None = None,
+    midi_summary: str | None = None,
+) -> str:
+    """Build the newest user message with this turn's context in front of it.
+
+    Used by the stable prompt layout, where the system prompt never
+    changes so the model's cached prefix survives from turn to turn.
+    """
+    context = build_turn_context(context_chunks, midi_summary)
+    if not context:
+        return user_message
+    return USER_TURN_TEMPLATE.format(context=context, message=user_message)
@@ -0,0 +1,210 @@
+# Woodshed AI — Intent Router
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Send simple turns to FAST_MODEL and keep the big model for real work.
+
+Each message is classified into one of three routes:
+
+- chat: thanks, greetings, acknowledgements
+- tool: a request one theory or output tool can answer ("what notes are
+  in Dm7?", "make that a MIDI file")
+- creative: open-ended writing, explaining, and anything else
+
+Rules decide the clear cases for free. Messages they can't place are
+scored by FAST_MODEL with a one-word answer, if ROUTER_MODEL_SCORING is
+on. chat and tool go to FAST_MODEL; creative stays on LLM_MODEL. A fast
+answer is checked as it streams (see check_prefix): its first HOLD_CHARS
+characters, and for tool turns its tool results, are held back until
+they pass, then the rest streams live. If the check fails first, the
+fast model is stopped and the turn is re-run on LLM_MODEL.
+"""
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+import config
+from app.llm import ollama_client
+from app.llm.prompts import ROUTER_PROMPT
+
+logger = logging.getLogger(__name__)
+
+ROUTES = ("chat", "tool", "creative")
+CHAT_MAX_WORDS = 8
+TOOL_MAX_WORDS = 25
+CREATIVE_MIN_WORDS = 40  # longer messages always go to the big model
+HOLD_CHARS = 120  # fast-answer text checked before the rest streams live
+
+_CHAT_RE = re.compile(
+    r"^\W*(hi|hey|hello|yo|thanks|thank you|thx|ty|cheers|cool|nice|awesome|great|perfect|sweet|"
+    r"ok|okay|got it|makes sense|sounds good|love it|bye|see you|good night)\b",
+    re.IGNORECASE,
+)
+_CREATIVE_RE = re.compile(
+    r"\b(write|compose|create|song|lyrics?|arrange\w*|reharmoni[sz]\w*|ideas?|inspir\w*|help me|"
+    r"why|explain|how (do|does|can|should|would)|teach|practi[cs]e|difference|compare|"
+    r"sound like|style of)\b",
+    re.IGNORECASE,
+)
+_CHORD_RE = re.compile(r"\b[A-G][#b♯♭]?(maj|min|m|dim|aug|sus|add|°|ø)?\d*\b")
+
+# Single-tool requests, by the tool they map to
+_TOOL_PATTERNS: dict[str, re.Pattern] = {
+    "analyze_chord": re.compile(r"\b(what notes|notes (are )?in|spell|what is an?|what's an?)\b", re.IGNORECASE),
+    "analyze_progression": re.compile(r"\banaly[sz]e\b.*\bprogression\b", re.IGNORECASE),
+    "detect_key": re.compile(r"\bwhat key\b", re.IGNORECASE),
+    "suggest_next_chord": re.compile(r"\b(next chord|what (chord )?(comes|goes) next)\b", re.IGNORECASE),
+    "get_scale_for_mood": re.compile(r"\bscales?\b.*\b(mood|feel|vibe|sounds?)\b", re.IGNORECASE),
+    "get_chord_voicings": re.compile(r"\bvoicings?\b", re.IGNORECASE),
+    "get_related_chords": re.compile(r"\b(related|substitut\w*) chords?\b", re.IGNORECASE),
+    "generate_progression_midi": re.compile(r"\bmidi\b", re.IGNORECASE),
+    "generate_guitar_tab": re.compile(r"\btab(s|lature)?\b", re.IGNORECASE),
+    "generate_notation": re.compile(r"\b(notation|sheet music|score)\b", re.IGNORECASE),
+}
+
+
+@dataclass
+class Route:
+    """Where one turn goes and why."""
+    name: str  # chat | tool | creative
+    model: str
+    reason: str  # e.g. "rule:chat", "model", "default"
+    tool: str | None = None  # the tool a rule matched, for tool routes
+
+    @property
+    def fast(self) -> bool:
+        return self.model != config.LLM_MODEL
+
+
+def _matched_tools(message: str) -> set[str]:
+    tools = {name for name, pattern in _TOOL_PATTERNS.items() if pattern.search(message)}
+    if "analyze_chord" in tools and not _CHORD_RE.search(message):
+        tools.discard("analyze_chord")  # "what is a cadence?" is a theory question
+    return tools
+
+
+def classify_rules(message: str) -> tuple[str, str | None] | None:
+    """(route, tool) for messages the rules are sure about, else None."""
+    words = len(message.split())
+    if words >= CREATIVE_MIN_WORDS or _CREATIVE_RE.search(message):
+        return "creative", None
+    tools = _matched_tools(message)
+    if len(tools) > 1:
+        return "creative", None  # several tools in one turn: let the big model plan it
+    if tools and words <= TOOL_MAX_WORDS:
+        return "tool", next(iter(tools))
+    if not tools and words <= CHAT_MAX_WORDS and _CHAT_RE.search(message):
+        return "chat", None
+    return None
+
+
+def classify_model(message: str) -> str | None:
+    """Ask FAST_MODEL for a route (None if it can't be reached or answers nonsense)."""
+    try:
+        response = ollama_client.chat(
+            messages=[
+                {"role": "system", "content": ROUTER_PROMPT},
+                {"role": "user", "content": message},
+            ],
+            model=config.FAST_MODEL,
+            temperature=0.0,
+            max_tokens=4,
+        )
+    except ollama_client.OllamaError as exc:
+        logger.warning("Router scoring unavailable: %s", exc)
+        return None
+    answer = (response.message.content or "").strip().lower()
+    return next((route for route in ROUTES if answer.startswith(route)), None)
+
+
+def route_message(message: str) -> Route:
+    """Pick the route and model for a user message."""
+    ruled = classify_rules(message)
+    if ruled is not None:
+        name, tool = ruled
+        reason = f"rule:{name}"
+    else:
+        name = classify_model(message) if config.ROUTER_MODEL_SCORING else None
+        tool, reason = None, "model" if name else "default"
+        name = name or "creative"
+    model = config.LLM_MODEL if name == "creative" else config.FAST_MODEL
+    return Route(name=name, model=model, reason=reason, tool=tool)
+
+
+def check_prefix(route: Route, text: str, tool_results: list[tuple[str, object]]) -> str | None:
+    """Why a fast answer streamed so far can't be shown, or None if it can so far."""
+    if "```" in text:
+        return "code block in reply"
+    for name, result in tool_results:
+        if isinstance(result, dict) and "error" in result:
+            return f"{name} failed: {result['error']}"
+    return None
+
+
+def prefix_settled(route: Route, text: str, tool_results: list[tuple[str, object]]) -> bool:
+    """True once enough of a fast answer has passed check_prefix to stream the rest live."""
+    if route.name == "tool" and not tool_results:
+        return False
+    return len(text.strip()) >= HOLD_CHARS
+
+
+def validate_turn(route: Route, text: str, tool_results: list[tuple[str, object]]) -> str | None:
+    """Why a finished fast turn isn't good enough to show, or None if it is."""
+    if not text.strip():
+        return "empty reply"
+    problem = check_prefix(route, text, tool_results)
+    if problem is not None:
+        return problem
+    if route.name == "tool" and not tool_results:
+        return "no tool called"
+    return None
+
+
+# --- Stats ---
+
+@dataclass
+class _RouteStats:
+    turns: int = 0
+    escalated: int = 0
+    seconds: float = 0.0
+    first_token_seconds: float = 0.0
+    reasons: dict[str, int] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        shown = self.turns or 1
+        return {
+            "turns": self.turns,
+            "escalated": self.escalated,
+            "mean_seconds": round(self.seconds / shown, 3),
+            "mean_first_token_seconds": round(self.first_token_seconds / shown, 3),
+            "reasons": dict(self.reasons),
+        }
+
+
+_stats: dict[str, _RouteStats] = {}
+_stats_lock = threading.Lock()
+
+
+def record_turn(route: Route, started: float, first_token: float | None, escalated: bool = False):
+    """Record one finished turn's latency under its route."""
+    now = time.perf_counter()
+    with _stats_lock:
+        stats = _stats.setdefault(route.name, _RouteStats())
+        stats.turns += 1
+        stats.escalated += escalated
+        stats.seconds += now - started
+        stats.first_token_seconds += (first_token or now) - started
+        stats.reasons[route.reason] = stats.reasons.get(route.reason, 0) + 1
+
+
+def router_stats() -> dict:
+    """Per-route turn counts, escalations, and mean latencies since startup."""
+    with _stats_lock:
+        return {
+            "enabled": config.ROUTER_ENABLED,
+            "fast_model": config.FAST_MODEL,
+            "routes": {name: stats.as_dict() for name, stats in sorted(_stats.items())},
+        }
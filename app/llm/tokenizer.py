@@ -0,0 +1,104 @@
+# Woodshed AI — Token Counting
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Token counting with the LLM's own tokenizer.
+
+Loads a HuggingFace ``tokenizer.json`` for the chat model from
+config.TOKENIZER_PATH (e.g. the one published alongside Qwen2.5). Nothing
+is downloaded — if the file or the ``tokenizers`` package is missing we
+fall back to an estimate that counts words, numbers, and each symbol
+separately, which tracks chord symbols, tables, and tab diagrams far
+better than a flat characters-per-token ratio.
+
+Counts are memoized, since the same chunks, words, and system prompt
+are counted over and over.
+
+Chunk boundaries depend on which of the two is in use, so tokenizer_id()
+names it ("estimate" or a hash of the file) for the ingest manifest and
+snapshot fingerprints.
+"""
+
+import hashlib
+import logging
+import math
+import re
+import threading
+from functools import lru_cache
+
+import config
+
+logger = logging.getLogger(__name__)
+
+_ESTIMATE_RE = re.compile(r"\w+|[^\w\s]|\n")
+_tokenizer = None
+_tokenizer_id = "estimate"
+_tokenizer_loaded = False
+_load_lock = threading.Lock()
+
+
+def _get_tokenizer():
+    """Load the tokenizer once; returns None when unavailable."""
+    global _tokenizer, _tokenizer_id, _tokenizer_loaded
+    if _tokenizer_loaded:
+        return _tokenizer
+    with _load_lock:
+        if not _tokenizer_loaded:
+            try:
+                from tokenizers import Tokenizer
+                if config.TOKENIZER_PATH.exists():
+                    _tokenizer = Tokenizer.from_file(str(config.TOKENIZER_PATH))
+                    digest = hashlib.sha256(config.TOKENIZER_PATH.read_bytes()).hexdigest()
+                    _tokenizer_id = f"sha256:{digest[:16]}"
+                    logger.info("Loaded tokenizer from %s", config.TOKENIZER_PATH)
+                else:
+                    logger.info("No tokenizer at %s — estimating token counts", config.TOKENIZER_PATH)
+            except Exception as exc:
+                logger.warning("Tokenizer unavailable, estimating token counts: %s", exc)
+            _tokenizer_loaded = True
+    return _tokenizer
+
+
+def is_exact() -> bool:
+    """True when counts come from the real tokenizer rather than the estimate."""
+    return _get_tokenizer() is not None
+
+
+def tokenizer_id() -> str:
+    """"estimate", or a hash of the loaded tokenizer.json."""
+    _get_tokenizer()
+    return _tokenizer_id
+
+
+def _estimate(text: str) -> int:
+    return sum(max(1, math.ceil(len(m) / 4)) for m in _ESTIMATE_RE.findall(text))
+
+
+@lru_cache(maxsize=16384)
+def count_tokens(text: str) -> int:
+    """Return the number of tokens in text (memoized)."""
+    if not text:
+        return 0
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return _estimate(text)
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def tail_tokens(text: str, n: int) -> str:
+    """Return the suffix of text spanning its last n tokens."""
+    if n <= 0 or not text:
+        return ""
+    tokenizer = _get_tokenizer()
+    if tokenizer is not None:
+        offsets = tokenizer.encode(text, add_special_tokens=False).offsets
+        if len(offsets) <= n:
+            return text
+        return text[offsets[-n][0]:]
+    matches = list(_ESTIMATE_RE.finditer(text))
+    count = 0
+    for match in reversed(matches):
+        count += max(1, math.ceil(len(match.group()) / 4))
+        if count >= n:
+            return text[match.start():]
+    return text
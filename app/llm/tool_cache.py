@@ -0,0 +1,209 @@
+# Woodshed AI — Tool Result Cache
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Memoize pure theory and notation tools across sessions.
+
+Tools like analyze_chord or generate_notation are deterministic functions
+of their arguments, so "Am F C G" only needs music21 once no matter how
+many people ask. Results are keyed by tool name plus canonicalized
+arguments and kept in a per-tool LRU in memory (TOOL_CACHE_SIZE entries
+each). If TOOL_CACHE_DIR is set they are also written there, one JSON
+file per entry, so they survive restarts.
+
+Only tools in CACHEABLE_TOOLS (or config.TOOL_CACHE_TOOLS) are cached.
+Error results are never cached, and neither are results larger than
+TOOL_CACHE_MAX_BYTES. Results are stored as JSON text, so every hit is a
+fresh copy the caller can't corrupt.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import config
+from app.knowledge.query_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1  # bump when a cached tool's output format changes
+
+# Deterministic tools whose results depend only on their arguments
+CACHEABLE_TOOLS = frozenset({
+    "analyze_chord",
+    "analyze_progression",
+    "detect_key",
+    "get_related_chords",
+    "get_scale_for_mood",
+    "suggest_next_chord",
+    "generate_notation",
+    "generate_guitar_tab",
+})
+
+MISS = object()
+
+
+def _canonical(value):
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {k: _canonical(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+def canonical_args(args: dict | None) -> str:
+    """Arguments as a stable string: sorted keys, None dropped, strings stripped.
+
+    {"chords": ["Am", "F"], "key_str": None} and {"chords": [" Am", "F"]}
+    give the same key; argument order within lists is kept.
+    """
+    return json.dumps(_canonical(args or {}), sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _cacheable_tools() -> frozenset[str]:
+    if config.TOOL_CACHE_TOOLS:
+        return frozenset(name.strip() for name in config.TOOL_CACHE_TOOLS.split(",") if name.strip())
+    return CACHEABLE_TOOLS
+
+
+class _DiskTier:
+    """One JSON file per entry under <dir>/v<CACHE_VERSION>/<tool>/."""
+
+    def __init__(self, cache_dir: Path, max_entries: int):
+        self.dir = Path(cache_dir) / f"v{CACHE_VERSION}"
+        self.max_entries = max_entries
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name: str, key: str) -> Path:
+        return self.dir / name / (hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, name: str, key: str) -> str | None:
+        try:
+            entry = json.loads(self._path(name, key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        # Guard against hash collisions and hand-edited files
+        return entry.get("result") if entry.get("args") == key else None
+
+    def put(self, name: str, key: str, text: str):
+        path = self._path(name, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps({"args": key, "result": text}), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning("Couldn't write tool cache entry for %s: %s", name, exc)
+            return
+        with self._lock:
+            if name not in self._counts:
+                self._counts[name] = sum(1 for _ in path.parent.glob("*.json"))
+            else:
+                self._counts[name] += 1
+            over = self._counts[name] > self.max_entries
+        if over:
+            self._prune(name, path.parent)
+
+    def _prune(self, name: str, directory: Path):
+        """Drop the oldest tenth of a tool's entries."""
+        entries = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        drop = max(1, len(entries) - self.max_entries + self.max_entries // 10)
+        for path in entries[:drop]:
+            path.unlink(missing_ok=True)
+        with self._lock:
+            self._counts[name] = len(entries) - drop
+
+
+class ToolResultCache:
+    """Per-tool LRU of tool results, with an optional on-disk tier."""
+
+    def __init__(
+        self,
+        maxsize: int | None = None,
+        cache_dir: Path | str | None = None,
+        max_result_bytes: int | None = None,
+        disk_size: int | None = None,
+    ):
+        self.maxsize = config.TOOL_CACHE_SIZE if maxsize is None else maxsize
+        self.max_result_bytes = config.TOOL_CACHE_MAX_BYTES if max_result_bytes is None else max_result_bytes
+        cache_dir = config.TOOL_CACHE_DIR if cache_dir is None else cache_dir
+        disk_size = config.TOOL_CACHE_DISK_SIZE if disk_size is None else disk_size
+        self.disk = _DiskTier(config.ROOT_DIR / cache_dir, disk_size) if cache_dir and self.maxsize > 0 else None
+        self.tools = _cacheable_tools()
+        self._memory: dict[str, LRUCache] = {}
+        self._disk_hits: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def enabled(self, name: str) -> bool:
+        return self.maxsize > 0 and name in self.tools
+
+    def _lru(self, name: str) -> LRUCache:
+        with self._lock:
+            if name not in self._memory:
+                self._memory[name] = LRUCache(self.maxsize)
+            return self._memory[name]
+
+    def get(self, name: str, args: dict | None):
+        """The cached result for this call, or MISS."""
+        if not self.enabled(name):
+            return MISS
+        key = canonical_args(args)
+        lru = self._lru(name)
+        text = lru.get(key)
+        if text is None and self.disk is not None:
+            text = self.disk.get(name, key)
+            if text is not None:
+                lru.put(key, text)
+                with self._lock:
+                    self._disk_hits[name] = self._disk_hits.get(name, 0) + 1
+        return MISS if text is None else json.loads(text)
+
+    def put(self, name: str, args: dict | None, result):
+        """Remember a successful result (errors and oversized results are skipped)."""
+        if not self.enabled(name) or (isinstance(result, dict) and "error" in result):
+            return
+        try:
+            text = json.dumps(result)
+        except (TypeError, ValueError):
+            return  # not plain JSON; a cached copy wouldn't round-trip
+        if len(text) > self.max_result_bytes:
+            return
+        key = canonical_args(args)
+        self._lru(name).put(key, text)
+        if self.disk is not None:
+            self.disk.put(name, key, text)
+
+    def clear(self):
+        with self._lock:
+            for lru in self._memory.values():
+                lru.clear()
+
+    def stats(self) -> dict:
+        """Hits, misses, and entries per tool since startup."""
+        with self._lock:
+            memory = dict(self._memory)
+            disk_hits = dict(self._disk_hits)
+        tools = {}
+        for name, lru in sorted(memory.items()):
+            # A disk hit first misses in memory
+            hits = lru.hits + disk_hits.get(name, 0)
+            tools[name] = {
+                "entries": len(lru),
+                "hits": hits,
+                "disk_hits": disk_hits.get(name, 0),
+                "misses": lru.misses - disk_hits.get(name, 0),
+            }
+        return {
+            "enabled": self.maxsize > 0,
+            "maxsize": self.maxsize,
+            "disk": str(self.disk.dir) if self.disk is not None else None,
+            "tools": tools,
+        }
@@ -0,0 +1,217 @@
+# Woodshed AI — Tool Executor
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Run the tool calls of one round concurrently.
+
+A round like "progression + notation + tab" used to run its calls one
+after another. Here every call in a round starts at once: I/O-light
+tools on a thread pool, and the CPU-heavy music21 tools on a pool of
+worker processes, so they don't serialize on the GIL (or stall token
+streaming for other sessions). A round then takes as long as its
+slowest call.
+
+Worker processes are started with spawn, like ingest's, and import only
+the tool registry (app.llm.tools). If the process pool can't be used —
+TOOL_PROCESSES=0, a broken pool, or a result that doesn't pickle — the
+call runs on a thread instead.
+
+Calls to pure tools are answered from a ToolResultCache (see tool_cache)
+before anything is submitted, so repeat work never reaches a pool.
+"""
+
+import logging
+import multiprocessing
+import threading
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import config
+from app.llm import tools
+from app.llm.tool_cache import MISS, ToolResultCache
+
+logger = logging.getLogger(__name__)
+
+# Tools that spend their time in music21 or MIDI parsing
+CPU_BOUND_TOOLS = frozenset({
+    "analyze_progression",
+    "detect_key",
+    "generate_notation",
+    "generate_guitar_tab",
+    "export_for_daw",
+    "analyze_uploaded_midi",
+})
+
+# The functions as registered, so a replaced entry (e.g. in tests) runs in-process
+_REGISTERED = dict(tools.TOOL_FUNCTIONS)
+
+
+def call_tool(name: str, args: dict | None):
+    """Run a tool by name, turning failures into an {"error": ...} result."""
+    fn = tools.TOOL_FUNCTIONS.get(name)
+    if fn is None:
+        return {"error": f"Unknown tool: {name}"}
+    try:
+        return fn(**(args or {}))
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def _warm():
+    """No-op task that makes a worker process import the tool registry."""
+    return True
+
+
+class ToolExecutor:
+    """Thread pool for light tools plus a process pool for CPU-bound ones."""
+
+    def __init__(
+        self,
+        threads: int | None = None,
+        processes: int | None = None,
+        cache: ToolResultCache | None = None,
+    ):
+        self.cache = cache if cache is not None else ToolResultCache()
+        self.threads = max(1, threads or config.TOOL_THREADS)
+        self.processes = config.TOOL_PROCESSES if processes is None else processes
+        self._threads = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="woodshed-tools")
+        self._processes: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._stats = {"rounds": 0, "concurrent_rounds": 0, "thread_calls": 0, "process_calls": 0, "fallbacks": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _process_pool(self) -> ProcessPoolExecutor | None:
+        if self.processes <= 0:
+            return None
+        with self._lock:
+            if self._processes is None:
+                # spawn, not fork: the parent runs streaming and embedding threads
+                context = multiprocessing.get_context("spawn")
+                self._processes = ProcessPoolExecutor(max_workers=self.processes, mp_context=context)
+            return self._processes
+
+    @staticmethod
+    def _registered(name: str) -> bool:
+        return name in _REGISTERED and tools.TOOL_FUNCTIONS.get(name) is _REGISTERED[name]
+
+    def _in_process(self, name: str) -> bool:
+        return name in CPU_BOUND_TOOLS and self._registered(name)
+
+    def _cached(self, name: str) -> bool:
+        # A replaced function (e.g. in tests) must not read or fill the cache
+        return self.cache.enabled(name) and self._registered(name)
+
+    def submit(self, name: str, args: dict | None) -> Future:
+        """Start one tool call; the future resolves to its result (never raises)."""
+        pool = self._process_pool() if self._in_process(name) else None
+        if pool is None:
+            self._count("thread_calls")
+            return self._threads.submit(call_tool, name, args)
+        try:
+            future = pool.submit(call_tool, name, args)
+        except (BrokenProcessPool, RuntimeError) as exc:
+            logger.warning("Tool process pool unavailable, running %s on a thread: %s", name, exc)
+            self._reset_processes()
+            self._count("fallbacks")
+            return self._threads.submit(call_tool, name, args)
+        self._count("process_calls")
+
+        # Fall back to a thread if the worker died or the result didn't pickle
+        result: Future = Future()
+
+        def done(f: Future):
+            try:
+                result.set_result(f.result())
+            except Exception as exc:
+                logger.warning("Tool %s failed in a worker process, retrying on a thread: %s", name, exc)
+                if isinstance(exc, BrokenProcessPool):
+                    self._reset_processes()
+                self._count("fallbacks")
+                retry = self._threads.submit(call_tool, name, args)
+                retry.add_done_callback(lambda r: result.set_result(r.result()))
+
+        future.add_done_callback(done)
+        return result
+
+    def _reset_processes(self):
+        with self._lock:
+            pool, self._processes = self._processes, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def run_round(self, calls: list[tuple[str, dict | None]]) -> Iterator[tuple[int, object]]:
+        """Run calls concurrently, yielding (index, result) as each finishes.
+
+        Cached results are yielded first, before any call is started.
+        """
+        self._count("rounds")
+        hits, misses = [], []
+        for i, (name, args) in enumerate(calls):
+            cached = self.cache.get(name, args) if self._cached(name) else MISS
+            if cached is MISS:
+                misses.append(i)
+            else:
+                hits.append((i, cached))
+
+        if len(misses) == 1 and not self._in_process(calls[misses[0]][0]):
+            # Nothing to overlap with
+            self._count("thread_calls")
+            yield from hits
+            i = misses[0]
+            yield i, self._remember(*calls[i], call_tool(*calls[i]))
+            return
+        if len(misses) > 1:
+            self._count("concurrent_rounds")
+        pending = {self.submit(*calls[i]): i for i in misses}
+        yield from hits
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = pending.pop(future)
+                yield i, self._remember(*calls[i], future.result())
+
+    def _remember(self, name: str, args: dict | None, result):
+        if self._cached(name):
+            self.cache.put(name, args, result)
+        return result
+
+    def warm(self):
+        """Start the worker processes now, so the first heavy call doesn't pay for it."""
+        pool = self._process_pool()
+        if pool is not None:
+            for _ in range(self.processes):
+                pool.submit(_warm)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        return {"threads": self.threads, "processes": self.processes, **stats, "cache": self.cache.stats()}
+
+    def shutdown(self, wait: bool = True):
+        self._threads.shutdown(wait=wait)
+        self._reset_processes()
+
+
+_executor: ToolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ToolExecutor:
+    """Return the process-wide tool executor, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ToolExecutor()
+        return _executor
+
+
+def shutdown_tool_executor():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
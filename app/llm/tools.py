@@ -0,0 +1,17 @@
+# Woodshed AI — Tool Registry
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Every tool the model can call: schemas and the functions behind them.
+
+Kept apart from the pipeline so tool worker processes can import the
+functions without pulling in the vector store.
+"""
+
+from app.theory.tools import MUSIC_TOOLS as THEORY_TOOLS, TOOL_FUNCTIONS as THEORY_FUNCS
+from app.audio.tools import AUDIO_TOOLS, AUDIO_TOOL_FUNCTIONS
+from app.output.tools import OUTPUT_TOOLS, OUTPUT_TOOL_FUNCTIONS
+
+# Merge theory + audio + output tools
+MUSIC_TOOLS = THEORY_TOOLS + AUDIO_TOOLS + OUTPUT_TOOLS
+TOOL_FUNCTIONS = {**THEORY_FUNCS, **AUDIO_TOOL_FUNCTIONS, **OUTPUT_TOOL_FUNCTIONS}
@@ -0,0 +1,3 @@
+# Woodshed AI — Benchmarks
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
@@ -0,0 +1,170 @@
+# Woodshed AI — Vector Backend Benchmark
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Compare the Chroma (HNSW) and NumPy (exact) search backends.
+
+Ingests data/starter once, then times top-k queries against each
+backend and measures Chroma's recall against the exact NumPy results.
+A second table compares compact storage modes (float16/int8 codes,
+truncated dimensions, with and without float32 re-scoring) by resident
+index size and recall against full-precision float32.
+
+Usage:
+    python -m benchmarks.backends              # embed with Ollama
+    python -m benchmarks.backends --stub       # offline hashing embedder
+    python -m benchmarks.backends --stub --json results.json
+"""
+
+import argparse
+import json
+import random
+
+from app.knowledge.backends import BACKENDS, RESCORE_FACTOR, NumpyBackend
+from benchmarks.common import (
+    build_starter_store,
+    make_embedding_fn,
+    open_store,
+    percentile,
+    timed,
+)
+
+
+# A few musician-style questions, plus snippets sampled from the corpus
+FIXED_QUERIES = [
+    "What chords work for a sad ballad?",
+    "How do I use a tritone substitution?",
+    "Dm7 G7 Cmaj7",
+    "DADGAD voicings",
+    "What is the Dorian mode?",
+    "How do I write a catchy chorus melody?",
+    "Funk groove sixteenth notes",
+    "Plagal cadence vs authentic cadence",
+]
+
+
+def _sample_queries(store, n: int, seed: int) -> list[str]:
+    ids = store.collection.get(include=[])["ids"]
+    rng = random.Random(seed)
+    picked = rng.sample(ids, min(n, len(ids)))
+    docs = store.collection.get(ids=picked, include=["documents"])["documents"]
+    return [" ".join(doc.split()[:12]) for doc in docs]
+
+# (storage, dims divisor, rescore factor) — dims divisor 2 keeps half the dimensions
+STORAGE_CONFIGS = [
+    ("float32", 1, 0),
+    ("float16", 1, 0),
+    ("float16", 1, RESCORE_FACTOR),
+    ("int8", 1, 0),
+    ("int8", 1, RESCORE_FACTOR),
+    ("float32", 2, 0),
+    ("float32", 2, RESCORE_FACTOR),
+    ("int8", 2, RESCORE_FACTOR),
+]
+
+
+def _recall(batched: list[list[dict]], exact: list[list[dict]]) -> float:
+    hits = sum(
+        len({r["id"] for r in got} & {r["id"] for r in want})
+        for got, want in zip(batched, exact)
+    )
+    total = sum(len(want) for want in exact)
+    return round(hits / total, 4) if total else 1.0
+
+
+def run_storage(collection, embeddings: list[list[float]], exact: list[list[dict]], k: int, rounds: int) -> list[dict]:
+    """Index size, latency, and recall@k for each compact storage mode."""
+    dim = len(embeddings[0])
+    rows = []
+    for storage, divisor, rescore in STORAGE_CONFIGS:
+        dims = dim // divisor if divisor > 1 else 0
+        backend = NumpyBackend(storage, dims, rescore)
+        backend.load(collection)
+        latencies = []
+        for _ in range(rounds):
+            for emb in embeddings:
+                ms, _ = timed(backend.query, [emb], k)
+                latencies.append(ms)
+        rows.append({
+            "storage": storage,
+            "dims": dims or dim,
+            "rescore": rescore,
+            "index_mb": round(backend.memory_bytes() / 2**20, 3),
+            "p50_ms": round(percentile(latencies, 50), 4),
+            f"recall@{k}": _recall(backend.query(embeddings, k), exact),
+        })
+    return rows
+
+
+def run(stub: bool, k: int, rounds: int, n_sampled: int, seed: int) -> dict:
+    embedding_fn = make_embedding_fn(stub)
+    build_ms, persist_dir = timed(build_starter_store, embedding_fn)
+
+    stores = {}
+    load_ms = {}
+    for backend in BACKENDS:
+        load_ms[backend], stores[backend] = timed(open_store, persist_dir, embedding_fn, backend)
+
+    queries = FIXED_QUERIES + _sample_queries(stores["numpy"], n_sampled, seed)
+    embeddings = stores["numpy"].embed_documents(queries)
+    exact = stores["numpy"].search_embeddings(embeddings, n_results=k)
+
+    results = {
+        "embedder": "hashing-stub" if stub else embedding_fn.name(),
+        "chunks": stores["numpy"].collection.count(),
+        "queries": len(queries),
+        "k": k,
+        "rounds": rounds,
+        "build_ms": round(build_ms, 1),
+        "backends": {},
+    }
+    for backend, store in stores.items():
+        latencies = []
+        for _ in range(rounds):
+            for emb in embeddings:
+                ms, _ = timed(store.search_embeddings, [emb], k)
+                latencies.append(ms)
+        batch_ms, batched = timed(store.search_embeddings, embeddings, k)
+
+        results["backends"][backend] = {
+            "load_ms": round(load_ms[backend], 2),
+            "p50_ms": round(percentile(latencies, 50), 4),
+            "p95_ms": round(percentile(latencies, 95), 4),
+            "p99_ms": round(percentile(latencies, 99), 4),
+            "batch_ms": round(batch_ms, 3),
+            f"recall@{k}": _recall(batched, exact),
+        }
+    results["storage"] = run_storage(stores["numpy"].collection, embeddings, exact, k, rounds)
+    return results
+
+
+def _print_table(results: dict):
+    k = results["k"]
+    print(f"{results['chunks']} chunks, {results['queries']} queries × {results['rounds']} rounds, "
+          f"k={k}, embedder={results['embedder']}")
+    print(f"{'backend':<11} {'load ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'batch ms':>9} {'recall':>7}")
+    for name, r in results["backends"].items():
+        print(f"{name:<11} {r['load_ms']:>9.2f} {r['p50_ms']:>9.4f} {r['p95_ms']:>9.4f} "
+              f"{r['p99_ms']:>9.4f} {r['batch_ms']:>9.3f} {r[f'recall@{k}']:>7.3f}")
+    print()
+    print(f"{'storage':<8} {'dims':>5} {'rescore':>7} {'index MB':>9} {'p50 ms':>9} {'recall':>7}")
+    for r in results["storage"]:
+        print(f"{r['storage']:<8} {r['dims']:>5} {r['rescore'] or '-':>7} {r['index_mb']:>9.3f} "
+              f"{r['p50_ms']:>9.4f} {r[f'recall@{k}']:>7.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark vector search backends on the starter corpus.")
+    parser.add_argument("--stub", action="store_true", help="Use the offline hashing embedder instead of Ollama")
+    parser.add_argument("-k", type=int, default=5, help="Results per query")
+    parser.add_argument("--rounds", type=int, default=20, help="Timed passes over the query set")
+    parser.add_argument("--sampled", type=int, default=50, help="Extra queries sampled from the corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.stub, args.k, args.rounds, args.sampled, args.seed)
+    _print_table(results)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,106 @@
+# Woodshed AI — Benchmark Helpers
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Shared setup for benchmarks: an offline embedder and a starter-corpus store."""
+
+import hashlib
+import math
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from chromadb import EmbeddingFunction
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from app.knowledge.ingest import ingest_directory
+from app.knowledge.lexical import tokenize
+from app.knowledge.vectorstore import VectorStore
+
+STUB_DIM = 256
+COLLECTION = "bench_starter"
+
+
+class HashingEmbeddingFunction(EmbeddingFunction):
+    """Deterministic offline embedder: feature-hashed bag of words.
+
+    Texts that share terms land near each other, so retrieval numbers
+    are meaningful without Ollama, and identical across machines.
+    """
+
+    def __init__(self, dim: int = STUB_DIM):
+        self.dim = dim
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vec = np.zeros(self.dim, dtype=np.float32)
+            for term in tokenize(text):
+                digest = hashlib.blake2b(term.encode(), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                vec[bucket] += 1.0 if digest[4] & 1 else -1.0
+            norm = np.linalg.norm(vec)
+            vectors.append(vec / norm if norm else vec)
+        return vectors
+
+    @staticmethod
+    def name():
+        return "woodshed-hashing-stub"
+
+    def get_config(self):
+        return {"dim": self.dim}
+
+    @staticmethod
+    def build_from_config(config_dict):
+        return HashingEmbeddingFunction(config_dict.get("dim", STUB_DIM))
+
+
+def make_embedding_fn(stub: bool):
+    """Offline hashing embedder, or the configured Ollama model."""
+    if stub:
+        return HashingEmbeddingFunction()
+    from app.knowledge.embeddings import get_embedding_function
+    return get_embedding_function()
+
+
+def build_starter_store(embedding_fn, persist_dir: str | None = None) -> str:
+    """Ingest data/starter into a fresh collection; returns the persist dir."""
+    persist_dir = persist_dir or tempfile.mkdtemp(prefix="woodshed_bench_")
+    store = VectorStore(
+        persist_dir=persist_dir,
+        collection_name=COLLECTION,
+        embedding_fn=embedding_fn,
+        backend="chroma",
+    )
+    ingest_directory(config.STARTER_DATA_DIR, "starter", store, verbose=False)
+    return persist_dir
+
+
+def open_store(persist_dir: str, embedding_fn, backend: str, cache_size: int | None = None) -> VectorStore:
+    return VectorStore(
+        persist_dir=persist_dir,
+        collection_name=COLLECTION,
+        embedding_fn=embedding_fn,
+        backend=backend,
+        cache_size=cache_size,
+    )
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def timed(fn, *args, **kwargs) -> tuple[float, object]:
+    """Run fn once; return (milliseconds, result)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000, result
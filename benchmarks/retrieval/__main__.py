@@ -0,0 +1,131 @@
+# Woodshed AI — Retrieval Benchmark Suite
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Measure retrieval quality and latency on the starter corpus.
+
+Ingests data/starter with a deterministic offline embedder, runs the
+labelled questions in queries.json, and reports recall@k, MRR, and
+p50/p95/p99 latency of VectorStore.search for every combination of
+backend, search mode, and query cache setting, plus a category-filtered
+pass (each query filtered to its labelled category). A result counts as
+relevant when it comes from the expected source file.
+
+Usage:
+    python -m benchmarks.retrieval
+    python -m benchmarks.retrieval --json results.json
+    python -m benchmarks.retrieval --json new.json --baseline old.json
+    python -m benchmarks.retrieval --ollama      # real embeddings (needs Ollama)
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from app.knowledge.backends import BACKENDS
+from app.knowledge.vectorstore import SEARCH_MODES
+from benchmarks.common import build_starter_store, make_embedding_fn, open_store, percentile, timed
+
+QUERIES_PATH = Path(__file__).parent / "queries.json"
+CACHE_SETTINGS = {"off": 0, "on": None}  # None = config.QUERY_CACHE_SIZE
+
+
+def load_queries(path: Path = QUERIES_PATH) -> list[dict]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _first_relevant_rank(results: list[dict], expected_source: str) -> int | None:
+    for rank, item in enumerate(results, start=1):
+        if item["metadata"].get("source") == expected_source:
+            return rank
+    return None
+
+
+def evaluate(store, queries: list[dict], mode: str, k: int, rounds: int, filtered: bool = False) -> dict:
+    """Score one store configuration; the first round is scored, all are timed."""
+    latencies = []
+    ranks: dict[str, int | None] = {}
+    for round_no in range(rounds):
+        for q in queries:
+            category_filter = q["category"] if filtered else None
+            ms, results = timed(store.search, q["query"], n_results=k, category_filter=category_filter, mode=mode)
+            latencies.append(ms)
+            if round_no == 0:
+                ranks[q["query"]] = _first_relevant_rank(results, q["source"])
+
+    found = [r for r in ranks.values() if r is not None]
+    return {
+        f"recall@{k}": round(len(found) / len(queries), 4),
+        "mrr": round(sum(1 / r for r in found) / len(queries), 4),
+        "p50_ms": round(percentile(latencies, 50), 4),
+        "p95_ms": round(percentile(latencies, 95), 4),
+        "p99_ms": round(percentile(latencies, 99), 4),
+        "misses": sorted(q for q, r in ranks.items() if r is None),
+    }
+
+
+def run(ollama: bool = False, k: int = 5, rounds: int = 5, queries_path: Path = QUERIES_PATH) -> dict:
+    queries = load_queries(queries_path)
+    embedding_fn = make_embedding_fn(stub=not ollama)
+    persist_dir = build_starter_store(embedding_fn)
+
+    results = []
+    chunks = 0
+    for backend in BACKENDS:
+        for cache, cache_size in CACHE_SETTINGS.items():
+            store = open_store(persist_dir, embedding_fn, backend, cache_size=cache_size)
+            chunks = store.collection.count()
+            for mode in SEARCH_MODES:
+                for filtered in (False, True) if cache == "off" else (False,):
+                    scores = evaluate(store, queries, mode, k, rounds, filtered)
+                    results.append({"backend": backend, "mode": mode, "cache": cache, "filtered": filtered, **scores})
+
+    return {
+        "embedder": embedding_fn.name(),
+        "chunks": chunks,
+        "queries": len(queries),
+        "k": k,
+        "rounds": rounds,
+        "results": results,
+    }
+
+
+def _config_key(row: dict) -> tuple:
+    return row["backend"], row["mode"], row["cache"], row.get("filtered", False)
+
+
+def print_report(report: dict, baseline: dict | None = None):
+    k = report["k"]
+    print(f"{report['chunks']} chunks, {report['queries']} queries × {report['rounds']} rounds, "
+          f"k={k}, embedder={report['embedder']}")
+    previous = {_config_key(r): r for r in (baseline or {}).get("results", [])}
+    print(f"{'backend':<11} {'mode':<8} {'cache':<5} {'filter':<6} {'recall':>7} {'mrr':>7} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for row in report["results"]:
+        filtered = "yes" if row.get("filtered") else "no"
+        line = (f"{row['backend']:<11} {row['mode']:<8} {row['cache']:<5} {filtered:<6} {row[f'recall@{k}']:>7.3f} "
+                f"{row['mrr']:>7.3f} {row['p50_ms']:>9.4f} {row['p95_ms']:>9.4f} {row['p99_ms']:>9.4f}")
+        old = previous.get(_config_key(row))
+        if old and f"recall@{k}" in old:
+            line += (f"   Δrecall {row[f'recall@{k}'] - old[f'recall@{k}']:+.3f}"
+                     f" Δmrr {row['mrr'] - old['mrr']:+.3f}"
+                     f" Δp95 {row['p95_ms'] - old['p95_ms']:+.4f}")
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark retrieval quality and latency on the starter corpus.")
+    parser.add_argument("--ollama", action="store_true", help="Embed with the configured Ollama model instead of the stub")
+    parser.add_argument("-k", type=int, default=5, help="Results per query")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed passes over the query set")
+    parser.add_argument("--queries", type=Path, default=QUERIES_PATH, help="Labelled query set (JSON)")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Earlier results JSON to show deltas against")
+    args = parser.parse_args()
+
+    report = run(ollama=args.ollama, k=args.k, rounds=args.rounds, queries_path=args.queries)
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+    print_report(report, baseline)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
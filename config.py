@@ -16,13 +16,53 @@ OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 LLM_MODEL = os.getenv("LLM_MODEL", "qwen2.5:32b")
 FAST_MODEL = os.getenv("FAST_MODEL", "qwen2.5:7b")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+TOKENIZER_PATH = ROOT_DIR / os.getenv("TOKENIZER_PATH", "data/tokenizer.json")
 
 # Generation
 TEMPERATURE = float(os.getenv("TEMPERATURE", "0.7"))
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+ROUTER_MODEL_SCORING = os.getenv("ROUTER_MODEL_SCORING", "true").lower() in ("1", "true", "yes")
 
 # Performance
 NUM_CTX = int(os.getenv("NUM_CTX", "8192"))
-RAG_RESULTS = int(os.getenv("RAG_RESULTS", "3"))
+PROMPT_LAYOUT = os.getenv("PROMPT_LAYOUT", "stable")
+LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2500"))
+SUMMARIZE_HISTORY = os.getenv("SUMMARIZE_HISTORY", "true").lower() in ("1", "true", "yes")
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", "300"))
+TOOL_THREADS = int(os.getenv("TOOL_THREADS", "4"))
+TOOL_PROCESSES = int(os.getenv("TOOL_PROCESSES", "2"))
+TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "256"))
+TOOL_CACHE_TOOLS = os.getenv("TOOL_CACHE_TOOLS", "")
+TOOL_CACHE_MAX_BYTES = int(os.getenv("TOOL_CACHE_MAX_BYTES", "65536"))
+TOOL_CACHE_DIR = os.getenv("TOOL_CACHE_DIR", "")
+TOOL_CACHE_DISK_SIZE = int(os.getenv("TOOL_CACHE_DISK_SIZE", "5000"))
+RAG_RESULTS = int(os.getenv("RAG_RESULTS", "6"))
+RAG_OVERFETCH = int(os.getenv("RAG_OVERFETCH", "3"))
+RAG_MAX_DISTANCE = float(os.getenv("RAG_MAX_DISTANCE", "0.6"))
+RAG_TOKEN_BUDGET = int(os.getenv("RAG_TOKEN_BUDGET", "1500"))
+RAG_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+COMPRESS_CONTEXT = os.getenv("COMPRESS_CONTEXT", "true").lower() in ("1", "true", "yes")
+COMPRESS_TOKEN_BUDGET = int(os.getenv("COMPRESS_TOKEN_BUDGET", "800"))
+COMPRESS_EMBED_TIMEOUT = float(os.getenv("COMPRESS_EMBED_TIMEOUT", "2.0"))
+COMPRESS_WARM_SPANS = os.getenv("COMPRESS_WARM_SPANS", "false").lower() in ("1", "true", "yes")
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "512"))
+SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid")
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "numpy")
+VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "float32")
+VECTOR_DIMS = int(os.getenv("VECTOR_DIMS", "0"))
+VECTORSTORE_IO_THREADS = int(os.getenv("VECTORSTORE_IO_THREADS", "8"))
+
+# Ingestion
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+INGEST_PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", "16"))
+KNOWLEDGE_SNAPSHOT = os.getenv("KNOWLEDGE_SNAPSHOT", "")
+WATCH_SOURCES = os.getenv("WATCH_SOURCES", "true").lower() in ("1", "true", "yes")
+WATCH_DEBOUNCE = float(os.getenv("WATCH_DEBOUNCE", "2.0"))
+WATCH_POLL_INTERVAL = float(os.getenv("WATCH_POLL_INTERVAL", "10"))
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
 
 # Data paths
 CHROMA_PERSIST_DIR = ROOT_DIR / os.getenv("CHROMA_PERSIST_DIR", "data/chromadb")
@@ -30,6 +70,7 @@ STARTER_DATA_DIR = ROOT_DIR / os.getenv("STARTER_DATA_DIR", "data/starter")
 LOCAL_DATA_DIR = ROOT_DIR / os.getenv("LOCAL_DATA_DIR", "data/local")
 LOCAL_SOURCES_DIR = LOCAL_DATA_DIR / "sources"
 LOCAL_MIDI_DIR = LOCAL_DATA_DIR / "midi"
+EMBED_CACHE_DIR = ROOT_DIR / os.getenv("EMBED_CACHE_DIR", "data/embed_cache")
 
 # Transcription microservice
 TRANSCRIPTION_SERVICE_URL = os.getenv(
@@ -4,13 +4,18 @@
 
 """Shared pytest fixtures and markers for the test suite."""
 
+import hashlib
+import itertools
 import uuid
 
+import numpy as np
 import pytest
+from chromadb import EmbeddingFunction
 from httpx import ASGITransport, AsyncClient
 
 from app.api.main import create_app
 from app.api import sessions
+from app.knowledge.vectorstore import VectorStore
 from app.llm.ollama_client import is_available
 
 
@@ -46,3 +51,65 @@ def _clean_integration_sessions():
     sessions.clear_all()
     yield
     sessions.clear_all()
+
+
+class StubEmbeddingFunction(EmbeddingFunction):
+    """Deterministic offline embedder so store tests don't need Ollama."""
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        return [
+            np.frombuffer(hashlib.sha256(t.encode()).digest(), dtype=np.uint8).astype(np.float32)
+            for t in input
+        ]
+
+    @staticmethod
+    def name():
+        return "woodshed-test-stub"
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return StubEmbeddingFunction()
+
+
+@pytest.fixture
+def make_offline_store(tmp_path):
+    """Factory for temp VectorStores that embed with the offline stub.
+
+    Each call gets a fresh directory; pass persist_dir to open another
+    instance on an existing store. Other keyword arguments go to VectorStore.
+    """
+    counter = itertools.count()
+
+    def make(persist_dir=None, **kwargs):
+        persist_dir = persist_dir or tmp_path / f"store{next(counter)}"
+        kwargs.setdefault("embedding_fn", StubEmbeddingFunction())
+        return VectorStore(persist_dir=str(persist_dir), collection_name="test_collection", **kwargs)
+
+    return make
+
+
+@pytest.fixture
+def add_lexical_corpus():
+    """Adds three short chunks with distinctive terms to a store."""
+    def add(store):
+        store.add_documents(
+            ids=["t1", "t2", "t3"],
+            documents=[
+                "DADGAD tuning gives open, droning voicings for Celtic guitar.",
+                "Play Dm7 G7 Cmaj7 as a ii-V-I in C major.",
+                "Standard tuning is EADGBE; most chord shapes assume it.",
+            ],
+            metadatas=[
+                {"source": "tunings.md", "category": "instrumentation"},
+                {"source": "jazz.md", "category": "harmony"},
+                {"source": "tunings.md", "category": "instrumentation"},
+            ],
+        )
+
+    return add
@@ -4,14 +4,17 @@
 
 """Tests for the /api/chat SSE streaming endpoint."""
 
-from unittest.mock import MagicMock, patch
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from httpx import ASGITransport, AsyncClient
 
 from app.api.main import create_app
 from app.api import sessions
-from app.llm.pipeline import StreamToken, StreamStatus, StreamToolCall
+from app.api.routes import chat as chat_route
+from app.api.schemas import ChatRequest
+from app.llm.pipeline import RETRIEVAL_STATUS, StreamToken, StreamStatus, StreamToolCall
 
 app = create_app()
 
@@ -57,6 +60,7 @@ def _mock_send_stream(events, generated_files=None):
                 yield event
 
     mock_conv.send_stream = MagicMock(side_effect=fake_stream)
+    mock_conv.aretrieve = AsyncMock(return_value=[])
     mock_conv.get_history.return_value = []
     mock_conv.reset = MagicMock()
     return mock_conv
@@ -216,6 +220,41 @@ async def test_chat_history_returns_messages(client):
     assert data["messages"][0]["role"] == "user"
 
 
+@pytest.mark.anyio
+async def test_chat_retrieves_context_before_streaming(client):
+    mock_conv = _mock_send_stream(["ok"])
+    chunks = [{"id": "c1", "document": "ii-V-I", "metadata": {"category": "harmony"}, "distance": 0.1}]
+    mock_conv.aretrieve = AsyncMock(return_value=chunks)
+    _inject_mock_session(mock_conv)
+
+    await client.post("/api/chat", json={"message": "what is a ii-V-I?"}, headers=HEADERS)
+    mock_conv.aretrieve.assert_awaited_once_with("what is a ii-V-I?")
+    assert mock_conv.send_stream.call_args.kwargs["context_chunks"] == chunks
+
+
+@pytest.mark.anyio
+async def test_chat_status_sent_before_retrieval_finishes():
+    """The first SSE event goes out while retrieval is still running."""
+    release = asyncio.Event()
+
+    async def slow_retrieve(message):
+        await release.wait()
+        return []
+
+    mock_conv = _mock_send_stream(["ok"])
+    mock_conv.aretrieve = AsyncMock(side_effect=slow_retrieve)
+    session = _inject_mock_session(mock_conv)
+
+    response = await chat_route.chat(ChatRequest(message="what is a ii-V-I?"), session)
+    stream = response.body_iterator
+    first = await asyncio.wait_for(anext(stream), 1)
+    assert first["event"] == "status" and RETRIEVAL_STATUS in first["data"]
+    assert not release.is_set()
+    release.set()
+    rest = [event async for event in stream]
+    assert rest[-1]["event"] == "done"
+
+
 @pytest.mark.anyio
 async def test_chat_error_on_ollama_failure(client):
     mock_conv = MagicMock()
@@ -255,9 +294,10 @@ async def test_chat_stream_emits_status_events(client):
     )
     events = _parse_sse(resp.text)
     status_events = [e for e in events if e.get("event") == "status"]
-    assert len(status_events) == 2
+    assert len(status_events) == 3  # retrieval status + the stream's two
     import json
     steps = [json.loads(e["data"])["step"] for e in status_events]
+    assert steps[0] == RETRIEVAL_STATUS
     assert "Searching knowledge base..." in steps
     assert "Thinking..." in steps
 
@@ -9,7 +9,10 @@ from unittest.mock import MagicMock, patch
 import pytest
 from httpx import ASGITransport, AsyncClient
 
+import config
 from app.api.main import create_app, lifespan
+from app.knowledge.watcher import CHROMA_UNSUPPORTED, SourceWatcher, get_source_watcher
+from app.llm.tool_executor import shutdown_tool_executor
 
 app = create_app()
 
@@ -107,25 +110,63 @@ async def test_ollama_unavailable_returns_empty_models(mock_kb, mock_trans, mock
 
 
 @pytest.mark.anyio
-async def test_lifespan_starts_and_cancels_cleanup_task():
+async def test_lifespan_starts_and_cancels_cleanup_task(monkeypatch):
     """Test that the lifespan context manager creates and cancels the cleanup task."""
     import asyncio
+    # No real ingest into data/ and no worker processes from this test
+    monkeypatch.setattr(config, "WATCH_SOURCES", False)
+    monkeypatch.setattr(config, "TOOL_PROCESSES", 0)
+    shutdown_tool_executor()
     mock_app = MagicMock()
     async with lifespan(mock_app):
         # Inside the lifespan, the cleanup loop task should be running
         # Give it a moment to start
         await asyncio.sleep(0.01)
     # After exit, no errors should occur
+    assert get_source_watcher() is None
+
+
+@pytest.mark.anyio
+async def test_lifespan_runs_source_watcher(monkeypatch, tmp_path, make_offline_store):
+    """The lifespan's watcher ingests into the shared store and is stopped on exit."""
+    import asyncio
+
+    sources = tmp_path / "sources"
+    sources.mkdir()
+    (sources / "modes.md").write_text("# Modes\n\nDorian has a raised sixth.", encoding="utf-8")
+    store = make_offline_store(backend="numpy")
+    monkeypatch.setattr(config, "WATCH_SOURCES", True)
+    monkeypatch.setattr(config, "LOCAL_SOURCES_DIR", sources)
+    monkeypatch.setattr(config, "TOOL_PROCESSES", 0)
+    shutdown_tool_executor()
+
+    with patch("app.knowledge.watcher.get_shared_store", return_value=store):
+        async with lifespan(MagicMock()):
+            watcher = get_source_watcher()
+            for _ in range(100):
+                await asyncio.sleep(0.05)
+                if watcher.syncs:
+                    break
+            assert watcher.stats()["running"] and watcher.swaps == 1
+        assert store.get_stats()["sources"] == ["local/modes.md"]
+        assert get_source_watcher() is None and not watcher.stats()["running"]
+
+        # The chroma backend searches the collection being written, so the watcher won't run
+        chroma = make_offline_store(backend="chroma")
+        refused = SourceWatcher(store=chroma, directory=sources)
+        assert refused.start() is None and refused.last_error == CHROMA_UNSUPPORTED
+        with pytest.raises(RuntimeError):
+            refused.sync()
 
 
 @pytest.mark.anyio
 @patch("app.api.routes.status.is_available", return_value=True)
 @patch("app.api.routes.status.list_models", return_value=["model1"])
 @patch("app.api.routes.status.is_transcription_available", return_value=False)
-@patch("app.api.routes.status.VectorStore")
-async def test_get_knowledge_stats_success(mock_vs_cls, mock_trans, mock_models, mock_avail, client):
+@patch("app.api.routes.status.get_shared_store")
+async def test_get_knowledge_stats_success(mock_get_store, mock_trans, mock_models, mock_avail, client):
     """Test _get_knowledge_stats with a working VectorStore."""
-    mock_vs = mock_vs_cls.return_value
+    mock_vs = mock_get_store.return_value
     mock_vs.get_stats.return_value = {"total_chunks": 200, "sources": ["a.md"]}
 
     # Need to un-patch _get_knowledge_stats to actually test it
@@ -139,8 +180,8 @@ async def test_get_knowledge_stats_success(mock_vs_cls, mock_trans, mock_models,
 @patch("app.api.routes.status.is_available", return_value=True)
 @patch("app.api.routes.status.list_models", return_value=[])
 @patch("app.api.routes.status.is_transcription_available", return_value=False)
-@patch("app.api.routes.status.VectorStore", side_effect=Exception("ChromaDB offline"))
-async def test_get_knowledge_stats_error(mock_vs_cls, mock_trans, mock_models, mock_avail, client):
+@patch("app.api.routes.status.get_shared_store", side_effect=Exception("ChromaDB offline"))
+async def test_get_knowledge_stats_error(mock_get_store, mock_trans, mock_models, mock_avail, client):
     """Test _get_knowledge_stats when VectorStore raises an exception."""
     from app.api.routes.status import _get_knowledge_stats
     result = _get_knowledge_stats()
@@ -0,0 +1,40 @@
+# Woodshed AI — Async Vector Store Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the async VectorStore API."""
+
+import asyncio
+
+from app.knowledge.io_executor import get_io_executor
+from app.knowledge.vectorstore import SEARCH_MODES
+
+
+def test_async_api_matches_sync(make_offline_store):
+    """asearch/aadd_documents/aget_stats mirror the sync API on the I/O executor."""
+    store = make_offline_store()
+    executor = get_io_executor()
+    submitted = executor.stats()["submitted"]
+
+    async def scenario():
+        added = await store.aadd_documents(
+            ids=["a1", "a2"],
+            documents=["Tritone subs swap V7 for bII7.", "Dorian has a raised sixth."],
+            metadatas=[{"source": "subs.md", "category": "harmony"}, {"source": "modes.md", "category": "harmony"}],
+        )
+        assert added == 2
+        assert await store.aadd_documents(ids=["a1"], documents=["dup"]) == 0
+        results = await asyncio.gather(*(store.asearch("tritone sub", n_results=1, mode=m) for m in SEARCH_MODES))
+        stats = await store.aget_stats()
+        return results, stats
+
+    results, stats = asyncio.run(scenario())
+    assert stats["total_chunks"] == 2
+    for mode, got in zip(SEARCH_MODES, results):
+        assert got == store.search("tritone sub", n_results=1, mode=mode)
+    assert results[SEARCH_MODES.index("lexical")][0]["id"] == "a1"
+
+    io = executor.stats()
+    assert io["name"] == "woodshed-vectorstore-io"
+    assert io["submitted"] > submitted and io["queued"] == 0
+    assert io["queue_wait_ms"]["max"] >= io["queue_wait_ms"]["p50"] >= 0
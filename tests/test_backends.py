@@ -0,0 +1,108 @@
+# Woodshed AI — Vector Backend Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the NumPy, partitioned and compact vector backends."""
+
+from unittest.mock import patch
+
+import numpy as np
+
+from app.knowledge.backends import RESCORE_FACTOR, NumpyBackend
+
+
+def test_numpy_backend_matches_chroma(make_offline_store, add_lexical_corpus):
+    """Exact NumPy search agrees with Chroma, honours filters, and tracks writes."""
+    stores = {}
+    for backend in ("chroma", "numpy"):
+        store = make_offline_store(backend=backend)
+        add_lexical_corpus(store)
+        stores[backend] = store
+    assert stores["numpy"].backend == "numpy"
+
+    for query in ("DADGAD voicing", "ii-V-I", "EADGBE"):
+        chroma = stores["chroma"].search(query, n_results=3, mode="vector")
+        exact = stores["numpy"].search(query, n_results=3, mode="vector")
+        assert [r["id"] for r in exact] == [r["id"] for r in chroma]
+        for a, b in zip(exact, chroma):
+            assert abs(a["distance"] - b["distance"]) < 1e-4
+
+    store = stores["numpy"]
+    filtered = store.search("tuning", n_results=5, category_filter="harmony", mode="vector")
+    assert [r["id"] for r in filtered] == ["t2"]
+
+    store.delete_by_source("tunings.md")
+    assert [r["id"] for r in store.search("tuning", n_results=5, mode="vector")] == ["t2"]
+    store.upsert_documents(ids=["t4"], documents=["Drop D tuning."], metadatas=[{"source": "d.md", "category": "instrumentation"}])
+    assert {r["id"] for r in store.search("tuning", n_results=5, mode="vector")} == {"t2", "t4"}
+
+    # A write from another instance (e.g. the ingest CLI) triggers a reload
+    other = make_offline_store(store.persist_dir, backend="chroma")
+    other.add_documents(ids=["t5"], documents=["Open G tuning."])
+    with patch("app.knowledge.vectorstore.SYNC_CHECK_INTERVAL", 0):
+        assert "t5" in {r["id"] for r in store.search("open g", n_results=5, mode="vector")}
+
+
+def test_partitioned_backend_routes_by_category(make_offline_store):
+    """Per-category partitions give the same results as a masked full scan."""
+    stores = {}
+    for backend in ("numpy", "partitioned"):
+        store = make_offline_store(backend=backend)
+        categories = ["harmony", "rhythm", "form"]
+        store.add_documents(
+            ids=[f"p{i}" for i in range(30)],
+            documents=[f"Lesson {i} on {categories[i % 3]}" for i in range(30)],
+            metadatas=[{"source": f"{i}.md", "category": categories[i % 3]} for i in range(30)],
+        )
+        stores[backend] = store
+
+    partitioned = stores["partitioned"]
+    assert partitioned._backend.partition_sizes() == {"form": 10, "harmony": 10, "rhythm": 10}
+    for category_filter in (None, "rhythm", ["form", "harmony"]):
+        expected = stores["numpy"].search("groove", n_results=7, category_filter=category_filter, mode="vector")
+        got = partitioned.search("groove", n_results=7, category_filter=category_filter, mode="vector")
+        assert [r["id"] for r in got] == [r["id"] for r in expected]
+        assert len(got) == 7  # filtered queries still fill k
+    lexical = partitioned.search("lesson", n_results=30, category_filter=["form", "rhythm"], mode="lexical")
+    assert len(lexical) == 20 and {r["metadata"]["category"] for r in lexical} == {"form", "rhythm"}
+
+    # Re-categorised chunks move partitions; emptied partitions are dropped
+    partitioned.upsert_documents(ids=["p0"], documents=["Now about melody"], metadatas=[{"source": "0.md", "category": "melody"}])
+    partitioned.delete_ids([f"p{i}" for i in range(2, 30, 3)])
+    assert partitioned._backend.partition_sizes() == {"harmony": 9, "melody": 1, "rhythm": 10}
+    assert [r["id"] for r in partitioned.search("x", n_results=3, category_filter="melody", mode="vector")] == ["p0"]
+
+
+def test_compact_storage_rescores_exactly():
+    """float16/int8 and truncated codes shrink the index; re-scoring keeps exact top-k."""
+    rng = np.random.default_rng(0)
+    # Matryoshka-style: most of each vector's energy sits in its leading dims
+    vectors = (rng.standard_normal((400, 64)) * np.repeat([1.0, 0.02], 32)).astype(np.float32)
+    ids = [f"v{i}" for i in range(400)]
+    metas = [{"category": "harmony" if i % 2 else "rhythm"} for i in range(400)]
+    queries = rng.standard_normal((10, 64)).astype(np.float32)
+
+    def build(storage="float32", dims=0, rescore=RESCORE_FACTOR):
+        backend = NumpyBackend(storage, dims, rescore)
+        backend.add(ids, ids, metas, vectors)
+        return backend
+
+    exact = build()
+    want = exact.query(queries, 5, "harmony")
+    for storage, dims, ratio in (("float16", 0, 2), ("int8", 0, 4 * 64 / 68), ("int8", 32, 4 * 64 / 36)):
+        compact = build(storage, dims)
+        assert exact.memory_bytes() / compact.memory_bytes() == ratio
+        got = compact.query(queries, 5, "harmony")
+        assert [[r["id"] for r in q] for q in got] == [[r["id"] for r in q] for q in want]
+        # Reported distances come from the float32 originals
+        assert np.allclose([r["distance"] for r in got[0]], [r["distance"] for r in want[0]], atol=1e-6)
+
+    # Deletes and overwrites keep codes and full-precision rows aligned
+    compact = build("int8", 32)
+    exact.remove(ids[:50])
+    compact.remove(ids[:50])
+    exact.add(["v399"], ["moved"], [{"category": "harmony"}], [vectors[0]])
+    compact.add(["v399"], ["moved"], [{"category": "harmony"}], [vectors[0]])
+    assert len(compact) == 350
+    assert [r["id"] for r in compact.query(queries, 8)[3]] == [r["id"] for r in exact.query(queries, 8)[3]]
+    assert compact.query([vectors[0]], 1)[0][0]["id"] == "v399"
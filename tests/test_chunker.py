@@ -0,0 +1,35 @@
+# Woodshed AI — Chunker Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the streaming, token-sized chunker."""
+
+from app.knowledge.chunker import iter_chunks, iter_token_chunks
+from app.llm.tokenizer import count_tokens
+
+
+def test_streaming_chunker_bounds_chunks():
+    """Huge unbroken paragraphs are split by words with overlap, never whole."""
+    words = ("Dm7 G7 Cmaj7 " * 5000).split()
+    fragments = ["# Huge\n", "\n"] + [" ".join(words[i:i + 100]) + " " for i in range(0, len(words), 100)]
+    chunks = list(iter_chunks(iter(fragments), chunk_size=50, overlap=5))
+    assert len(chunks) > 50
+    assert all(count_tokens(c) <= 52 for c in chunks)
+    # Every chunk after the first starts with the tail of the previous one
+    first_body = chunks[0]
+    overlap = chunks[1].split("\n\n", 1)[0]
+    assert overlap and first_body.endswith(overlap)
+    # No words lost or duplicated (ignoring the overlap prefixes)
+    body = " ".join(c.split("\n\n", 1)[-1] if i else c for i, c in enumerate(chunks))
+    assert body.replace("# Huge", "").split() == words
+
+
+def test_token_chunks_keep_tables_and_counts():
+    """Token-sized chunks keep table rows intact and report exact counts."""
+    table = "\n".join(f"| Dm7 | G7 | Cmaj7 | A7b9 | bar {i} |" for i in range(60))
+    chunks = list(iter_token_chunks(iter(["## Turnarounds\n", "\n", table + "\n"]), chunk_size=80, overlap=0))
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.tokens == count_tokens(chunk.text) <= 80
+        for line in chunk.text.splitlines():
+            assert line.startswith(("|", "## ")) and (line.endswith("|") or line.startswith("##"))
@@ -0,0 +1,61 @@
+# Woodshed AI — Context Compression Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for query-aware context compression."""
+
+import asyncio
+from unittest.mock import patch
+
+from app.knowledge.compress import compress_chunks
+from app.llm.tokenizer import count_tokens
+
+
+def test_compress_chunks_keeps_relevant_spans():
+    """Compression keeps the heading and the query-relevant paragraph, within budget."""
+    def embed(texts):
+        return [[("tritone" in t) * 1.0, ("swing" in t) * 1.0, 0.1] for t in texts]
+
+    filler = "Swing feel lives in the ride cymbal and the walking bass line. " * 12
+    document = "\n\n".join([
+        "## Substitutions",
+        filler,
+        "A tritone substitution swaps G7 for Db7, sharing the same guide tones B and F.",
+        filler,
+    ])
+    long_chunk = {"id": "long", "document": document, "metadata": {"token_count": count_tokens(document)}}
+    short_chunk = {"id": "short", "document": "Dm7 G7 Cmaj7 is a ii-V-I.", "metadata": {"token_count": 12}}
+
+    chunks, stats = compress_chunks([long_chunk, short_chunk], [1.0, 0.0, 0.0], embed, token_budget=30)
+    assert chunks[0]["document"].split("\n\n") == ["## Substitutions", document.split("\n\n")[2]]
+    assert chunks[1] is short_chunk
+    assert stats.compressed == 1 and stats.tokens_after < 50
+    assert stats.tokens_saved == stats.tokens_before - stats.tokens_after > 100
+    assert chunks[0]["metadata"]["token_count"] == count_tokens(chunks[0]["document"])
+    assert long_chunk["document"] == document  # inputs aren't mutated
+
+    # Under budget: returned as-is, no embedding calls
+    calls = []
+    same, stats = compress_chunks([long_chunk], [1.0, 0.0, 0.0], lambda t: calls.append(t), token_budget=10_000)
+    assert same == [long_chunk] and calls == [] and stats.tokens_saved == 0
+
+
+def test_async_compression_matches_sync_and_times_out(make_offline_store):
+    """acompress_context embeds spans off the I/O pool and gives up after COMPRESS_EMBED_TIMEOUT."""
+    store = make_offline_store()
+    document = "\n\n".join(f"Paragraph {i} about {topic}. " * 12 for i, topic in enumerate(["voicings", "rhythm", "modes"]))
+    chunks = [{"id": "c1", "document": document, "metadata": {}, "distance": 0.2}]
+    sync_chunks, sync_stats = store.compress_context("voicings", chunks, token_budget=60)
+    async_chunks, async_stats = asyncio.run(store.acompress_context("voicings", chunks, token_budget=60))
+    assert async_chunks == sync_chunks and async_stats.compressed == sync_stats.compressed == 1
+
+    async def stalled(texts):
+        await asyncio.sleep(5)
+
+    with patch.object(store, "_aembed", side_effect=stalled), patch("config.COMPRESS_EMBED_TIMEOUT", 0.05):
+        try:
+            asyncio.run(store.acompress_context("rhythm", chunks, token_budget=60))
+        except TimeoutError:
+            pass
+        else:
+            raise AssertionError("expected a timeout")
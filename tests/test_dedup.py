@@ -0,0 +1,44 @@
+# Woodshed AI — Near-Duplicate Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for near-duplicate chunk linking at ingest."""
+
+import tempfile
+from pathlib import Path
+
+from app.knowledge.dedup import DedupIndex
+from app.knowledge.ingest import IngestReport, ingest_directory
+
+
+def test_ingest_links_near_duplicates(make_offline_store):
+    """Near-duplicate chunks are linked, not stored, and take over if the original goes."""
+    tmp_dir = Path(tempfile.mkdtemp(prefix="woodshed_ingest_"))
+    table = " ".join(f"| {key} major | I IV V vi | bar {i} |" for i, key in enumerate("CGDAEBF"))
+    (tmp_dir / "a_pop.md").write_text(f"# Pop\n\n{table} Common in pop.", encoding="utf-8")
+    (tmp_dir / "b_rock.md").write_text(f"# Rock\n\n{table} Common in rock.", encoding="utf-8")
+    (tmp_dir / "c_jazz.md").write_text("# Jazz\n\nii-V-I with tritone substitutions.", encoding="utf-8")
+    store = make_offline_store()
+
+    report = IngestReport()
+    assert ingest_directory(tmp_dir, "test", store, verbose=False, report=report, dedup_threshold=0.8) == 2
+    assert report.chunks_linked == 1
+    assert sorted(store.collection.get()["ids"]) == ["test_a_pop.md_0", "test_c_jazz.md_0"]
+    results = store.search("major I IV V vi", n_results=3, mode="lexical")
+    assert len({r["document"] for r in results}) == len(results) == 2
+
+    dedup = DedupIndex(store.dedup_path, 0.8)
+    assert dedup.canonical_of("test_b_rock.md_0") == "test_a_pop.md_0"
+    assert [d["source"] for d in dedup.duplicates_of("test_a_pop.md_0")] == ["b_rock.md"]
+
+    # Deleting the canonical file stores the duplicate in its place
+    (tmp_dir / "a_pop.md").unlink()
+    ingest_directory(tmp_dir, "test", store, verbose=False, dedup_threshold=0.8)
+    got = store.collection.get(include=["metadatas"])
+    assert sorted(got["ids"]) == ["test_b_rock.md_0", "test_c_jazz.md_0"]
+    assert {m["source"] for m in got["metadatas"]} == {"b_rock.md", "c_jazz.md"}
+    assert DedupIndex(store.dedup_path, 0.8).linked == 0
+
+    # Dedup off stores everything
+    plain = make_offline_store()
+    assert ingest_directory(tmp_dir, "test", plain, verbose=False, dedup_threshold=0) == 2
@@ -0,0 +1,174 @@
+# Woodshed AI — Embedding Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the embedding pipeline, on-disk cache and async embeddings."""
+
+import asyncio
+import threading
+import tempfile
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+
+from app.knowledge.embed_cache import EmbeddingCache
+from app.knowledge.embed_pipeline import EmbeddingPipeline
+from app.knowledge.embeddings import CachedOllamaEmbeddingFunction, aget_embeddings, get_embedding
+from app.knowledge.vectorstore import VectorStore
+
+
+def test_embedding_pipeline_batches(make_offline_store):
+    """The pipeline embeds in fixed-size batches and writes every chunk."""
+    store = make_offline_store()
+    batch_sizes = []
+
+    def embed(texts):
+        batch_sizes.append(len(texts))
+        return store.embed_documents(texts)
+
+    with EmbeddingPipeline(store, embed_fn=embed, batch_size=4, concurrency=3) as pipeline:
+        for f in range(3):
+            ids = [f"f{f}_{i}" for i in range(5)]
+            pipeline.submit(ids, [f"chunk {f}-{i}" for i in range(5)], [{"source": f"f{f}.md"}] * 5)
+    stats = pipeline.stats
+    assert stats.chunks == 15
+    assert sorted(batch_sizes) == [3, 4, 4, 4]
+    assert stats.chunks_per_second > 0
+    assert store.get_stats()["total_chunks"] == 15
+
+
+def test_embedding_pipeline_propagates_errors(make_offline_store):
+    """An embedding failure surfaces from flush() instead of being dropped."""
+    store = make_offline_store()
+
+    def embed(texts):
+        raise RuntimeError("embedding model fell over")
+
+    pipeline = EmbeddingPipeline(store, embed_fn=embed, batch_size=2)
+    pipeline.submit(["a", "b", "c"], ["A", "B", "C"], [{}, {}, {}])
+    try:
+        pipeline.close()
+    except RuntimeError as e:
+        assert "fell over" in str(e)
+    else:
+        raise AssertionError("expected the embedding error to propagate")
+
+
+def test_span_warming_is_opt_in(make_offline_store):
+    """Ingest embeds compression spans only with COMPRESS_WARM_SPANS."""
+    store = make_offline_store()
+    calls = []
+
+    def embed(texts):
+        calls.append(len(texts))
+        return store.embed_documents(texts)
+
+    doc = "First paragraph about voice leading.\n\nSecond paragraph about guide tones."
+    with patch.object(VectorStore, "embeddings_cached", True):
+        for warm, expected in ((False, [1]), (True, [1, 2])):
+            calls.clear()
+            with patch("config.COMPRESS_WARM_SPANS", warm), EmbeddingPipeline(store, embed_fn=embed) as pipeline:
+                pipeline.submit([f"doc_{warm}"], [doc], [{"source": "doc.md"}])
+            assert calls == expected
+
+
+def test_embedding_cache_persists():
+    """Cached vectors survive reopening and are keyed per model."""
+    cache_dir = Path(tempfile.mkdtemp(prefix="woodshed_cache_"))
+    cache = EmbeddingCache("test-model", cache_dir=cache_dir)
+    assert cache.get_many(["Cmaj7"]) == [None]
+    cache.put_many(["Cmaj7", "Dm7"], [[1.0, 0.0, 0.5], [0.0, 1.0, 0.25]])
+    cache.put_many(["Cmaj7"], [[9.0, 9.0, 9.0]])  # already cached — ignored
+
+    reopened = EmbeddingCache("test-model", cache_dir=cache_dir)
+    assert len(reopened) == 2
+    dm7, missing, cmaj7 = reopened.get_many(["Dm7", "G7", "Cmaj7"])
+    assert missing is None
+    assert dm7.tolist() == [0.0, 1.0, 0.25]
+    assert cmaj7.dtype == np.float32 and cmaj7.tolist() == [1.0, 0.0, 0.5]
+    assert reopened.stats()["hits"] == 2 and reopened.stats()["misses"] == 1
+
+    other_model = EmbeddingCache("other-model", cache_dir=cache_dir)
+    assert other_model.get_many(["Cmaj7"]) == [None]
+
+
+def test_embedding_cache_shared_between_instances():
+    """Two writers on one directory (API + CLI ingest) never mix up rows."""
+    cache_dir = Path(tempfile.mkdtemp(prefix="woodshed_cache_"))
+    first = EmbeddingCache("test-model", cache_dir=cache_dir)
+    second = EmbeddingCache("test-model", cache_dir=cache_dir)
+    first.put_many(["a"], [[1.0, 0.0, 0.0]])
+    second.put_many(["b"], [[0.0, 1.0, 0.0]])
+    first.put_many(["c", "b"], [[0.0, 0.0, 1.0], [9.0, 9.0, 9.0]])
+    # A crashed writer's vector without an index line is dropped by the next append
+    with open(cache_dir / "test-model" / "vectors.f32", "ab") as f:
+        f.write(np.array([5.0, 5.0, 5.0], dtype=np.float32).tobytes())
+    second.put_many(["d"], [[0.5, 0.5, 0.5]])
+
+    for cache in (first, second, EmbeddingCache("test-model", cache_dir=cache_dir)):
+        cache.put_many(["a"], [[7.0, 7.0, 7.0]])  # picks up the other writer's rows
+        vectors = cache.get_many(["a", "b", "c", "d"])
+        assert [v.tolist() for v in vectors] == [
+            [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], [0.5, 0.5, 0.5],
+        ]
+        assert len(cache) == 4
+
+
+def test_get_embedding_and_store_share_cache():
+    """get_embedding and the vector store's embedding function read the same cache."""
+    cache = EmbeddingCache("shared-model", cache_dir=Path(tempfile.mkdtemp(prefix="woodshed_cache_")))
+    with patch("app.knowledge.embeddings.get_cache", return_value=cache), \
+         patch("app.knowledge.embeddings.ollama_client.get_embedding", return_value=[0.5, 0.5]) as single, \
+         patch("chromadb.utils.embedding_functions.OllamaEmbeddingFunction.__call__",
+               side_effect=lambda texts: [np.array([0.1, 0.2], dtype=np.float32) for _ in texts]) as batch:
+        assert get_embedding("tritone sub") == [0.5, 0.5]
+        ef = CachedOllamaEmbeddingFunction(model_name="shared-model")
+        vectors = ef(["tritone sub", "ii-V-I"])
+        # Only the unseen text went to Ollama
+        batch.assert_called_once_with(["ii-V-I"])
+        assert vectors[0].tolist() == [0.5, 0.5]
+        assert get_embedding("ii-V-I") == [np.float32(0.1), np.float32(0.2)]
+        single.assert_called_once()
+
+
+def test_async_embeddings_use_async_client():
+    """With the Ollama embedding function, asearch embeds over the async client."""
+    cache = EmbeddingCache("async-model", cache_dir=Path(tempfile.mkdtemp(prefix="woodshed_cache_")))
+    store = VectorStore(
+        persist_dir=tempfile.mkdtemp(prefix="woodshed_test_"),
+        collection_name="test_collection",
+        embedding_fn=CachedOllamaEmbeddingFunction(model_name="async-model"),
+    )
+    fake = AsyncMock(side_effect=lambda texts, model=None: [[float(len(t)), 1.0] for t in texts])
+    with patch("app.knowledge.embeddings.get_cache", return_value=cache), \
+         patch("app.knowledge.embeddings.ollama_client.aembed", fake), \
+         patch("chromadb.utils.embedding_functions.OllamaEmbeddingFunction.__call__",
+               side_effect=AssertionError("blocking embed")):
+        asyncio.run(store.aadd_documents(ids=["x"], documents=["Backdoor ii-V"]))
+        results = asyncio.run(store.asearch("backdoor", n_results=1, mode="vector"))
+    assert results[0]["id"] == "x"
+    assert [c.args[0] for c in fake.call_args_list] == [["Backdoor ii-V"], ["backdoor"]]
+
+
+def test_async_embeddings_keep_cache_io_off_the_event_loop():
+    """aget_embeddings reads and writes the cache on the I/O executor."""
+    cache = EmbeddingCache("async-model", cache_dir=Path(tempfile.mkdtemp(prefix="woodshed_cache_")))
+    threads = []
+    get_many, put_many = cache.get_many, cache.put_many
+
+    def record(fn):
+        def wrapper(*args):
+            threads.append(threading.current_thread())
+            return fn(*args)
+        return wrapper
+
+    fake = AsyncMock(side_effect=lambda texts, model=None: [[1.0, 0.0] for _ in texts])
+    with patch("app.knowledge.embeddings.get_cache", return_value=cache), \
+         patch("app.knowledge.embeddings.ollama_client.aembed", fake), \
+         patch.object(cache, "get_many", record(get_many)), \
+         patch.object(cache, "put_many", record(put_many)):
+        assert asyncio.run(aget_embeddings(["Drop 2", "Drop 3"])) == [[1.0, 0.0], [1.0, 0.0]]
+        assert asyncio.run(aget_embeddings(["Drop 2"])) == [[1.0, 0.0]]
+    assert len(threads) == 3 and threading.main_thread() not in threads
+    fake.assert_awaited_once()
@@ -0,0 +1,157 @@
+# Woodshed AI — Extractor Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for HTML, EPUB and PDF source extraction."""
+
+import io
+import tempfile
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.knowledge.extractors import PAGE_MAX_CHARS, Extractor, TextExtractor
+from app.knowledge.ingest import IngestReport, ingest_directory
+
+
+def _epub_bytes(chapters: list[str]) -> bytes:
+    """A minimal EPUB with one XHTML file per chapter."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("mimetype", "application/epub+zip")
+        z.writestr("META-INF/container.xml", (
+            '<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container"><rootfiles>'
+            '<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+            "</rootfiles></container>"
+        ))
+        items = "".join(f'<item id="c{i}" href="ch%20{i}.xhtml" media-type="application/xhtml+xml"/>' for i in range(len(chapters)))
+        spine = "".join(f'<itemref idref="c{i}"/>' for i in reversed(range(len(chapters))))
+        z.writestr("OEBPS/content.opf", (
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0">'
+            f"<manifest>{items}</manifest><spine>{spine}</spine></package>"
+        ))
+        for i, body in enumerate(chapters):
+            z.writestr(f"OEBPS/ch {i}.xhtml", f"<html><head><title>x</title></head><body>{body}</body></html>")
+    return buf.getvalue()
+
+
+def _pdf_bytes(pages: list[str], outline: list[tuple[str, int]]) -> bytes:
+    """A minimal PDF with one line of text per page and an outline."""
+    n = len(pages)
+    first_page, first_item = 4, 4 + 2 * n
+    objects = [
+        f"<< /Type /Catalog /Pages 2 0 R /Outlines {first_item + len(outline)} 0 R >>",
+        "<< /Type /Pages /Kids [" + " ".join(f"{first_page + 2 * i} 0 R" for i in range(n)) + f"] /Count {n} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {first_page + 2 * i + 1} 0 R "
+            "/Resources << /Font << /F1 3 0 R >> >> >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    root = first_item + len(outline)
+    for j, (title, page) in enumerate(outline):
+        links = (f" /Prev {first_item + j - 1} 0 R" if j else "") + (f" /Next {first_item + j + 1} 0 R" if j < len(outline) - 1 else "")
+        objects.append(f"<< /Title ({title}) /Parent {root} 0 R /Dest [{first_page + 2 * page} 0 R /Fit]{links} >>")
+    objects.append(f"<< /Type /Outlines /First {first_item} 0 R /Last {root - 1} 0 R /Count {len(outline)} >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def test_ingest_html_and_epub_with_sections(make_offline_store):
+    """HTML and EPUB sources are chunked per section/chapter with citation metadata."""
+    tmp_dir = Path(tempfile.mkdtemp(prefix="woodshed_ingest_"))
+    (tmp_dir / "voicings.html").write_text(
+        "<html><head><style>p { color: red }</style><script>var x = 1;</script></head><body>"
+        "<h1>Drop 2 Voicings</h1><p>Drop the second voice from the top &amp; down an octave.</p>"
+        "<h2>Shell Voicings</h2><p>Root, third and seventh only.</p>"
+        "<table><tr><th>Chord</th><th>Notes</th></tr><tr><td>Cmaj7</td><td>C E B</td></tr></table>"
+        "</body></html>",
+        encoding="utf-8",
+    )
+    (tmp_dir / "book.epub").write_bytes(_epub_bytes([
+        "<h1>Chapter One</h1><p>Intervals are the distance between notes.</p>",
+        "<h1>Chapter Two</h1><p>Triads stack two thirds.</p><ul><li>major</li><li>minor</li></ul>",
+    ]))
+    (tmp_dir / "book.md").write_text("# Book\n\nNotes on the book.", encoding="utf-8")
+    store = make_offline_store()
+    report = IngestReport()
+    ingest_directory(tmp_dir, "test", store, verbose=False, report=report)
+    assert sorted(report.added) == ["book.epub", "book.md", "voicings.html"]
+
+    got = store.collection.get(include=["documents", "metadatas"])
+    chunks = {i: (d, m) for i, d, m in zip(got["ids"], got["documents"], got["metadatas"])}
+    assert "test_book.md_0" in chunks and "page" not in chunks["test_book.md_0"][1]
+
+    html = [chunks[f"test_voicings.html_{i}"] for i in range(2)]
+    assert [m["section"] for _, m in html] == ["Drop 2 Voicings", "Shell Voicings"]
+    assert html[0][0] == "# Drop 2 Voicings\n\nDrop the second voice from the top & down an octave."
+    assert "| Cmaj7 | C E B |" in html[1][0]
+    assert "color" not in html[0][0] and "var x" not in html[0][0]
+
+    # Chapters follow the spine (which lists them in reverse), one page each
+    epub = [chunks[f"test_book.epub_{i}"] for i in range(2)]
+    assert [(m["page"], m["section"]) for _, m in epub] == [(1, "Chapter Two"), (2, "Chapter One")]
+    assert "- major\n- minor" in epub[0][0]
+
+
+def test_pdf_pages_extracted_in_parallel(make_offline_store):
+    """PDF pages are split across workers and keep page and outline metadata."""
+    pytest.importorskip("pypdf")
+    tmp_dir = Path(tempfile.mkdtemp(prefix="woodshed_ingest_"))
+    pages = [f"Page {i} covers cadence number {i}." for i in range(5)]
+    (tmp_dir / "cadences.pdf").write_bytes(_pdf_bytes(pages, [("Authentic", 0), ("Plagal", 3)]))
+
+    contents = {}
+    with patch("config.INGEST_PAGES_PER_TASK", 2):
+        for workers in (1, 2):
+            store = make_offline_store()
+            ingest_directory(tmp_dir, "test", store, verbose=False, workers=workers)
+            got = store.collection.get(include=["documents", "metadatas"])
+            contents[workers] = sorted(
+                (i, d, m["page"], m["section"]) for i, d, m in zip(got["ids"], got["documents"], got["metadatas"])
+            )
+    assert contents[1] == contents[2]
+    assert [(d, p, s) for _, d, p, s in contents[1]] == [
+        (text, n + 1, "Plagal" if n >= 3 else "Authentic") for n, text in enumerate(pages)
+    ]
+
+
+def test_ingest_skips_pdf_without_pypdf(make_offline_store):
+    """Without pypdf, PDFs are skipped and their existing chunks are kept."""
+    tmp_dir = Path(tempfile.mkdtemp(prefix="woodshed_ingest_"))
+    (tmp_dir / "scales.md").write_text("# Scales\n\nMajor and minor.", encoding="utf-8")
+    (tmp_dir / "scales.pdf").write_bytes(b"%PDF-1.4\n")
+    store = make_offline_store()
+    report = IngestReport()
+    with patch("app.knowledge.extractors.PdfExtractor.available", return_value=False):
+        ingest_directory(tmp_dir, "test", store, verbose=False, report=report)
+    assert report.added == ["scales.md"] and report.skipped == ["scales.pdf"]
+    assert "1 skipped" in report.summary()
+
+
+def test_extractors_must_yield_pages(tmp_path):
+    """Extractor is abstract over pages(); the text extractor streams its file as pages too."""
+    class NoPages(Extractor):
+        suffixes = (".x",)
+
+    with pytest.raises(TypeError):
+        NoPages()
+
+    path = tmp_path / "notes.txt"
+    path.write_text("a" * (PAGE_MAX_CHARS + 10), encoding="utf-8")
+    pages = list(TextExtractor().pages(path))
+    assert [len(p.text) for p in pages] == [PAGE_MAX_CHARS, 10]
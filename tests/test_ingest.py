@@ -0,0 +1,182 @@
+# Woodshed AI — Ingest Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for incremental, parallel and tokenizer-aware ingestion."""
+
+import os
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+from app.knowledge.chunker import chunker_version
+from app.knowledge.ingest import IngestReport, ingest_directory
+from app.knowledge.manifest import IngestManifest
+from app.llm.tokenizer import tokenizer_id
+
+
+def test_incremental_reingest(make_offline_store):
+    """Re-ingest skips unchanged files, updates edited ones, drops deleted ones."""
+    tmp_dir = Path(tempfile.mkdtemp(prefix="woodshed_ingest_"))
+    store = make_offline_store()
+    long_text = "\n\n".join(f"## Part {i}\n\n" + "Voice leading matters. " * 40 for i in range(4))
+    (tmp_dir / "chords.md").write_text(long_text, encoding="utf-8")
+    (tmp_dir / "scales.md").write_text("# Scales\n\nDorian has a raised sixth.", encoding="utf-8")
+
+    first = IngestReport()
+    ingest_directory(tmp_dir, "test", store, verbose=False, report=first)
+    assert sorted(first.added) == ["chords.md", "scales.md"]
+    initial_total = store.get_stats()["total_chunks"]
+    assert initial_total > 2
+
+    # Nothing changed — nothing written
+    second = IngestReport()
+    assert ingest_directory(tmp_dir, "test", store, verbose=False, report=second) == 0
+    assert sorted(second.unchanged) == ["chords.md", "scales.md"]
+
+    # Touch without editing — hash matches, still unchanged
+    os.utime(tmp_dir / "scales.md", (1, 1))
+    touched = IngestReport()
+    ingest_directory(tmp_dir, "test", store, verbose=False, report=touched)
+    assert "scales.md" in touched.unchanged
+
+    # Shrink one file and delete the other
+    (tmp_dir / "chords.md").write_text("# Chords\n\nShort now.", encoding="utf-8")
+    (tmp_dir / "scales.md").unlink()
+    third = IngestReport()
+    ingest_directory(tmp_dir, "test", store, verbose=False, report=third)
+    assert third.changed == ["chords.md"]
+    assert third.removed == ["scales.md"]
+    assert third.chunks_deleted == initial_total - 1
+    stats = store.get_stats()
+    assert stats["total_chunks"] == 1
+    assert stats["sources"] == ["test/chords.md"]
+
+
+def test_tokenizer_change_rechunks_files(make_offline_store):
+    """Chunks made with another tokenizer are re-chunked even if the file is unchanged."""
+    tmp_dir = Path(tempfile.mkdtemp(prefix="woodshed_ingest_"))
+    (tmp_dir / "chords.md").write_text("# Chords\n\nA dominant seventh wants to resolve.", encoding="utf-8")
+    store = make_offline_store()
+    ingest_directory(tmp_dir, "test", store, verbose=False)
+    assert chunker_version().endswith(tokenizer_id())
+
+    with patch("app.knowledge.chunker.tokenizer_id", return_value="sha256:0123456789abcdef"):
+        report = IngestReport()
+        ingest_directory(tmp_dir, "test", store, verbose=False, report=report)
+        assert report.changed == ["chords.md"]
+        again = IngestReport()
+        ingest_directory(tmp_dir, "test", store, verbose=False, report=again)
+        assert again.unchanged == ["chords.md"]
+    assert store.get_stats()["total_chunks"] == 1
+
+
+def test_parallel_ingest_matches_serial(make_offline_store):
+    """Chunking in worker processes writes the same chunks as the serial path."""
+    tmp_dir = Path(tempfile.mkdtemp(prefix="woodshed_ingest_"))
+    for i in range(4):
+        body = "\n\n".join(f"## Part {j}\n\n" + f"Guide tone line {i}. " * 60 for j in range(3))
+        (tmp_dir / f"lesson_{i}.md").write_text(body, encoding="utf-8")
+
+    contents = {}
+    for workers in (1, 2):
+        store = make_offline_store()
+        report = IngestReport()
+        ingest_directory(tmp_dir, "test", store, verbose=False, report=report, workers=workers)
+        assert len(report.added) == 4
+        assert report.files_per_second > 0
+        got = store.collection.get(include=["documents", "metadatas"])
+        contents[workers] = sorted(zip(got["ids"], got["documents"], [m["token_count"] for m in got["metadatas"]]))
+
+        # Touched files are re-hashed in the workers and stay unchanged
+        for path in tmp_dir.iterdir():
+            os.utime(path, (1, 1))
+        touched = IngestReport()
+        assert ingest_directory(tmp_dir, "test", store, verbose=False, report=touched, workers=workers) == 0
+        assert len(touched.unchanged) == 4
+    assert contents[1] == contents[2]
+
+
+def test_reset_clears_manifest(make_offline_store):
+    """After a reset, the next ingest treats every file as new."""
+    tmp_dir = Path(tempfile.mkdtemp(prefix="woodshed_ingest_"))
+    store = make_offline_store()
+    (tmp_dir / "melody.md").write_text("# Melody\n\nStepwise motion.", encoding="utf-8")
+    ingest_directory(tmp_dir, "test", store, verbose=False)
+    assert store.manifest_path.exists()
+
+    store.reset()
+    report = IngestReport()
+    ingest_directory(tmp_dir, "test", store, verbose=False, report=report)
+    assert report.added == ["melody.md"]
+    assert store.get_stats()["total_chunks"] == 1
+
+
+def test_same_stem_text_files_keep_separate_chunks(make_offline_store):
+    """notes.md and notes.txt in one directory don't overwrite each other's chunks."""
+    tmp_dir = Path(tempfile.mkdtemp(prefix="woodshed_ingest_"))
+    store = make_offline_store()
+    (tmp_dir / "notes.md").write_text("# Notes\n\nLydian has a raised fourth.", encoding="utf-8")
+    (tmp_dir / "notes.txt").write_text("Mixolydian has a flat seventh.", encoding="utf-8")
+    ingest_directory(tmp_dir, "test", store, verbose=False)
+    assert sorted(store.collection.get()["ids"]) == ["test_notes.md_0", "test_notes.txt_0"]
+
+    # Removing one file leaves the other's chunks alone
+    (tmp_dir / "notes.txt").unlink()
+    report = IngestReport()
+    ingest_directory(tmp_dir, "test", store, verbose=False, report=report)
+    assert report.removed == ["notes.txt"]
+    got = store.collection.get(include=["documents"])
+    assert got["ids"] == ["test_notes.md_0"]
+    assert "Lydian" in got["documents"][0]
+
+
+def test_stem_based_ids_are_migrated(make_offline_store):
+    """Text files stored under the old stem-based IDs are re-keyed once."""
+    tmp_dir = Path(tempfile.mkdtemp(prefix="woodshed_ingest_"))
+    store = make_offline_store()
+    (tmp_dir / "notes.md").write_text("# Notes\n\nLydian has a raised fourth.", encoding="utf-8")
+    ingest_directory(tmp_dir, "test", store, verbose=False)
+
+    # Rewrite the store and manifest as an older ingest left them
+    got = store.collection.get(include=["documents", "metadatas"])
+    store.delete_ids(got["ids"])
+    store.add_documents(ids=["test_notes_0"], documents=got["documents"], metadatas=got["metadatas"])
+    manifest = IngestManifest(store.manifest_path)
+    entry = manifest.get("test", "notes.md")
+    manifest.set("test", tmp_dir / "notes.md", entry["size"], entry["mtime"], entry["sha256"],
+                 ["test_notes_0"], entry["chunker"])
+    manifest.save()
+
+    report = IngestReport()
+    ingest_directory(tmp_dir, "test", store, verbose=False, report=report)
+    assert report.changed == ["notes.md"]
+    assert store.collection.get()["ids"] == ["test_notes.md_0"]
+    again = IngestReport()
+    ingest_directory(tmp_dir, "test", store, verbose=False, report=again)
+    assert again.unchanged == ["notes.md"]
+
+
+def test_reingest_deletes_on_the_pipeline_writer(make_offline_store):
+    """Stale and removed chunks are deleted by the pipeline's writer thread, not alongside it."""
+    tmp_dir = Path(tempfile.mkdtemp(prefix="woodshed_ingest_"))
+    store = make_offline_store()
+    long_text = "\n\n".join(f"## Part {i}\n\n" + "Voice leading matters. " * 40 for i in range(4))
+    (tmp_dir / "chords.md").write_text(long_text, encoding="utf-8")
+    (tmp_dir / "scales.md").write_text("# Scales\n\nDorian has a raised sixth.", encoding="utf-8")
+    ingest_directory(tmp_dir, "test", store, verbose=False)
+
+    (tmp_dir / "chords.md").write_text("# Chords\n\nShort now.", encoding="utf-8")
+    (tmp_dir / "scales.md").unlink()
+    threads = []
+    delete_ids = store.delete_ids
+
+    def record(ids):
+        threads.append(threading.current_thread().name)
+        delete_ids(ids)
+
+    with patch.object(store, "delete_ids", side_effect=record):
+        ingest_directory(tmp_dir, "test", store, verbose=False)
+    assert len(threads) == 2 and all(name == "woodshed-embed-writer" for name in threads)
+    assert store.collection.get()["ids"] == ["test_chords.md_0"]
@@ -0,0 +1,102 @@
+# Woodshed AI — Lexical Search Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for BM25 and hybrid retrieval."""
+
+from unittest.mock import patch
+
+import pytest
+
+
+def test_lexical_search(make_offline_store, add_lexical_corpus):
+    """Lexical mode ranks exact-token matches without embedding the query."""
+    store = make_offline_store()
+    add_lexical_corpus(store)
+    store.embed_documents = lambda texts: (_ for _ in ()).throw(AssertionError("embedded"))
+
+    results = store.search("DADGAD voicing", n_results=2, mode="lexical")
+    assert results[0]["id"] == "t1"
+    assert results[0]["distance"] is None
+    assert store.search("dm7 g7 cmaj7", n_results=1, mode="lexical")[0]["id"] == "t2"
+    assert store.search("ii-V", n_results=1, mode="lexical")[0]["id"] == "t2"
+    assert store.search("tuning", n_results=5, mode="lexical", category_filter="harmony") == []
+
+
+def test_hybrid_search_and_fallback(make_offline_store, add_lexical_corpus):
+    """Hybrid fuses both rankings and degrades to lexical if embedding fails."""
+    store = make_offline_store()
+    add_lexical_corpus(store)
+
+    results = store.search("DADGAD voicing", n_results=3, mode="hybrid")
+    assert results[0]["id"] == "t1"
+    assert results[0]["distance"] is not None  # found by both rankers
+    assert len({r["id"] for r in results}) == 3
+
+    def broken(texts):
+        raise ConnectionError("embedding model not loaded")
+
+    store.embed_documents = broken
+    results = store.search("Cmaj7 in C major", n_results=1, mode="hybrid")
+    assert results[0]["id"] == "t2"
+
+
+def test_lexical_index_stays_in_sync(make_offline_store, add_lexical_corpus):
+    """Deletes, re-ingest, and reset keep the BM25 index matching the collection."""
+    store = make_offline_store()
+    add_lexical_corpus(store)
+    store.delete_by_source("tunings.md")
+    assert store.search("DADGAD", mode="lexical") == []
+    store.upsert_documents(ids=["t2"], documents=["Backdoor ii-V: Fm7 Bb7 Cmaj7."])
+    assert store.search("Dm7", mode="lexical") == []
+    assert store.search("Bb7", mode="lexical")[0]["id"] == "t2"
+    store.persist()
+
+    # A fresh instance loads the persisted index; a stale one is rebuilt
+    reopened = make_offline_store(store.persist_dir)
+    assert reopened.search("Bb7", mode="lexical")[0]["id"] == "t2"
+    reopened.lexical_path.unlink()
+    rebuilt = make_offline_store(store.persist_dir)
+    assert rebuilt.search("Fm7", mode="lexical")[0]["id"] == "t2"
+
+    rebuilt.reset()
+    assert rebuilt.search("Bb7", mode="lexical") == []
+
+
+def test_lexical_sidecar_holds_term_counts_only(make_offline_store, add_lexical_corpus):
+    """The BM25 sidecar stores no chunk text, and saves append to a journal."""
+    store = make_offline_store()
+    add_lexical_corpus(store)
+    store.persist()
+    assert "DADGAD" not in store.lexical_path.read_text(encoding="utf-8")
+    snapshot = store.lexical_path.read_text(encoding="utf-8")
+
+    store.upsert_documents(ids=["t4"], documents=["Open G tuning: DGDGBD."], metadatas=[{"category": "instrumentation"}])
+    store.persist()
+    assert store.lexical_path.read_text(encoding="utf-8") == snapshot
+    assert "dgdgbd" in store._lexical.journal_path.read_text(encoding="utf-8")
+    reopened = make_offline_store(store.persist_dir)
+    assert reopened.search("DGDGBD", mode="lexical")[0]["document"] == "Open G tuning: DGDGBD."
+
+
+@pytest.mark.parametrize("backend", ["chroma", "numpy"])
+def test_lexical_follows_same_count_upsert_by_another_instance(make_offline_store, add_lexical_corpus, backend):
+    """Another process rewriting a chunk in place is reflected in lexical search."""
+    store = make_offline_store(backend=backend)
+    add_lexical_corpus(store)
+    store.persist()
+    assert store.search("Dm7", n_results=1, mode="lexical")[0]["id"] == "t2"
+
+    other = make_offline_store(store.persist_dir, backend=backend)
+    other.upsert_documents(ids=["t2"], documents=["Backdoor ii-V: Fm7 Bb7 Cmaj7."], metadatas=[{"category": "harmony"}])
+    other.persist()
+    with patch("app.knowledge.vectorstore.SYNC_CHECK_INTERVAL", 0):
+        assert store.search("Dm7", mode="lexical") == []
+        assert store.search("Bb7", n_results=1, mode="lexical")[0]["document"].startswith("Backdoor")
+
+    # Journaled BM25 changes alone are replayed too
+    other.upsert_documents(ids=["t2"], documents=["Tritone sub: Db7 for G7."], metadatas=[{"category": "harmony"}])
+    other.persist()
+    with patch.object(store._stats, "changed_on_disk", return_value=False), \
+         patch("app.knowledge.vectorstore.SYNC_CHECK_INTERVAL", 0):
+        assert store.search("Db7", n_results=1, mode="lexical")[0]["id"] == "t2"
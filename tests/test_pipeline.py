@@ -0,0 +1,470 @@
+# Woodshed AI — Conversation Pipeline Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for MusicConversation with Ollama and the vector store mocked out."""
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import config
+from app.llm import history as history_module, pipeline, router, tool_executor
+from app.llm.history import ConversationHistory, message_tokens
+from app.llm.ollama_client import OllamaError
+from app.llm.pipeline import (
+    MAX_TOOL_ROUNDS, MUSIC_TOOLS, MusicConversation, StreamStatus, StreamToken, StreamToolCall,
+)
+from app.llm.prompts import SYSTEM_PROMPT
+from app.llm.router import classify_rules, route_message, router_stats, validate_turn
+from app.llm.tool_cache import MISS, ToolResultCache, canonical_args
+from app.llm.tool_executor import ToolExecutor, get_tool_executor
+
+
+def _chunk(text: str = "", tool_calls=None, prompt_eval_count: int = 0):
+    """A streamed Ollama chunk."""
+    return SimpleNamespace(
+        message=SimpleNamespace(content=text, tool_calls=tool_calls),
+        prompt_eval_count=prompt_eval_count,
+        prompt_eval_duration=prompt_eval_count * 1_000_000,
+    )
+
+
+def _tool_call(name: str, **arguments):
+    return SimpleNamespace(function=SimpleNamespace(name=name, arguments=arguments))
+
+
+class _FakeOllama:
+    """Records chat_stream calls and replays scripted responses."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls: list[dict] = []
+
+    def chat_stream(self, **kwargs):
+        self.calls.append(dict(kwargs, messages=[dict(m) for m in kwargs["messages"]]))
+        response = self.responses.pop(0) if self.responses else [_chunk("ok")]
+        yield from response
+
+
+@pytest.fixture
+def conversation():
+    """A conversation on LLM_MODEL only (routing is tested separately)."""
+    with patch.object(pipeline, "_get_vectorstore", return_value=MagicMock()), \
+         patch("config.ROUTER_ENABLED", False):
+        yield MusicConversation(keep_alive="10m")
+
+
+def _send(conv, fake, message, context=None, midi_summary=None):
+    chunks = [{"document": context}] if context else []
+    with patch.object(pipeline.ollama_client, "chat_stream", side_effect=fake.chat_stream):
+        return list(conv.send_stream(message, context_chunks=chunks, midi_summary=midi_summary))
+
+
+def test_stable_layout_keeps_prefix_byte_identical(conversation):
+    """Context rides with the newest user turn; system prompt and history never change."""
+    fake = _FakeOllama()
+    _send(conversation, fake, "What is a tritone?", context="A tritone is three whole steps.")
+    _send(conversation, fake, "And a tritone sub?", context="Db7 substitutes for G7.", midi_summary="Key: C")
+    _send(conversation, fake, "Thanks!")
+
+    first, second, third = fake.calls
+    for call in fake.calls:
+        assert call["messages"][0] == {"role": "system", "content": SYSTEM_PROMPT}
+        assert call["tools"] == MUSIC_TOOLS
+        assert call["keep_alive"] == "10m"
+    assert "three whole steps" in first["messages"][-1]["content"]
+    assert second["messages"][-1]["content"].endswith("And a tritone sub?")
+    assert "Db7 substitutes" in second["messages"][-1]["content"] and "Key: C" in second["messages"][-1]["content"]
+    assert third["messages"][-1]["content"] == "Thanks!"
+
+    # History stores the bare message, so earlier turns stay identical
+    assert second["messages"][1] == {"role": "user", "content": "What is a tritone?"}
+    assert third["messages"][:4] == second["messages"][:3] + [{"role": "user", "content": "And a tritone sub?"}]
+
+    stats = conversation.prefix_cache.stats
+    assert stats.calls == 3
+    assert 0 < stats.reused_tokens < stats.prompt_tokens
+    assert conversation.prefix_cache.last.reused_tokens > 0
+    assert stats.prefill_tokens == 0  # the fake reports nothing evaluated
+
+
+def test_system_layout_puts_context_in_system_prompt(conversation):
+    """The legacy layout changes the first message every turn, so nothing is reusable."""
+    fake = _FakeOllama()
+    with patch("config.PROMPT_LAYOUT", "system"):
+        _send(conversation, fake, "What is a tritone?", context="A tritone is three whole steps.")
+        _send(conversation, fake, "And a tritone sub?", context="Db7 substitutes for G7.")
+    assert "three whole steps" in fake.calls[0]["messages"][0]["content"]
+    assert fake.calls[1]["messages"][-1] == {"role": "user", "content": "And a tritone sub?"}
+    assert conversation.prefix_cache.stats.reused_tokens == 0
+
+
+def test_stable_layout_keeps_tools_on_last_round(conversation):
+    """Dropping tools on the final round would break the cached prefix."""
+    call = [_chunk(tool_calls=[_tool_call("analyze_chord", chord_symbol="Dm7")])]
+    responses = [call] * MAX_TOOL_ROUNDS + [[_chunk("Dm7 is the ii chord.", prompt_eval_count=12)]]
+    for layout, last_tools in (("stable", MUSIC_TOOLS), ("system", None)):
+        fake = _FakeOllama(*responses)
+        with patch("config.PROMPT_LAYOUT", layout), \
+             patch.dict(pipeline.TOOL_FUNCTIONS, {"analyze_chord": lambda chord_symbol: {"chord": chord_symbol}}):
+            conversation.reset()
+            _send(conversation, fake, "Analyze Dm7")
+        assert fake.calls[-1]["tools"] == last_tools
+        # Each round's prompt extends the previous one
+        assert conversation.prefix_cache.last.reused_tokens > 0
+
+
+def test_tool_call_on_last_round_gets_a_text_follow_up(conversation):
+    """A last round of only tool calls doesn't leave the reply empty."""
+    call = [_chunk(tool_calls=[_tool_call("analyze_chord", chord_symbol="Dm7")])]
+    fake = _FakeOllama(*[call] * (MAX_TOOL_ROUNDS + 1), [_chunk("Dm7 is the ii chord.")])
+    with patch.dict(pipeline.TOOL_FUNCTIONS, {"analyze_chord": lambda chord_symbol: {"chord": chord_symbol}}):
+        events = _send(conversation, fake, "Analyze Dm7")
+
+    assert len(fake.calls) == MAX_TOOL_ROUNDS + 2
+    follow_up = fake.calls[-1]
+    assert follow_up["tools"] is None
+    assert follow_up["messages"][:-1] == fake.calls[-2]["messages"]
+    assert follow_up["messages"][-1]["role"] == "user"
+    assert "".join(e.text for e in events if isinstance(e, StreamToken)) == "Dm7 is the ii chord."
+    # The nudge is not part of the conversation
+    assert conversation.messages[-1] == {"role": "assistant", "content": "Dm7 is the ii chord."}
+    assert all(m["content"] != follow_up["messages"][-1]["content"] for m in conversation.messages)
+
+    # The non-streaming path does the same
+    responses = [call[0]] * (MAX_TOOL_ROUNDS + 1) + [_chunk("Dm7 is the ii chord.")]
+    with patch.object(pipeline.ollama_client, "chat", side_effect=responses) as chat, \
+         patch.dict(pipeline.TOOL_FUNCTIONS, {"analyze_chord": lambda chord_symbol: {"chord": chord_symbol}}):
+        assert conversation.send("Analyze Dm7") == "Dm7 is the ii chord."
+    assert chat.call_args.kwargs["tools"] is None
+
+
+def _turn(n: int, words: int = 40) -> list[dict]:
+    return [
+        {"role": "user", "content": f"Question {n}"},
+        {"role": "assistant", "content": " ".join(["voicing"] * words)},
+    ]
+
+
+def test_history_window_stays_within_budget():
+    """Without a summary, the oldest turns are left out; the newest always stays."""
+    history = ConversationHistory(token_budget=150, summarize=False)
+    for n in range(10):
+        history.append(*_turn(n))
+    summary, recent = history.window()
+    assert summary == ""
+    assert sum(message_tokens(m) for m in recent) <= 150
+    assert recent[0]["role"] == "user" and recent[-2]["content"] == "Question 9"
+    assert len(history.messages) == 20  # the transcript itself is kept whole
+    assert history.compact_in_background() is None  # summarizing is off
+    assert history.stats.trimmed_windows == 1
+
+    history.append(*_turn(10, words=400))  # a turn bigger than the budget is still sent
+    assert history.window()[1] == history.messages[-2:]
+
+
+def test_old_turns_folded_into_summary_in_background(conversation):
+    """FAST_MODEL summarizes old turns after the reply; the next prompt carries the summary."""
+    threads = []
+
+    def fake_chat(**kwargs):
+        threads.append(threading.current_thread().name)
+        assert kwargs["model"] == config.FAST_MODEL
+        assert "Question 0" in kwargs["messages"][1]["content"]
+        return SimpleNamespace(message=SimpleNamespace(content="<think>hmm</think>They asked about voicings."))
+
+    conversation.history.token_budget = 200
+    fake = _FakeOllama(*[[_chunk(" ".join(["voicing"] * 40))] for _ in range(4)])
+    with patch.object(history_module.ollama_client, "chat", side_effect=fake_chat):
+        for n in range(4):
+            _send(conversation, fake, f"Question {n}")
+        conversation.history.wait(5)
+        _send(conversation, fake, "Question 4")
+        conversation.history.wait(5)
+
+    assert threads and all(name.startswith("woodshed-summarizer") for name in threads)
+    assert conversation.history.summary == "They asked about voicings."
+    last = fake.calls[-1]["messages"]
+    assert last[0] == {"role": "system", "content": SYSTEM_PROMPT}  # the cached prefix is untouched
+    assert last[1]["role"] == "system" and "They asked about voicings." in last[1]["content"]
+    assert {"role": "user", "content": "Question 0"} not in last
+    assert last[-1]["content"] == "Question 4"
+    assert len(conversation.get_history()) == 10  # the UI still gets every turn
+    assert conversation.history.as_dict()["compactions"] >= 1
+
+    conversation.reset()
+    assert conversation.history.summary == "" and conversation.messages == []
+
+
+def test_history_window_moves_only_at_compaction_steps():
+    """While a summary is pending, the window starts where it will fold to and stays there."""
+    history = ConversationHistory(token_budget=400, summarize=True)
+    for n in range(5):
+        history.append(*_turn(n))
+    release = threading.Event()
+
+    def slow_chat(**kwargs):
+        release.wait(5)
+        return SimpleNamespace(message=SimpleNamespace(content="They asked about voicings."))
+
+    with patch.object(history_module.ollama_client, "chat", side_effect=slow_chat):
+        pending = history.compact_in_background()
+        firsts = []
+        for n in range(5, 7):
+            history.append(*_turn(n))
+            firsts.append(history.window()[1][0])
+        release.set()
+        pending.result(5)
+    assert firsts[0] is firsts[1]  # same first turn on every call
+    summary, recent = history.window()
+    assert summary == "They asked about voicings." and recent[0] is firsts[0]
+
+
+def test_history_summary_failure_falls_back_to_trimming():
+    """If the fast model fails, the window is trimmed instead."""
+    history = ConversationHistory(token_budget=150, summarize=True)
+    for n in range(10):
+        history.append(*_turn(n))
+    with patch.object(history_module.ollama_client, "chat", side_effect=OllamaError("down")):
+        history.compact_in_background().result(5)
+    assert history.stats.summary_failures == 1 and history.summary == ""
+    assert sum(message_tokens(m) for m in history.window()[1]) <= 150
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("thanks!", ("chat", None)),
+    ("Hey there", ("chat", None)),
+    ("what notes are in Dm7?", ("tool", "analyze_chord")),
+    ("make that a MIDI file", ("tool", "generate_progression_midi")),
+    ("What key is Am F C G in?", ("tool", "detect_key")),
+    ("Write me a bridge that modulates up a step", ("creative", None)),
+    ("Why does the IV chord sound so hopeful?", ("creative", None)),
+    ("Give me the tab and the MIDI for that", ("creative", None)),
+    ("What is a cadence?", None),  # no chord symbol: left to the model
+])
+def test_router_rules(message, expected):
+    assert classify_rules(message) == expected
+
+
+def test_router_model_scoring_and_fallback():
+    """Messages the rules can't place are scored by FAST_MODEL, defaulting to the big model."""
+    reply = SimpleNamespace(message=SimpleNamespace(content="Tool"))
+    with patch.object(router.ollama_client, "chat", return_value=reply) as chat:
+        route = route_message("What is a cadence?")
+    assert (route.name, route.model, route.reason) == ("tool", config.FAST_MODEL, "model")
+    assert chat.call_args.kwargs["model"] == config.FAST_MODEL
+
+    with patch.object(router.ollama_client, "chat", side_effect=OllamaError("down")):
+        route = route_message("What is a cadence?")
+    assert (route.name, route.model, route.reason) == ("creative", config.LLM_MODEL, "default")
+
+    with patch("config.ROUTER_MODEL_SCORING", False):
+        assert route_message("What is a cadence?").reason == "default"
+    assert not route_message("Write a song").fast
+
+
+def _events_text(events) -> str:
+    return "".join(e.text for e in events if isinstance(e, StreamToken))
+
+
+def test_simple_turns_go_to_fast_model(conversation):
+    """A valid fast answer is shown as is; the big model is never called."""
+    fake = _FakeOllama([_chunk("You're welcome!")])
+    with patch("config.ROUTER_ENABLED", True):
+        events = _send(conversation, fake, "thanks!")
+    assert [c["model"] for c in fake.calls] == [config.FAST_MODEL]
+    assert _events_text(events) == "You're welcome!"
+    assert conversation.messages[-1] == {"role": "assistant", "content": "You're welcome!"}
+    assert router_stats()["routes"]["chat"]["turns"] >= 1
+
+
+def test_fast_model_failure_escalates(conversation):
+    """A fast answer that fails validation is never shown; the big model answers instead."""
+    before = router_stats()["routes"].get("tool", {}).get("escalated", 0)
+    fake = _FakeOllama(
+        [_chunk("Dm7 has D F A C.")],  # fast model skipped the tool
+        [_chunk("**Dm7** is D, F, A and C.")],
+    )
+    with patch("config.ROUTER_ENABLED", True):
+        events = _send(conversation, fake, "what notes are in Dm7?")
+    assert [c["model"] for c in fake.calls] == [config.FAST_MODEL, config.LLM_MODEL]
+    assert _events_text(events) == "**Dm7** is D, F, A and C."
+    assert any(isinstance(e, StreamStatus) and e.step == "Taking a closer look..." for e in events)
+    assert conversation.messages == [
+        {"role": "user", "content": "what notes are in Dm7?"},
+        {"role": "assistant", "content": "**Dm7** is D, F, A and C."},
+    ]
+    assert router_stats()["routes"]["tool"]["escalated"] == before + 1
+    assert validate_turn(route_message("thanks"), "", []) == "empty reply"
+
+
+def test_fast_route_streams_status_and_reuses_tools_on_escalation(conversation):
+    """Status shows while the fast model works; escalating doesn't write the MIDI file twice."""
+    writes = []
+
+    def fake_midi(chords, key_str=None):
+        writes.append(chords)
+        return {"file_path": f"/tmp/progression_{len(writes)}.mid", "chords": chords}
+
+    midi_call = [_chunk(tool_calls=[_tool_call("generate_progression_midi", chords=["Am", "F", "C", "G"])])]
+
+    def slow_reply(text):
+        yield _chunk(text)
+        time.sleep(0.05)  # the fast model keeps generating after its first token
+
+    fake = _FakeOllama(
+        midi_call,
+        slow_reply("```\nAm F C G\n```"),  # fails validation: code block
+        midi_call,
+        [_chunk("Here's your progression.")],
+    )
+    with patch("config.ROUTER_ENABLED", True), \
+         patch.dict(pipeline.TOOL_FUNCTIONS, {"generate_progression_midi": fake_midi}), \
+         patch.object(pipeline.ollama_client, "chat_stream", side_effect=fake.chat_stream):
+        stream = conversation.send_stream("make that a MIDI file", context_chunks=[])
+        first = next(stream)
+        assert isinstance(first, StreamStatus) and not fake.calls  # not held for the fast answer
+        events = [first, *stream]
+
+    assert [c["model"] for c in fake.calls] == [config.FAST_MODEL] * 2 + [config.LLM_MODEL] * 2
+    assert writes == [["Am", "F", "C", "G"]]
+    tool_events = [e for e in events if isinstance(e, StreamToolCall)]
+    assert len(tool_events) == 1 and tool_events[0].result["file_path"] == "/tmp/progression_1.mid"
+    assert conversation.generated_files == ["/tmp/progression_1.mid"]
+    assert _events_text(events) == "Here's your progression."
+    statuses = [e.step for e in events if isinstance(e, StreamStatus)]
+    assert statuses.index("Putting it all together...") < statuses.index("Taking a closer look...")
+
+    # A short fast answer is held whole; its first-token latency counts until it is shown
+    fake = _FakeOllama(slow_reply("You're welcome!"))
+    with patch("config.ROUTER_ENABLED", True), patch.dict(router._stats, clear=True):
+        _send(conversation, fake, "thanks!")
+        assert router_stats()["routes"]["chat"]["mean_first_token_seconds"] >= 0.05
+
+
+def test_fast_route_streams_live_after_a_checked_prefix(conversation):
+    """Past HOLD_CHARS the fast answer streams live; a code block before that stops the fast model."""
+    produced = []
+
+    def reply(*tokens):
+        for token in tokens:
+            produced.append(token)
+            yield _chunk(token)
+
+    prefix = "x" * router.HOLD_CHARS
+    fake = _FakeOllama(reply(prefix, " and more", " and the end."))
+    with patch("config.ROUTER_ENABLED", True), \
+         patch.object(pipeline.ollama_client, "chat_stream", side_effect=fake.chat_stream):
+        stream = conversation.send_stream("thanks!", context_chunks=[])
+        first = next(e for e in stream if isinstance(e, StreamToken))
+        assert first.text == prefix and produced == [prefix]  # shown before the model finished
+        assert _events_text([first, *stream]) == prefix + " and more and the end."
+    assert [c["model"] for c in fake.calls] == [config.FAST_MODEL]
+
+    produced.clear()
+    fake = _FakeOllama(reply("Sure:", " ```", "abc", "```"), [_chunk("Sure, here it is.")])
+    with patch("config.ROUTER_ENABLED", True):
+        events = _send(conversation, fake, "thanks!")
+    assert produced == ["Sure:", " ```", "abc"]  # stopped at the next token, not the end
+    assert _events_text(events) == "Sure, here it is."
+    assert [c["model"] for c in fake.calls] == [config.FAST_MODEL, config.LLM_MODEL]
+
+
+def test_tool_round_runs_concurrently_in_model_order(conversation):
+    """Calls in one round overlap; events arrive as each finishes, messages keep the model's order."""
+    barrier = threading.Barrier(2, timeout=5)  # both calls must be running at once
+
+    def slow_notation(chords):
+        barrier.wait()
+        time.sleep(0.2)
+        return {"abc": "X:1", "chords": chords}
+
+    def fast_chord(chord_symbol):
+        barrier.wait()
+        return {"chord": chord_symbol}
+
+    fake = _FakeOllama(
+        [_chunk(tool_calls=[_tool_call("generate_notation", chords=["C", "G"]), _tool_call("analyze_chord", chord_symbol="G")])],
+        [_chunk("Here you go.")],
+    )
+    with patch.dict(pipeline.TOOL_FUNCTIONS, {"generate_notation": slow_notation, "analyze_chord": fast_chord}):
+        events = _send(conversation, fake, "Notate C G and spell the G")
+
+    assert [e.name for e in events if isinstance(e, StreamToolCall)] == ["analyze_chord", "generate_notation"]
+    sent = fake.calls[-1]["messages"]
+    tool_msgs = [m for m in sent if m["role"] == "tool"]
+    assert [json.loads(m["content"]) for m in tool_msgs] == [{"abc": "X:1", "chords": ["C", "G"]}, {"chord": "G"}]
+    assert [m["tool_calls"][0]["function"]["name"] for m in sent if m.get("tool_calls")] == [
+        "generate_notation", "analyze_chord",
+    ]
+    assert get_tool_executor().as_dict()["concurrent_rounds"] >= 1
+
+
+def test_tool_executor_contains_failures():
+    """A raising or unknown tool yields an error result instead of breaking the round."""
+    def broken():
+        raise ValueError("bad chord")
+
+    executor = ToolExecutor(threads=2, processes=0)
+    try:
+        with patch.dict(pipeline.TOOL_FUNCTIONS, {"analyze_chord": broken}):
+            results = dict(executor.run_round([("analyze_chord", {}), ("no_such_tool", {})]))
+    finally:
+        executor.shutdown()
+    assert results == {0: {"error": "bad chord"}, 1: {"error": "Unknown tool: no_such_tool"}}
+
+
+def test_cpu_bound_tools_run_in_worker_processes():
+    """Registered music21 tools go to the process pool and return the same results."""
+    executor = ToolExecutor(threads=2, processes=1)
+    try:
+        results = dict(executor.run_round([
+            ("detect_key", {"notes_list": ["A", "C", "E", "F", "G"]}),
+            ("analyze_chord", {"chord_symbol": "Dm7"}),
+        ]))
+        stats = executor.as_dict()
+    finally:
+        executor.shutdown()
+    assert results[0]["key"] and results[1]["notes"] == ["D", "F", "A", "C"]
+    assert stats["process_calls"] == 1 and stats["thread_calls"] == 1
+
+
+def test_pure_tool_results_are_memoized(tmp_path):
+    """Repeat calls to pure tools skip the function; equivalent arguments share an entry."""
+    executor = ToolExecutor(threads=2, processes=0, cache=ToolResultCache(maxsize=2, cache_dir=tmp_path))
+    try:
+        first = dict(executor.run_round([("detect_key", {"notes_list": ["A", "C", "E"]})]))[0]
+        with patch.object(tool_executor, "call_tool", side_effect=AssertionError("not cached")):
+            again = dict(executor.run_round([("detect_key", {"notes_list": [" A", "C", "E"]})]))[0]
+        assert again == first and again is not first
+
+        # Errors aren't cached; impure tools aren't cached
+        dict(executor.run_round([("analyze_chord", {"chord_symbol": "H#13"})]))
+        dict(executor.run_round([("get_chord_voicings", {"chord_symbol": "C"})]))
+        stats = executor.cache.stats()["tools"]
+        assert stats["detect_key"] == {"entries": 1, "hits": 1, "disk_hits": 0, "misses": 1}
+        assert stats["analyze_chord"]["entries"] == 0 and "get_chord_voicings" not in stats
+    finally:
+        executor.shutdown()
+
+    # A fresh cache on the same directory answers from disk
+    cache = ToolResultCache(maxsize=2, cache_dir=tmp_path)
+    assert cache.get("detect_key", {"notes_list": ["A", "C", "E"]}) == first
+    assert cache.stats()["tools"]["detect_key"]["disk_hits"] == 1
+    assert canonical_args({"b": 1.0, "a": None, "c": ["F", "C"]}) == '{"b":1,"c":["F","C"]}'
+
+
+def test_tool_cache_lru_and_size_limits():
+    cache = ToolResultCache(maxsize=2, cache_dir="", max_result_bytes=100)
+    for chord in ("C", "F", "G"):
+        cache.put("analyze_chord", {"chord_symbol": chord}, {"chord": chord})
+    assert cache.get("analyze_chord", {"chord_symbol": "C"}) is MISS  # evicted
+    assert cache.get("analyze_chord", {"chord_symbol": "G"}) == {"chord": "G"}
+    cache.put("generate_notation", {"chords": ["C"]}, {"abc": "x" * 200})
+    assert cache.get("generate_notation", {"chords": ["C"]}) is MISS  # too big to keep
+    assert ToolResultCache(maxsize=0).get("analyze_chord", {"chord_symbol": "G"}) is MISS
@@ -0,0 +1,60 @@
+# Woodshed AI — Search Cache Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the query-embedding and result caches in VectorStore.search."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+
+def test_search_cache_and_invalidation(make_offline_store):
+    """Repeat queries hit the cache; writes invalidate cached results."""
+    store = make_offline_store()
+    store.add_documents(
+        ids=["c1", "c2"],
+        documents=["The ii-V-I is the core jazz cadence.", "Tritone subs swap V for bII7."],
+        metadatas=[{"source": "a.md", "category": "harmony"}, {"source": "b.md", "category": "harmony"}],
+    )
+    calls = []
+    original = store.embed_documents
+    store.embed_documents = lambda texts: calls.append(texts) or original(texts)
+
+    first = store.search("What is a ii-V-I?", n_results=1)
+    again = store.search("  what is a II-V-I ", n_results=1)
+    assert again == first
+    assert len(calls) == 1
+    stats = store.cache_stats()
+    assert stats["results"]["hits"] == 1
+    assert stats["results"]["hit_rate"] == 0.5
+
+    # Mutating a returned result doesn't corrupt the cache
+    again[0]["metadata"]["category"] = "oops"
+    assert store.search("what is a ii-v-i", n_results=1)[0]["metadata"]["category"] == "harmony"
+
+    # A write bumps the version: results recomputed, embedding still cached
+    store.add_documents(ids=["c3"], documents=["Backdoor ii-V goes iv7 to bVII7."])
+    store.search("what is a ii-V-I", n_results=1)
+    assert calls[1:] == [["Backdoor ii-V goes iv7 to bVII7."]]  # the new chunk, not the query
+    assert store.cache_stats()["results"]["misses"] == 2
+
+
+@pytest.mark.parametrize("backend", ["chroma", "numpy"])
+def test_cached_results_follow_writes_by_another_instance(make_offline_store, backend):
+    """A write through another store on the same path (e.g. the ingest CLI) drops cached results."""
+    store = make_offline_store(backend=backend)
+    store.add_documents(ids=["c1"], documents=["The ii-V-I is the core jazz cadence."])
+    assert store.search("ii-V-I cadence", n_results=1, mode="vector")[0]["id"] == "c1"
+
+    other = make_offline_store(store.persist_dir, backend=backend)
+    with patch("app.knowledge.vectorstore.SYNC_CHECK_INTERVAL", 0):
+        # Same chunk count, new text
+        other.upsert_documents(ids=["c1"], documents=["Backdoor ii-V cadence: iv7 to bVII7."])
+        assert store.search("ii-V-I cadence", n_results=1, mode="vector")[0]["document"].startswith("Backdoor")
+
+        other.add_documents(ids=["c2"], documents=["Plagal cadence: IV to I."])
+        found = store.search("plagal cadence", n_results=2, mode="lexical")
+        assert found[0]["id"] == "c2"
+        assert asyncio.run(store.asearch("plagal cadence", n_results=2, mode="lexical")) == found
@@ -0,0 +1,70 @@
+# Woodshed AI — Context Selection Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for adaptive-k context selection."""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.knowledge.selection import select_context
+
+
+def test_select_context_cutoff_mmr_and_budget():
+    """Far chunks are dropped, near-copies deduplicated, and the token budget respected."""
+    def item(doc_id, tokens):
+        return {"id": doc_id, "document": doc_id, "metadata": {"token_count": tokens}, "distance": None}
+
+    query = np.array([1.0, 0.0, 0.0])
+    vectors = np.array([
+        [0.95, 0.31, 0.0],   # a: most relevant
+        [0.94, 0.33, 0.0],   # a2: near-copy of a
+        [0.80, 0.0, 0.60],   # b: relevant, different angle
+        [0.10, 0.99, 0.0],   # far: beyond the cutoff
+    ])
+    candidates = [item("a", 100), item("a2", 100), item("b", 100), item("far", 100)]
+
+    picked = select_context(candidates, query, vectors, max_chunks=3, max_distance=0.5, mmr_lambda=0.5)
+    assert [r["id"] for r in picked] == ["a", "b", "a2"]
+    assert picked[0]["distance"] == pytest.approx(1 - vectors[0] @ query / np.linalg.norm(vectors[0]))
+    assert [r["id"] for r in select_context(candidates, query, vectors, 2, 0.5, mmr_lambda=1.0)] == ["a", "a2"]
+
+    # Budget: a 400-token chunk is skipped for smaller ones that fit
+    candidates[0]["metadata"]["token_count"] = 400
+    assert [r["id"] for r in select_context(candidates, query, vectors, 3, 0.5, token_budget=250)] == ["a2", "b"]
+    # Nothing relevant (small talk) → no context
+    assert select_context(candidates, np.array([0.0, -0.6, 0.8]), vectors, 3, 0.5) == []
+    # Without vectors: ranked order, limits only
+    assert [r["id"] for r in select_context(candidates, None, None, 3, 0.5, token_budget=250)] == ["a2", "b"]
+
+
+def test_search_context_is_adaptive(make_offline_store):
+    """search_context overfetches, then returns only relevant, distinct chunks."""
+    store = make_offline_store()
+    docs = [f"Lesson {i} on voicings" for i in range(12)]
+    store.add_documents(ids=[f"d{i}" for i in range(12)], documents=docs,
+                        metadatas=[{"source": "v.md", "token_count": 6} for _ in docs])
+
+    wide = store.search_context("Lesson 3 on voicings", mode="vector", max_chunks=4, max_distance=2.0)
+    assert len(wide) == 4 and wide[0]["id"] == "d3" and wide[0]["distance"] < 1e-6
+    narrow = store.search_context("Lesson 3 on voicings", mode="vector", max_chunks=4, max_distance=1e-3)
+    assert [r["id"] for r in narrow] == ["d3"]
+    assert len(store.search_context("Lesson 3 on voicings", mode="vector", max_distance=2.0, token_budget=12)) == 2
+    lexical = store.search_context("lesson voicings", mode="lexical", max_chunks=3)
+    assert len(lexical) == 3 and all(r["distance"] is None for r in lexical)
+    assert asyncio.run(store.asearch_context("Lesson 3 on voicings", mode="vector", max_chunks=4,
+                                             max_distance=1e-3)) == narrow
+
+
+def test_search_context_filters_with_query_cache_off(make_offline_store):
+    """The distance cutoff uses the embedding search just computed, not the query cache."""
+    store = make_offline_store(cache_size=0)
+    docs = [f"Lesson {i} on voicings" for i in range(12)]
+    store.add_documents(ids=[f"d{i}" for i in range(12)], documents=docs,
+                        metadatas=[{"source": "v.md", "token_count": 6} for _ in docs])
+    narrow = store.search_context("Lesson 3 on voicings", mode="vector", max_chunks=4, max_distance=1e-3)
+    assert [r["id"] for r in narrow] == ["d3"]
+    assert asyncio.run(store.asearch_context("Lesson 3 on voicings", mode="vector", max_chunks=4,
+                                             max_distance=1e-3)) == narrow
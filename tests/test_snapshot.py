@@ -0,0 +1,51 @@
+# Woodshed AI — Snapshot Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for knowledge base snapshot export and import."""
+
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+from app.knowledge.ingest import IngestReport, ingest_directory
+from app.knowledge.snapshot import SnapshotError, export_snapshot, import_snapshot, read_snapshot
+from app.knowledge.vectorstore import VectorStore
+
+
+def test_snapshot_round_trip(make_offline_store):
+    """A snapshot restores chunks, embeddings, and the manifest with no embedding calls."""
+    tmp_dir = Path(tempfile.mkdtemp(prefix="woodshed_ingest_"))
+    (tmp_dir / "chords.md").write_text("# Chords\n\nA dominant seventh wants to resolve.", encoding="utf-8")
+    (tmp_dir / "rhythm.md").write_text("# Rhythm\n\nSwing eighths lean on the offbeat.", encoding="utf-8")
+    source = make_offline_store()
+    ingest_directory(tmp_dir, "test", source, verbose=False)
+    snapshot_path = Path(tempfile.mkdtemp(prefix="woodshed_snap_")) / "kb.snapshot"
+    info = export_snapshot(source, snapshot_path)
+    assert (info.count, info.dim, info.embedding_model) == (2, 32, "woodshed-test-stub")
+
+    target = make_offline_store()
+    with patch.object(target, "embed_documents", side_effect=AssertionError("embedded")):
+        assert import_snapshot(snapshot_path, target).count == 2
+        header, embeddings = read_snapshot(snapshot_path)
+        assert isinstance(embeddings, np.memmap)
+        want = source.collection.get(include=["embeddings", "documents", "metadatas"])
+        got = target.collection.get(ids=want["ids"], include=["embeddings", "documents", "metadatas"])
+        assert got["documents"] == want["documents"] and got["metadatas"] == want["metadatas"]
+        assert np.allclose(got["embeddings"], want["embeddings"])
+        assert target.search("swing offbeat", n_results=1, mode="lexical")[0]["metadata"]["source"] == "rhythm.md"
+
+    # The manifest came along, so ingesting the same files writes nothing
+    report = IngestReport()
+    assert ingest_directory(tmp_dir, "test", target, verbose=False, report=report) == 0
+    assert sorted(report.unchanged) == ["chords.md", "rhythm.md"]
+
+    with patch.object(VectorStore, "embedding_model", "nomic-embed-text"):
+        try:
+            import_snapshot(snapshot_path, target)
+            raise AssertionError("mismatched embedding model was accepted")
+        except SnapshotError as exc:
+            assert "woodshed-test-stub" in str(exc)
+    assert target.collection.count() == 2
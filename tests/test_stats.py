@@ -0,0 +1,83 @@
+# Woodshed AI — Knowledge Stats Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for incrementally maintained knowledge base stats."""
+
+from unittest.mock import patch
+
+
+def test_incremental_stats(make_offline_store):
+    """Stats track adds, upserts and deletes without scanning, and persist."""
+    store = make_offline_store()
+    store.add_documents(
+        ids=["a1", "a2", "b1"],
+        documents=["Dorian mode.", "Lydian mode.", "Swing feel."],
+        metadatas=[
+            {"source": "modes.md", "category": "harmony"},
+            {"source": "modes.md", "category": "harmony"},
+            {"source": "groove.md", "category": "rhythm"},
+        ],
+    )
+    store.upsert_documents(
+        ids=["b1"], documents=["Straight eighths."],
+        metadatas=[{"source": "groove.md", "category": "rhythm"}],
+    )
+    stats = store.get_stats()
+    assert stats["total_chunks"] == 3
+    assert stats["category_counts"] == {"harmony": 2, "rhythm": 1}
+    assert stats["last_ingest"] is not None
+
+    store.delete_by_source("modes.md")
+    store.persist()
+    assert store.get_stats()["sources"] == ["groove.md"]
+
+    # A second instance reads the sidecar instead of scanning
+    reopened = make_offline_store(store.persist_dir)
+    with patch.object(reopened._stats, "rebuild") as rebuild:
+        assert reopened.get_stats()["category_counts"] == {"rhythm": 1}
+        rebuild.assert_not_called()
+
+    # A stale sidecar is repaired from the collection
+    store.stats_path.write_text('{"version": 1, "total_chunks": 99, "sources": {}, "categories": {}}')
+    fresh = make_offline_store(store.persist_dir)
+    assert fresh.get_stats()["total_chunks"] == 1
+    assert fresh.get_stats()["sources"] == ["groove.md"]
+
+
+def test_stats_count_same_named_sources_separately(make_offline_store):
+    """Same filename under two source labels counts as two sources, like the manifest."""
+    store = make_offline_store()
+    store.add_documents(
+        ids=["s1", "l1", "l2"],
+        documents=["Starter notes.", "My notes.", "More of my notes."],
+        metadatas=[
+            {"source": "notes.md", "source_dir": "starter", "category": "harmony"},
+            {"source": "notes.md", "source_dir": "local", "category": "harmony"},
+            {"source": "notes.md", "source_dir": "local", "category": "harmony"},
+        ],
+    )
+    assert store.get_stats()["source_counts"] == {"starter/notes.md": 1, "local/notes.md": 2}
+
+    store.delete_by_source("notes.md", source_dir="local")
+    assert store.get_stats()["sources"] == ["starter/notes.md"]
+    store._stats.rebuild(store._collection)
+    assert store.get_stats()["source_counts"] == {"starter/notes.md": 1}
+
+
+def test_stats_behind_the_collection_are_flagged_not_rebuilt(make_offline_store):
+    """A count mismatch (another process mid-ingest) is reported as stale; rebuild=True rescans."""
+    store = make_offline_store()
+    store.add_documents(ids=["a1"], documents=["Dorian mode."], metadatas=[{"source": "modes.md", "category": "harmony"}])
+    store.persist()
+    # Another writer's chunk, before its counts reach the sidecar
+    store.collection.add(ids=["b1"], documents=["Swing feel."], metadatas=[{"source": "groove.md", "category": "rhythm"}])
+
+    with patch.object(store._stats, "rebuild") as rebuild:
+        stats = store.get_stats()
+        rebuild.assert_not_called()
+    assert stats["total_chunks"] == 1 and stats["stale"]
+
+    stats = store.get_stats(rebuild=True)
+    assert stats["total_chunks"] == 2 and not stats["stale"]
+    assert stats["sources"] == ["groove.md", "modes.md"]
@@ -0,0 +1,47 @@
+# Woodshed AI — Token Counting Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for tokenizer-backed and estimated token counts."""
+
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from tokenizers import Tokenizer, models, pre_tokenizers
+
+from app.llm import tokenizer
+
+
+def _write_word_tokenizer() -> Path:
+    """Save a tiny whitespace/word-level tokenizer.json to a temp dir."""
+    tok = Tokenizer(models.WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+    tok.pre_tokenizer = pre_tokenizers.Whitespace()
+    path = Path(tempfile.mkdtemp(prefix="woodshed_tok_")) / "tokenizer.json"
+    tok.save(str(path))
+    return path
+
+
+def test_estimate_counts_symbols():
+    """Without a tokenizer file, symbols in chord charts count individually."""
+    with patch.object(tokenizer, "_tokenizer", None), patch.object(tokenizer, "_tokenizer_loaded", True):
+        tokenizer.count_tokens.cache_clear()
+        prose = tokenizer.count_tokens("the progression resolves home")
+        chart = tokenizer.count_tokens("| Dm7 | G7 | Cmaj7 |")
+        assert prose == 7  # long words count as one token per four characters
+        assert chart == 8
+        assert tokenizer.tail_tokens("| Dm7 | G7 |", 2) == "G7 |"
+    tokenizer.count_tokens.cache_clear()
+
+
+def test_real_tokenizer_is_used_when_present():
+    """A tokenizer.json at TOKENIZER_PATH gives exact counts and offsets."""
+    path = _write_word_tokenizer()
+    with patch("config.TOKENIZER_PATH", path), \
+         patch.object(tokenizer, "_tokenizer", None), \
+         patch.object(tokenizer, "_tokenizer_loaded", False):
+        tokenizer.count_tokens.cache_clear()
+        assert tokenizer.is_exact()
+        assert tokenizer.count_tokens("Dm7 | G7 | C") == 5
+        assert tokenizer.tail_tokens("one two three four", 2) == "three four"
+    tokenizer.count_tokens.cache_clear()
@@ -0,0 +1,56 @@
+# Woodshed AI — Source Watcher Tests
+# Copyright (C) 2026 Josh Petersen
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Tests for the background source watcher."""
+
+import asyncio
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from app.knowledge.ingest import ingest_directory
+from app.knowledge.watcher import SourceWatcher
+
+
+def test_source_watcher_swaps_in_updates(make_offline_store):
+    """Watcher ingests through a writer store; searches see old or new indexes, never partial."""
+    tmp_dir = Path(tempfile.mkdtemp(prefix="woodshed_watch_"))
+    (tmp_dir / "modes.md").write_text("# Modes\n\nLydian has a raised fourth.", encoding="utf-8")
+    store = make_offline_store()
+    watcher = SourceWatcher(store=store, directory=tmp_dir, debounce=0.05)
+    assert watcher.sync().added == ["modes.md"] and watcher.swaps == 1
+    assert store.search("Lydian raised fourth", n_results=1, mode="lexical")[0]["metadata"]["source"] == "modes.md"
+    assert watcher.sync().unchanged == ["modes.md"] and watcher.swaps == 1  # nothing to swap
+
+    seen_mid_ingest = []
+
+    def ingest_and_search(*args, **kwargs):
+        written = ingest_directory(*args, **kwargs)
+        # The collection already has the new chunk; the serving indexes don't yet
+        seen_mid_ingest.append([r["id"] for r in store.search("Phrygian flat second", n_results=5, mode="vector")])
+        return written
+
+    (tmp_dir / "phrygian.md").write_text("# Phrygian\n\nPhrygian has a flat second.", encoding="utf-8")
+    old_backend = store._backend
+    with patch("app.knowledge.watcher.ingest_directory", side_effect=ingest_and_search), \
+         patch("app.knowledge.vectorstore.SYNC_CHECK_INTERVAL", 0):
+        watcher.sync()
+    assert seen_mid_ingest and all(not i.startswith("local_phrygian") for i in seen_mid_ingest[0])
+    assert store._backend is not old_backend
+    assert "local_phrygian.md_0" in [r["id"] for r in store.search("Phrygian flat second", n_results=5, mode="vector")]
+
+    # The watch loop picks up new files on its own
+    async def watch():
+        watcher.start()
+        await asyncio.sleep(0.3)
+        (tmp_dir / "locrian.md").write_text("# Locrian\n\nLocrian has a flat fifth.", encoding="utf-8")
+        for _ in range(100):
+            await asyncio.sleep(0.05)
+            if watcher.swaps == 3:
+                break
+        await watcher.stop()
+
+    asyncio.run(watch())
+    assert watcher.swaps == 3
+    assert any(s.endswith("/locrian.md") for s in store.get_stats()["sources"])